@@ -36,7 +36,7 @@ def read_building(
     return building
 
 @router.post("/", response_model=BuildingResponse)
-async def create_building_endpoint(
+def create_building_endpoint(
     request: Request,
     response: Response,
     campus_id: int = Form(..., description="ID кампуса, к которому относится здание"),
@@ -57,7 +57,7 @@ async def create_building_endpoint(
             "y": y,
             "description": description
         }
-        result = await create_building(db, building_data, svg_file)
+        result = create_building(db, building_data, svg_file)
         if new_access_token:
             response.headers["X-New-Access-Token"] = new_access_token
         return result
@@ -67,7 +67,7 @@ async def create_building_endpoint(
         raise HTTPException(status_code=500, detail=f"Ошибка при создании здания: {str(e)}")
 
 @router.put("/{building_id}", response_model=BuildingResponse)
-async def update_building_endpoint(
+def update_building_endpoint(
     building_id: int,
     request: Request,
     response: Response,
@@ -87,7 +87,7 @@ async def update_building_endpoint(
                 "description": description
             }.items() if value is not None
         }
-        updated_building = await update_building(db, building_id, update_data, svg_file)
+        updated_building = update_building(db, building_id, update_data, svg_file)
         if not updated_building:
             raise HTTPException(status_code=404, detail="Building not found")
         if new_access_token:
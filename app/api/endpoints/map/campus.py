@@ -29,7 +29,7 @@ def read_campus(
     return campus
 
 @router.post("/", response_model=CampusResponse)
-async def create_campus_endpoint(
+def create_campus_endpoint(
     request: Request,
     response: Response,
     name: str = Form(..., description="Название кампуса"),
@@ -40,7 +40,7 @@ async def create_campus_endpoint(
 ):
     """Создать новый кампус. Требуются права администратора."""
     try:
-        result = await create_campus(db, name, description, svg_file)
+        result = create_campus(db, name, description, svg_file)
         if new_access_token:
             response.headers["X-New-Access-Token"] = new_access_token
         return result
@@ -50,7 +50,7 @@ async def create_campus_endpoint(
         raise HTTPException(status_code=500, detail=f"Ошибка при создании кампуса: {str(e)}")
 
 @router.put("/{campus_id}", response_model=CampusResponse)
-async def update_campus_endpoint(
+def update_campus_endpoint(
     campus_id: int,
     request: Request,
     response: Response,
@@ -68,7 +68,7 @@ async def update_campus_endpoint(
                 "description": description
             }.items() if value is not None
         }
-        updated_campus = await update_campus(db, campus_id, update_data, svg_file)
+        updated_campus = update_campus(db, campus_id, update_data, svg_file)
         if not updated_campus:
             raise HTTPException(status_code=404, detail="Campus not found")
         if new_access_token:
@@ -61,7 +61,7 @@ def read_floors_by_campus_and_number(
     return floors
 
 @router.post("/", response_model=FloorResponse)
-async def create_floor_endpoint(
+def create_floor_endpoint(
     request: Request,
     response: Response,
     building_id: int = Form(...),
@@ -79,7 +79,7 @@ async def create_floor_endpoint(
             description=description,
             connections=[]
         )
-        result = await create_floor_with_connections(db=db, floor_data=floor_data, svg_file=svg_file)
+        result = create_floor_with_connections(db=db, floor_data=floor_data, svg_file=svg_file)
         if new_access_token:
             response.headers["X-New-Access-Token"] = new_access_token
         return result
@@ -89,7 +89,7 @@ async def create_floor_endpoint(
         raise HTTPException(status_code=500, detail=f"Ошибка при создании этажа: {str(e)}")
 
 @router.put("/{floor_id}", response_model=FloorResponse)
-async def update_floor_endpoint(
+def update_floor_endpoint(
     floor_id: int,
     request: Request,
     response: Response,
@@ -8,13 +8,20 @@ from app.map.crud.room import (
     update_room,
     delete_room,
     get_rooms_by_floor_and_campus,
-    search_rooms_by_name_or_cab_id
+    search_rooms_by_name_or_cab_id,
+    auto_connect_rooms
 )
-from app.map.schemas.room import RoomResponse, RoomCreate, RoomUpdate, Coordinates, RoomSearchResponse
+from app.map.schemas.room import (
+    RoomResponse, RoomCreate, RoomUpdate, Coordinates, RoomSearchResponse, AutoConnectResponse, ProposedConnectionResponse,
+    HitTestResponse, RoomHit, SegmentHit
+)
+from app.map.utils.spatial import floor_indexes
 from app.map.schemas.connection import ConnectionCreate
 from app.database.database import get_db
+from app.database.config.settings import settings
 from app.users.dependencies.auth import admin_required
 import json
+import math
 
 router = APIRouter(prefix="/rooms", tags=["Rooms"])
 
@@ -45,6 +52,35 @@ def search_rooms(
     rooms = search_rooms_by_name_or_cab_id(db, query, campus_id)
     return rooms
 
+@router.get("/hit-test", response_model=HitTestResponse)
+def hit_test(
+    campus_id: int,
+    floor_number: int,
+    x: float,
+    y: float,
+    max_distance: Optional[float] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Что находится в точке (x, y) этажа кампуса: комната, многоугольник которой содержит точку,
+    иначе ближайший сегмент коридора не дальше max_distance (по умолчанию ROOM_HIT_TEST_MAX_DISTANCE).
+    Без авторизации.
+    """
+    if not all(math.isfinite(value) for value in (x, y)):
+        raise HTTPException(status_code=400, detail="Координаты точки должны быть конечными числами")
+    if max_distance is None:
+        max_distance = settings.ROOM_HIT_TEST_MAX_DISTANCE or math.inf
+    index = floor_indexes.get(db, campus_id, floor_number)
+    room = index.room_at(x, y)
+    if room is not None:
+        return HitTestResponse(room=RoomHit(
+            id=room.id, name=room.name, cab_id=room.cab_id, building_id=room.building_id, floor_id=room.floor_id
+        ))
+    segment, distance = index.nearest_segment(x, y, max_distance)
+    if segment is None:
+        return HitTestResponse()
+    return HitTestResponse(segment=SegmentHit(id=segment.id, floor_id=segment.floor_id, distance=distance))
+
 @router.get("/{room_id}", response_model=RoomResponse)
 def read_room(
     room_id: int,
@@ -69,7 +105,7 @@ def read_rooms_by_floor_and_campus(
     return rooms
 
 @router.post("/", response_model=RoomResponse)
-async def create_room_endpoint(
+def create_room_endpoint(
     request: Request,
     response: Response,
     building_id: int = Form(..., description="ID здания, к которому относится комната"),
@@ -106,7 +142,7 @@ async def create_room_endpoint(
             connections=connections_list
         )
         # Создаем комнату
-        room = await create_room(db=db, room_data=room_data, image_file=image_file)
+        room = create_room(db=db, room_data=room_data, image_file=image_file)
         if new_access_token:
             response.headers["X-New-Access-Token"] = new_access_token
         return room
@@ -118,8 +154,37 @@ async def create_room_endpoint(
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Ошибка при создании комнаты: {str(e)}")
 
+@router.post("/auto-connect", response_model=AutoConnectResponse)
+def auto_connect_rooms_endpoint(
+    response: Response,
+    building_id: Optional[int] = None,
+    floor_id: Optional[int] = None,
+    max_distance: Optional[float] = None,
+    create: bool = False,
+    db: Session = Depends(get_db),
+    new_access_token: Optional[str] = Depends(admin_required)
+):
+    """
+    Соединить комнаты без соединений с ближайшими сегментами их этажа (например, после импорта).
+    По умолчанию соединения только предлагаются; create=true создаёт их.
+    Требуются права администратора.
+    """
+    try:
+        proposals = auto_connect_rooms(db, building_id, floor_id, max_distance, create)
+        if new_access_token:
+            response.headers["X-New-Access-Token"] = new_access_token
+        return AutoConnectResponse(
+            created=create,
+            connections=[ProposedConnectionResponse(**proposal._asdict()) for proposal in proposals]
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Ошибка при соединении комнат с коридорами: {str(e)}")
+
 @router.put("/{room_id}", response_model=RoomResponse)
-async def update_room_endpoint(
+def update_room_endpoint(
     room_id: int,
     request: Request,
     response: Response,
@@ -150,7 +215,7 @@ async def update_room_endpoint(
             coordinates=coordinates_list,
             connections=[ConnectionCreate(**conn) for conn in json.loads(connections)] if connections else None
         )
-        updated_room = await update_room(db=db, room_id=room_id, room_data=update_data, image_file=image_file)
+        updated_room = update_room(db=db, room_id=room_id, room_data=update_data, image_file=image_file)
         if not updated_room:
             raise HTTPException(status_code=404, detail="Room not found")
         if new_access_token:
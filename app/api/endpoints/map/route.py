@@ -1,31 +1,104 @@
-import math
 import logging
+from typing import Dict, FrozenSet, List, Optional
+import anyio
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 from app.database.database import get_db
-from app.map.utils.builder import build_graph
-from app.map.utils.pathfinder import find_path
+from app.database.config.settings import settings
+from app.map.utils.builder import build_graph, build_graph_for_rooms, endpoint_building_ids, get_graph
+from app.map.utils.pathfinder import filter_path, nearest_path, search_path
+from app.map.utils.alternatives import alternative_paths
+from app.map.utils.profiles import PROFILES, profile_graph
+from app.map.utils.points import PointGraph, is_point, parse_point, with_points
+from app.map.utils.cache import graph_cache, route_cache, route_search_cache
+from app.map.utils.matrix import distance_matrix
+from app.map.utils.assembly import assemble_route
+from app.map.schemas.route import (
+    RouteBatchItem, RouteBatchRequest, RouteBatchResponse, RouteMatrixRequest, RouteMatrixResponse, RoutePair,
+)
 from app.map.models.room import Room
-from app.map.models.connection import Connection
+from app.map.models.building import Building
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Построение графа и поиск выполняются в отдельном ограниченном пуле потоков: ожидающие
+# запросы стоят в очереди в event loop и не занимают общий пул FastAPI, в котором
+# выполняются CRUD и остальные синхронные обработчики
+route_limiter = anyio.CapacityLimiter(settings.ROUTE_THREADS)
+
+async def _run_route_job(func, *args):
+    return await anyio.to_thread.run_sync(func, *args, limiter=route_limiter)
+
 @router.get("/route")
-async def get_route(start: str, end: str, db: Session = Depends(get_db)):
+async def get_route(start: str, end: str, alternatives: int = 0, profile: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    alternatives — сколько альтернативных маршрутов вернуть в поле alternatives (не больше ROUTE_MAX_ALTERNATIVES).
+    profile — профиль маршрутизации (hurry, wheelchair, см. PROFILES); вес маршрута считается по весам профиля.
+    start и end — комнаты room_<id> или точки карты point_<building_id>_<floor_number>_<x>_<y>:
+    точка привязывается к ближайшему коридору этажа.
+    """
     logger.info(f"Получен запрос на построение маршрута от {start} до {end}")
 
+    if alternatives < 0 or alternatives > settings.ROUTE_MAX_ALTERNATIVES:
+        raise HTTPException(status_code=400, detail=f"alternatives должно быть от 0 до {settings.ROUTE_MAX_ALTERNATIVES}")
+    if profile is not None and profile not in PROFILES:
+        raise HTTPException(status_code=400, detail=f"Неизвестный профиль {profile}, доступны: {', '.join(PROFILES)}")
+    # Версия читается до построения графа: если карта изменится во время запроса,
+    # результат ляжет под старой версией и больше не будет выдан
+    version = graph_cache.version
+    cached = route_cache.get(_route_key(start, end, version, alternatives, profile))
+    if cached is not None:
+        logger.info(f"Маршрут от {start} до {end} взят из кеша")
+        return cached
+    return await _run_route_job(_compute_route, db, start, end, version, alternatives, profile)
+
+def _route_key(start: str, end: str, version: int, alternatives: int = 0, profile: Optional[str] = None) -> tuple:
+    if not alternatives and profile is None:
+        return (start, end, version)
+    return (start, end, version, alternatives, profile)
+
+def _compute_route(db: Session, start: str, end: str, version: int, alternatives: int = 0,
+                   profile: Optional[str] = None) -> dict:
     # Построение графа
     try:
         graph = build_graph(db, start, end)
         logger.info(f"Граф успешно построен: {len(graph.vertices)} вершин")
+    except ValueError as e:
+        # Неизвестная комната или здание точки, неверный формат конца маршрута
+        logger.error(f"Ошибка при построении графа: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Ошибка при построении графа: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Ошибка при построении графа: {str(e)}")
+    return _route_on_graph(db, graph, start, end, version, alternatives, profile)
+
+def _route_on_graph(db: Session, graph, start: str, end: str, version: int, alternatives: int = 0,
+                    profile: Optional[str] = None) -> dict:
+    # Точки карты привязываются к коридорам временными вершинами поверх закешированного графа
+    try:
+        graph = with_points(db, profile_graph(graph, profile), start, end)
+    except ValueError as e:
+        logger.error(f"Ошибка при привязке точки: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
 
     # Поиск пути
     try:
-        path, weight = find_path(graph, start, end)
+        # Иерархия сжатия не знает временных вершин: для точек — A*
+        mode = "astar" if isinstance(graph, PointGraph) and settings.ROUTE_SEARCH_MODE == "ch" else settings.ROUTE_SEARCH_MODE
+        # Граф неориентированный: прямой и обратный запрос делят один результат поиска
+        search_key = (frozenset((start, end)), version) if profile is None else (frozenset((start, end)), version, profile)
+        found = route_search_cache.get(search_key)
+        if found is None:
+            full_path, weight = search_path(graph, start, end, heuristic=settings.ROUTE_HEURISTIC, mode=mode)
+            if full_path:
+                route_search_cache.put(search_key, (start, full_path, weight))
+        else:
+            origin, full_path, weight = found
+            if origin != start:
+                full_path = full_path[::-1]
+        path = filter_path(graph, full_path)
         logger.info(f"Поиск пути завершён: путь={path}, вес={weight}")
     except Exception as e:
         logger.error(f"Ошибка при поиске пути: {str(e)}")
@@ -35,148 +108,205 @@ async def get_route(start: str, end: str, db: Session = Depends(get_db)):
         logger.info(f"Путь от {start} до {end} не найден")
         raise HTTPException(status_code=404, detail="Путь не найден")
 
-    # Формирование маршрута
-    result = []
-    current_floor = None
-    floor_points = []
-    instructions = []
-    seen_vertices = set()
-
-    # Загружаем соединения и комнаты
-    connections = db.query(Connection).all()
-    stair_connections = {(conn.from_segment_id, conn.to_segment_id): conn for conn in connections if conn.type == "лестница" and conn.from_segment_id and conn.to_segment_id}
-    rooms = {f"room_{room.id}": room for room in db.query(Room).all()}
+    response = _build_response(db, graph, start, end, path, weight)
+    if alternatives:
+        response["alternatives"] = _alternative_routes(db, graph, start, end, full_path, weight, alternatives)
+    route_cache.put(_route_key(start, end, version, alternatives, profile), response)
+    return response
 
+def _alternative_routes(db: Session, graph, start: str, end: str, full_path: list, weight: float, count: int) -> list:
     try:
-        # Фильтрация пути с учётом допустимого смещения (5 единиц)
-        filtered_points = []
-        for i, vertex in enumerate(path):
-            vertex_data = graph.get_vertex_data(vertex)
-            if not vertex_data or "coords" not in vertex_data:
-                logger.error(f"Отсутствуют данные для вершины {vertex}")
-                raise HTTPException(status_code=500, detail=f"Некорректные данные для вершины {vertex}")
-            x, y, floor = vertex_data["coords"]
-            if not filtered_points or all(
-                abs(x - fp["x"]) > 5 or abs(y - fp["y"]) > 5
-                for fp in filtered_points
-            ):
-                filtered_points.append({"x": x, "y": y, "vertex": vertex, "floor": floor})
-
-        # Обработка отфильтрованного пути
-        for i, point in enumerate(filtered_points):
-            vertex = point["vertex"]
-            x, y, floor = point["x"], point["y"], point["floor"]
-
-            if vertex not in seen_vertices:
-                if floor != current_floor:
-                    if floor_points:
-                        result.append({"floor": current_floor, "points": floor_points})
-                    floor_points = []
-                    current_floor = floor
-                floor_points.append({"x": x, "y": y, "vertex": vertex, "floor": floor})
-                seen_vertices.add(vertex)
-
-            if i < len(filtered_points) - 1:
-                next_point = filtered_points[i + 1]
-                next_vertex = next_point["vertex"]
-                edge_data = graph.get_edge_data(vertex, next_vertex)
-                if edge_data.get("type") == "лестница":
-                    prev_floor = filtered_points[i - 1]["floor"] if i > 0 else floor
-                    direction = "вверх" if floor > prev_floor else "вниз"
-
-                    if "stair" in vertex:
-                        parts = vertex.split("_")
-                        if len(parts) >= 4:
-                            from_seg = int(parts[2])
-                            to_seg = int(parts[4])
-                            conn = stair_connections.get((from_seg, to_seg))
-                            if conn and conn.from_floor_id and conn.to_floor_id:
-                                stair_end_vertex = f"stair_end_{from_seg}_to_{to_seg}"
-                                stair_end_coords = (x, y, conn.from_floor_id)
-
-                                if "to" in vertex:
-                                    if floor_points[-1]["floor"] != conn.from_floor_id:
-                                        result.append({"floor": current_floor, "points": floor_points})
-                                        floor_points = []
-                                        current_floor = conn.from_floor_id
-                                    if stair_end_vertex not in seen_vertices:
-                                        floor_points.append({"x": x, "y": y, "vertex": stair_end_vertex, "floor": conn.from_floor_id})
-                                        seen_vertices.add(stair_end_vertex)
-                                elif "from" in vertex:
-                                    if floor_points[-1]["floor"] != conn.to_floor_id:
-                                        result.append({"floor": current_floor, "points": floor_points})
-                                        floor_points = []
-                                        current_floor = conn.to_floor_id
-                                    if stair_end_vertex not in seen_vertices:
-                                        floor_points.append({"x": x, "y": y, "vertex": stair_end_vertex, "floor": conn.to_floor_id})
-                                        seen_vertices.add(stair_end_vertex)
-
-                    if not any("лестнице" in instr.lower() for instr in instructions[-2:]):
-                        instructions.append(f"Спуститесь по лестнице с {prev_floor}-го на {floor}-й этаж" if direction == "вниз" else f"Поднимитесь по лестнице с {prev_floor}-го на {floor}-й этаж")
-
-                elif edge_data.get("type") == "дверь":
-                    if "outdoor" in next_vertex and not any("выйдите" in instr.lower() for instr in instructions[-2:]):
-                        instructions.append("Выйдите из здания через дверь")
-                    elif "outdoor" in vertex and not any("войдите" in instr.lower() for instr in instructions[-2:]):
-                        instructions.append("Войдите в здание через дверь")
-
-        if floor_points:
-            result.append({"floor": current_floor, "points": floor_points})
-
-        # Генерация направлений на основе координат
-        directions = []
-        for floor_data in result:
-            floor_points = floor_data["points"]
-            for j in range(len(floor_points) - 1):
-                current = floor_points[j]
-                next_point = floor_points[j + 1]
-                prev_point = floor_points[j - 1] if j > 0 else None
-
-                dx = next_point["x"] - current["x"]
-                dy = next_point["y"] - current["y"]
-                angle = math.degrees(math.atan2(dy, dx))
-
-                if prev_point:
-                    prev_dx = current["x"] - prev_point["x"]
-                    prev_dy = current["y"] - prev_point["y"]
-                    prev_angle = math.degrees(math.atan2(prev_dy, prev_dx))
-                    turn_angle = (angle - prev_angle + 180) % 360 - 180
-                    if -45 <= turn_angle <= 45:
-                        direction = "Идите прямо"
-                    elif -135 <= turn_angle < -45:
-                        direction = "Поверните налево"
-                    elif 45 < turn_angle <= 135:
-                        direction = "Поверните направо"
-                    else:
-                        direction = "Развернитесь"
-                else:
-                    room = rooms.get(start) if j == 0 else rooms.get(end) if j == len(floor_points) - 2 else None
-                    direction = f"Начните движение из {room.name} {room.cab_id} кабинет" if room else "Начните движение"
-
-                directions.append(direction)
-
-        # Формирование итоговых инструкций с приоритетом начала
-        final_instructions = []
-        if directions and "Начните движение" in directions[0]:
-            final_instructions.append(directions[0])
-            directions = directions[1:]
-        instr_idx = 0
-        dir_idx = 0
-        while instr_idx < len(instructions) or dir_idx < len(directions):
-            if instr_idx < len(instructions):
-                final_instructions.append(instructions[instr_idx])
-                instr_idx += 1
-            if dir_idx < len(directions) and (instr_idx >= len(instructions) or "лестнице" not in instructions[instr_idx - 1].lower() and "дверь" not in instructions[instr_idx - 1].lower()):
-                final_instructions.append(directions[dir_idx])
-                dir_idx += 1
-
-        # Добавляем пункт прибытия
-        if end in rooms:
-            final_instructions.append(f"Вы прибыли в {rooms[end].name} {rooms[end].cab_id} кабинет")
-
-        logger.info(f"Маршрут сформирован: путь={result}, вес={weight}, инструкции={final_instructions}")
-        return {"path": result, "weight": weight, "instructions": final_instructions}
+        found = alternative_paths(
+            graph, start, end, full_path, weight, count,
+            max_stretch=settings.ROUTE_ALTERNATIVE_STRETCH, max_overlap=settings.ROUTE_ALTERNATIVE_OVERLAP,
+        )
+    except Exception as e:
+        logger.error(f"Ошибка при поиске альтернативных путей: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Ошибка при поиске альтернативных путей: {str(e)}")
+    return [_build_response(db, graph, start, end, filter_path(graph, path), total) for path, total in found]
 
+def _build_response(db: Session, graph, start: str, end: str, path: list, weight: float) -> dict:
+    try:
+        return assemble_route(db, graph, start, end, path, weight)
     except Exception as e:
         logger.error(f"Ошибка при формировании маршрута: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Ошибка при формировании маршрута: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Ошибка при формировании маршрута: {str(e)}")
+
+@router.get("/route/nearest")
+async def get_nearest_route(start: str, query: str, db: Session = Depends(get_db)):
+    """Маршрут от комнаты start до ближайшей комнаты, в названии или описании которой есть query."""
+    logger.info(f"Получен запрос ближайшей комнаты «{query}» от {start}")
+    return await _run_route_job(_compute_nearest, db, start, query)
+
+def _compute_nearest(db: Session, start: str, query: str) -> dict:
+    start_room = None
+    if start.startswith("room_") and start[len("room_"):].isdigit():
+        start_room = (
+            db.query(Room.building_id, Building.campus_id)
+            .join(Building, Building.id == Room.building_id)
+            .filter(Room.id == int(start[len("room_"):]))
+            .first()
+        )
+    if start_room is None:
+        raise HTTPException(status_code=400, detail=f"Комната {start} не найдена, ожидается room_<id>")
+
+    # Ищем только в кампусе начальной комнаты; % и _ в запросе — обычные символы, а не шаблон LIKE
+    pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    rooms = (
+        db.query(Room.id, Room.building_id)
+        .join(Building, Building.id == Room.building_id)
+        .filter(
+            Building.campus_id == start_room.campus_id,
+            or_(Room.name.ilike(pattern, escape="\\"), Room.description.ilike(pattern, escape="\\")),
+        )
+        .all()
+    )
+    candidates = {f"room_{room.id}" for room in rooms} - {start}
+    if not candidates:
+        raise HTTPException(status_code=404, detail=f"Комнаты по запросу «{query}» не найдены")
+    # Граф строится на все здания с подходящими комнатами и остаётся в кеше графов
+    building_ids = {room.building_id for room in rooms} | {start_room.building_id}
+    if len(building_ids) > settings.ROUTE_NEAREST_MAX_BUILDINGS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Комнаты по запросу «{query}» есть в {len(building_ids)} зданиях, "
+                   f"допустимо не больше {settings.ROUTE_NEAREST_MAX_BUILDINGS}: уточните запрос",
+        )
+
+    try:
+        graph = build_graph_for_rooms(db, [start, *candidates])
+        logger.info(f"Граф успешно построен: {len(graph.vertices)} вершин")
+    except ValueError as e:
+        logger.error(f"Ошибка при построении графа: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Ошибка при построении графа: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Ошибка при построении графа: {str(e)}")
+
+    try:
+        end, full_path, weight = nearest_path(graph, start, candidates)
+        path = filter_path(graph, full_path)
+    except Exception as e:
+        logger.error(f"Ошибка при поиске пути: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Ошибка при поиске пути: {str(e)}")
+
+    if not path:
+        logger.info(f"Путь от {start} до комнат «{query}» не найден")
+        raise HTTPException(status_code=404, detail="Путь не найден")
+
+    response = _build_response(db, graph, start, end, path, weight)
+    response["end"] = end
+    return response
+
+
+@router.post("/route/batch", response_model=RouteBatchResponse)
+async def get_route_batch(request: RouteBatchRequest, db: Session = Depends(get_db)):
+    """
+    Маршруты для списка пар. Концы — комнаты room_<id> или точки карты, как в /route.
+    Ошибка одной пары не прерывает остальные.
+    """
+    logger.info(f"Получен пакетный запрос маршрутов: {len(request.pairs)} пар")
+
+    if not request.pairs:
+        raise HTTPException(status_code=400, detail="Список pairs не должен быть пустым")
+    if len(request.pairs) > settings.ROUTE_BATCH_MAX_PAIRS:
+        raise HTTPException(status_code=400, detail=f"Больше {settings.ROUTE_BATCH_MAX_PAIRS} пар в одном запросе")
+    version = graph_cache.version
+    return await _run_route_job(_compute_batch, db, request.pairs, version)
+
+
+def _compute_batch(db: Session, pairs: List[RoutePair], version: int) -> RouteBatchResponse:
+    results: List[Optional[RouteBatchItem]] = [None] * len(pairs)
+
+    def result(i: int, status: int, route: Optional[dict] = None, error: Optional[str] = None) -> None:
+        results[i] = RouteBatchItem(start=pairs[i].start, end=pairs[i].end, status=status, route=route, error=error)
+
+    pending = []
+    for i, pair in enumerate(pairs):
+        cached = route_cache.get((pair.start, pair.end, version))
+        if cached is not None:
+            result(i, 200, route=cached)
+        else:
+            pending.append(i)
+
+    # Здания всех комнат одним запросом (точки задают здание сами); пары группируются по набору
+    # зданий, как в /route, поэтому каждый граф берётся из кеша или строится один раз на весь пакет
+    buildings = endpoint_building_ids(db, {vertex for i in pending for vertex in (pairs[i].start, pairs[i].end)})
+    groups: Dict[FrozenSet[int], List[int]] = {}
+    for i in pending:
+        missing = [vertex for vertex in (pairs[i].start, pairs[i].end) if vertex not in buildings]
+        if missing:
+            vertex = missing[0]
+            # Коды ошибок те же, что у /route: неизвестная комната или здание точки — 400
+            if vertex.startswith("room_") and vertex[len("room_"):].isdigit():
+                result(i, 400, error=f"Комната {vertex} не найдена")
+            elif is_point(vertex):
+                try:
+                    result(i, 400, error=f"Здание с id {parse_point(vertex).building_id} не найдено")
+                except ValueError as e:
+                    result(i, 400, error=str(e))
+            else:
+                result(i, 400, error=f"Неверный формат комнаты, ожидается room_<id>, получено {vertex}")
+            continue
+        key = frozenset({buildings[pairs[i].start], buildings[pairs[i].end]} - {None})
+        groups.setdefault(key, []).append(i)
+
+    for building_ids, indices in groups.items():
+        try:
+            graph = get_graph(db, set(building_ids))
+        except Exception as e:
+            logger.error(f"Ошибка при построении графа: {str(e)}")
+            for i in indices:
+                result(i, 500, error=f"Ошибка при построении графа: {str(e)}")
+            continue
+        # Поиск упирается в GIL, поэтому пары одного пакета считаются последовательно в одном
+        # задании пула маршрутов; параллельно обрабатываются разные запросы (ROUTE_THREADS)
+        for i in indices:
+            try:
+                result(i, 200, route=_route_on_graph(db, graph, pairs[i].start, pairs[i].end, version))
+            except HTTPException as e:
+                result(i, e.status_code, error=e.detail)
+
+    return RouteBatchResponse(results=results)
+
+
+@router.get("/route/cache")
+async def get_route_cache_stats():
+    return {
+        "map_version": graph_cache.version,
+        "routes": route_cache.stats(),
+        "searches": route_search_cache.stats(),
+    }
+
+
+@router.post("/route/matrix", response_model=RouteMatrixResponse)
+async def get_route_matrix(request: RouteMatrixRequest, db: Session = Depends(get_db)):
+    logger.info(f"Получен запрос матрицы расстояний: {len(request.sources)} x {len(request.targets)}")
+
+    if not request.sources or not request.targets:
+        raise HTTPException(status_code=400, detail="Списки sources и targets не должны быть пустыми")
+    if len(request.sources) * len(request.targets) > settings.ROUTE_MATRIX_MAX_CELLS:
+        raise HTTPException(status_code=400, detail=f"Матрица больше {settings.ROUTE_MATRIX_MAX_CELLS} ячеек")
+    return await _run_route_job(_compute_matrix, db, request)
+
+
+def _compute_matrix(db: Session, request: RouteMatrixRequest) -> RouteMatrixResponse:
+    try:
+        graph = build_graph_for_rooms(db, request.sources + request.targets)
+    except ValueError as e:
+        logger.error(f"Ошибка при построении графа: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Ошибка при построении графа: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Ошибка при построении графа: {str(e)}")
+
+    try:
+        distances, next_hops = distance_matrix(
+            graph, request.sources, request.targets,
+            with_next_hop=request.next_hop, workers=settings.ROUTE_MATRIX_WORKERS
+        )
+    except Exception as e:
+        logger.error(f"Ошибка при расчёте матрицы расстояний: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Ошибка при расчёте матрицы расстояний: {str(e)}")
+
+    return RouteMatrixResponse(sources=request.sources, targets=request.targets, distances=distances, next_hops=next_hops)
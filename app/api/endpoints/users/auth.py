@@ -26,7 +26,7 @@ class TokenResponse(BaseModel):
     user_data: dict
 
 @router.post("/token", response_model=TokenResponse)
-async def login(response: Response, credentials: LoginRequest, db: Session = Depends(get_db)):
+def login(response: Response, credentials: LoginRequest, db: Session = Depends(get_db)):
     admin = db.query(Admin).filter(Admin.username == credentials.username).first()
 
     if not admin or not verify_password(credentials.password, admin.hashed_password):
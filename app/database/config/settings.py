@@ -20,6 +20,35 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE: int = 30  # minutes
     REFRESH_TOKEN_EXPIRE: int = 7  # days
 
+    # Настройки маршрутизации
+    # Кеш графа сбрасывается при записи только в том воркере, который её выполнил,
+    # поэтому TTL ограничивает устаревание графа в остальных воркерах
+    GRAPH_CACHE_TTL: int = 600  # seconds, 0 — без ограничения
+    GRAPH_COMPACT: bool = False  # Хранить графы в компактном CSR-представлении
+    GRAPH_SNAPSHOT_PATH: str = ""  # Снимок графа от compileGraph.py, загружается при старте; пусто — не использовать
+    GRAPH_PATCHING: bool = True  # Применять правки комнат, сегментов и соединений к закешированным графам без полной перестройки
+    GRAPH_SHARED_MEMORY: str = ""  # Файл-указатель на графы в разделяемой памяти, общие для всех воркеров; пусто — не использовать
+    GRAPH_SHARED_REPUBLISH_DELAY: float = 2.0  # seconds; правки карты за это время публикуются в разделяемой памяти одной сборкой
+    GRAPH_LANDMARKS: int = 8  # Число ориентиров для эвристики ALT, 0 — отключить
+    GRAPH_LANDMARK_STRATEGY: str = "avoid"  # farthest или avoid
+    ROUTE_HEURISTIC: str = "alt"  # geometric, alt или combined (см. find_path)
+    ROUTE_SEARCH_MODE: str = "astar"  # astar, bidirectional или ch (иерархия сжатия)
+    ROUTE_THREADS: int = 1  # Потоков для построения маршрутов; поиск упирается в GIL, больше 1–2 не ускоряет
+    ROUTE_CACHE_SIZE: int = 1024  # Записей в LRU-кеше маршрутов, 0 — отключить
+    ROUTE_CACHE_TTL: int = 600  # seconds, 0 — без ограничения
+    ROUTE_BATCH_MAX_PAIRS: int = 50  # Максимум пар в одном запросе /route/batch
+    ROUTE_MAX_ALTERNATIVES: int = 3  # Максимум альтернативных маршрутов в /route?alternatives=k
+    ROUTE_ALTERNATIVE_STRETCH: float = 1.5  # Альтернатива не длиннее кратчайшего пути во столько раз
+    ROUTE_ALTERNATIVE_OVERLAP: float = 0.7  # Максимальная доля веса альтернативы, общая с уже выбранными путями
+    ROUTE_MATRIX_WORKERS: int = 1  # Процессов для /route/matrix, 1 — считать в текущем процессе
+    ROUTE_MATRIX_MAX_CELLS: int = 10000  # Максимум ячеек sources x targets в одном запросе
+    ROUTE_NEAREST_MAX_BUILDINGS: int = 10  # Максимум зданий с подходящими комнатами в /route/nearest
+    ROUTE_POINT_SNAP_MAX_DISTANCE: float = 100  # Максимальное расстояние от точки карты до коридора, 0 — без ограничения
+    ROOM_AUTO_CONNECT: bool = True  # Соединять новую комнату без соединений с ближайшим сегментом этажа
+    ROOM_AUTO_CONNECT_MAX_DISTANCE: float = 0  # Максимальное расстояние от входа до сегмента, 0 — без ограничения
+    ROOM_AUTO_CONNECT_WEIGHT: float = 2.0  # Вес создаваемого соединения (как вес по умолчанию в build_graph)
+    ROOM_HIT_TEST_MAX_DISTANCE: float = 100  # Расстояние по умолчанию, дальше которого /rooms/hit-test не ищет сегмент, 0 — без ограничения
+
     # Настройки cookies
     @property
     def COOKIE_CONFIG(self):
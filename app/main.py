@@ -1,5 +1,6 @@
 # main.py
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse, FileResponse
@@ -8,10 +9,40 @@ from pathlib import Path
 import markdown
 import os
 from starlette.responses import Response
+from app.database.database import SessionLocal
+from app.database.config.settings import settings
+from app.map.utils.builder import build_snapshot_graphs
+from app.map.utils.shared import ensure_shared_graphs
+from app.map.utils.snapshot import preload_snapshot
 
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Графы из снимка compileGraph.py: воркер стартует без построения графа из БД
+    if settings.GRAPH_SNAPSHOT_PATH:
+        db = SessionLocal()
+        try:
+            loaded = preload_snapshot(db, settings.GRAPH_SNAPSHOT_PATH)
+            logger.info(f"Из снимка загружено графов: {loaded}")
+        except Exception as e:
+            logger.error(f"Не удалось загрузить снимок графа: {str(e)}")
+        finally:
+            db.close()
+    # Графы в разделяемой памяти: первый стартовавший воркер строит и публикует, остальные подключаются
+    if settings.GRAPH_SHARED_MEMORY:
+        db = SessionLocal()
+        try:
+            if ensure_shared_graphs(db, lambda: build_snapshot_graphs(db)):
+                logger.info("Графы построены и опубликованы в разделяемой памяти")
+        except Exception as e:
+            logger.error(f"Не удалось подготовить графы в разделяемой памяти: {str(e)}")
+        finally:
+            db.close()
+    yield
+
 app = FastAPI(
+    lifespan=lifespan,
     swagger_ui_init_oauth={
         "clientId": "admin",
         "appName": "Admin API",
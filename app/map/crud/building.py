@@ -48,7 +48,7 @@ def get_all_buildings(db: Session, campus_id: Optional[int] = None, skip: int =
     return query.offset(skip).limit(limit).all()
 
 
-async def create_building(db: Session, building_data: dict, svg_file: Optional[UploadFile] = None):
+def create_building(db: Session, building_data: dict, svg_file: Optional[UploadFile] = None):
     """
     Создает новое здание.
     Если передан SVG-файл, он сохраняется, и путь записывается в базу данных.
@@ -74,7 +74,7 @@ async def create_building(db: Session, building_data: dict, svg_file: Optional[U
         )
 
 
-async def update_building(db: Session, building_id: int, update_data: dict, svg_file: Optional[UploadFile] = None):
+def update_building(db: Session, building_id: int, update_data: dict, svg_file: Optional[UploadFile] = None):
     """
     Обновляет существующее здание.
     Если передан новый SVG-файл, старый файл удаляется, а новый сохраняется.
@@ -14,7 +14,7 @@ def get_campus(db: Session, campus_id: int):
 def get_all_campuses(db: Session, skip: int = 0, limit: int = 100):
     return db.query(Campus).offset(skip).limit(limit).all()
 
-async def save_svg(file: UploadFile) -> str:
+def save_svg(file: UploadFile) -> str:
     """Save SVG file with UUID name"""
     if not file.filename.lower().endswith(".svg"):
         raise HTTPException(400, "Only SVG files allowed")
@@ -22,7 +22,7 @@ async def save_svg(file: UploadFile) -> str:
     unique_name = f"{uuid.uuid4().hex}.svg"
     file_path = os.path.join(SVG_DIR, unique_name)
 
-    contents = await file.read()
+    contents = file.file.read()
     with open(file_path, "wb") as f:
         f.write(contents)
 
@@ -35,7 +35,7 @@ def check_name_exists(db: Session, name: str, exclude_id: Optional[int] = None):
         query = query.filter(Campus.id != exclude_id)
     return query.first() is not None
 
-async def create_campus(
+def create_campus(
     db: Session,
     name: str,
     description: Optional[str],
@@ -46,7 +46,7 @@ async def create_campus(
         raise HTTPException(400, "Campus name already exists")
 
     # Handle file upload
-    image_path = await save_svg(svg_file) if svg_file else None
+    image_path = save_svg(svg_file) if svg_file else None
 
     # Create object
     db_campus = Campus(
@@ -60,7 +60,7 @@ async def create_campus(
     db.refresh(db_campus)
     return db_campus
 
-async def update_campus(
+def update_campus(
     db: Session,
     campus_id: int,
     update_data: dict,
@@ -101,7 +101,7 @@ async def update_campus(
         file_path = os.path.join(SVG_DIR, unique_name)
 
         # Сохранение
-        contents = await svg_file.read()
+        contents = svg_file.file.read()
         with open(file_path, "wb") as f:
             f.write(contents)
 
@@ -2,6 +2,7 @@ from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from app.map.models.connection import Connection
 from app.map.schemas.connection import ConnectionCreate, ConnectionUpdate
+from app.map.utils.patcher import MapChange, emit_map_change
 
 
 def validate_connection_data(data: dict):
@@ -35,6 +36,7 @@ def create_connection(db: Session, connection: ConnectionCreate):
     db.add(db_connection)
     db.commit()
     db.refresh(db_connection)
+    emit_map_change(db, MapChange.for_connection(db_connection))
     return db_connection
 
 
@@ -45,12 +47,15 @@ def update_connection(db: Session, connection_id: int, connection: ConnectionUpd
 
     update_data = connection.dict(exclude_unset=True)
     validate_connection_data(update_data)
+    # Концы соединения до изменения: их фантомные вершины нужно убрать из графа
+    before = MapChange.for_connection(db_connection)
 
     for key, value in update_data.items():
         setattr(db_connection, key, value)
 
     db.commit()
     db.refresh(db_connection)
+    emit_map_change(db, before | MapChange.for_connection(db_connection))
     return db_connection
 
 
@@ -58,6 +63,8 @@ def delete_connection(db: Session, connection_id: int):
     db_connection = get_connection(db, connection_id)
     if not db_connection:
         return None
+    change = MapChange.for_connection(db_connection)
     db.delete(db_connection)
     db.commit()
+    emit_map_change(db, change)
     return db_connection
\ No newline at end of file
@@ -6,6 +6,7 @@ from app.map.models.floor import Floor
 from app.map.models.connection import Connection
 from app.map.schemas.floor import FloorCreate, FloorUpdate
 from app.map.models.building import Building
+from app.map.utils.cache import invalidate_graph_cache
 import mimetypes
 
 # Директория для SVG-файлов этажей
@@ -55,7 +56,7 @@ def get_floors_by_campus_and_number(db: Session, campus_id: int, floor_number: i
     )
 
 # Создать этаж с соединениями
-async def create_floor_with_connections(db: Session, floor_data: FloorCreate, svg_file: Optional[UploadFile] = None):
+def create_floor_with_connections(db: Session, floor_data: FloorCreate, svg_file: Optional[UploadFile] = None):
     # Исключаем connections из словаря, так как это не поле модели Floor
     floor_dict = floor_data.dict(exclude={"connections"})
     if svg_file:
@@ -86,6 +87,7 @@ async def create_floor_with_connections(db: Session, floor_data: FloorCreate, sv
 
     db.commit()
     db.refresh(db_floor)
+    invalidate_graph_cache(db_floor.building_id)
     return db_floor
 
 # Обновить этаж
@@ -93,6 +95,7 @@ def update_floor(db: Session, floor_id: int, floor_data: FloorUpdate, svg_file:
     db_floor = get_floor(db, floor_id)
     if not db_floor:
         raise HTTPException(status_code=404, detail="Floor not found")
+    old_building_id = db_floor.building_id
 
     # Преобразуем FloorUpdate в словарь, исключая неустановленные поля
     update_data = floor_data.dict(exclude_unset=True)
@@ -132,6 +135,7 @@ def update_floor(db: Session, floor_id: int, floor_data: FloorUpdate, svg_file:
 
     db.commit()
     db.refresh(db_floor)
+    invalidate_graph_cache(old_building_id, db_floor.building_id)
     return db_floor
 
 # Удалить этаж
@@ -150,4 +154,5 @@ def delete_floor(db: Session, floor_id: int):
 
     db.delete(db_floor)
     db.commit()
+    invalidate_graph_cache(db_floor.building_id)
     return db_floor
\ No newline at end of file
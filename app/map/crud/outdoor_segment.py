@@ -4,6 +4,7 @@ from app.map.schemas.outdoor_segment import OutdoorSegmentCreate, OutdoorSegment
 from fastapi import HTTPException
 
 from app.map.models.connection import Connection
+from app.map.utils.patcher import MapChange, emit_map_change
 
 
 def get_outdoor_segment(db: Session, outdoor_segment_id: int):
@@ -37,14 +38,12 @@ def create_outdoor_segment(db: Session, outdoor_segment: OutdoorSegmentCreate):
         # Если переданы connections, создаем их
         if outdoor_segment.connections:
             for connection_data in outdoor_segment.connections:
-                db_connection = Connection(
-                    from_outdoor_id=db_outdoor_segment.id,
-                    **connection_data.dict()
-                )
+                db_connection = Connection(**{**connection_data.dict(), "from_outdoor_id": db_outdoor_segment.id})
                 db.add(db_connection)
 
         db.commit()
         db.refresh(db_outdoor_segment)
+        emit_map_change(db, MapChange(outdoors=[db_outdoor_segment.id]))
         return db_outdoor_segment
     except Exception as e:
         db.rollback()
@@ -71,14 +70,12 @@ def update_outdoor_segment(db: Session, outdoor_segment_id: int, outdoor_segment
         ).delete()
 
         for connection_data in outdoor_segment.connections:
-            db_connection = Connection(
-                from_outdoor_id=db_outdoor_segment.id,
-                **connection_data.dict()
-            )
+            db_connection = Connection(**{**connection_data.dict(), "from_outdoor_id": db_outdoor_segment.id})
             db.add(db_connection)
 
     db.commit()
     db.refresh(db_outdoor_segment)
+    emit_map_change(db, MapChange(outdoors=[outdoor_segment_id]))
     return db_outdoor_segment
 
 def delete_outdoor_segment(db: Session, outdoor_segment_id: int):
@@ -94,4 +91,5 @@ def delete_outdoor_segment(db: Session, outdoor_segment_id: int):
 
     db.delete(db_outdoor_segment)
     db.commit()
+    emit_map_change(db, MapChange(outdoors=[outdoor_segment_id]))
     return db_outdoor_segment
\ No newline at end of file
@@ -8,7 +8,11 @@ from app.map.models.building import Building
 from app.map.models.floor import Floor
 from app.map.schemas.room import RoomCreate, RoomUpdate
 from app.map.models.connection import Connection
+from app.map.utils.patcher import MapChange, emit_map_change
+from app.map.utils.spatial import add_room_connections, propose_room_connections
+from app.database.config.settings import settings
 import mimetypes
+import math
 
 ROOM_IMAGE_DIR = "static/images/rooms"
 os.makedirs(ROOM_IMAGE_DIR, exist_ok=True)
@@ -124,7 +128,7 @@ def search_rooms_by_name_or_cab_id(db: Session, query: str, campus_id: Optional[
         raise HTTPException(status_code=500, detail=f"Ошибка при поиске комнат: {str(e)}")
 
 
-async def create_room(db: Session, room_data: RoomCreate, image_file: Optional[UploadFile] = None):
+def create_room(db: Session, room_data: RoomCreate, image_file: Optional[UploadFile] = None):
     # Исключаем connections из словаря, так как это не поле модели Room
     room_dict = room_data.dict(exclude={"connections", "floor_number"})
 
@@ -183,19 +187,24 @@ async def create_room(db: Session, room_data: RoomCreate, image_file: Optional[U
                 db.add(db_connection)
             else:
                 raise HTTPException(status_code=400, detail="Соединения комнаты должны иметь segment_id")
+    elif settings.ROOM_AUTO_CONNECT:
+        # Без соединений комната недостижима: соединяем её с ближайшим сегментом этажа
+        add_room_connections(db, propose_room_connections(
+            db, Room.id == db_room.id, max_distance=settings.ROOM_AUTO_CONNECT_MAX_DISTANCE or math.inf
+        ), settings.ROOM_AUTO_CONNECT_WEIGHT)
 
     db.commit()
     db.refresh(db_room)
+    emit_map_change(db, MapChange(rooms=[db_room.id]))
 
     # Добавляем floor_number к объекту для соответствия RoomResponse
     db_room.floor_number = floor.floor_number
     return db_room
 
-async def update_room(db: Session, room_id: int, room_data: RoomUpdate, image_file: Optional[UploadFile] = None):
+def update_room(db: Session, room_id: int, room_data: RoomUpdate, image_file: Optional[UploadFile] = None):
     db_room = db.query(Room).filter(Room.id == room_id).first()
     if not db_room:
         raise HTTPException(status_code=404, detail="Room not found")
-
     # Обновляем только переданные поля комнаты
     update_data = room_data.dict(exclude_unset=True, exclude={"connections"})
 
@@ -240,6 +249,7 @@ async def update_room(db: Session, room_id: int, room_data: RoomUpdate, image_fi
 
     db.commit()
     db.refresh(db_room)
+    emit_map_change(db, MapChange(rooms=[room_id]))
     return db_room
 
 def delete_room(db: Session, room_id: int):
@@ -250,4 +260,25 @@ def delete_room(db: Session, room_id: int):
         os.remove(db_room.image_path[1:])
     db.delete(db_room)
     db.commit()
-    return db_room
\ No newline at end of file
+    emit_map_change(db, MapChange(rooms=[room_id]))
+    return db_room
+
+def auto_connect_rooms(db: Session, building_id: Optional[int] = None, floor_id: Optional[int] = None,
+                       max_distance: Optional[float] = None, create: bool = False, only_unconnected: bool = True):
+    """
+    Предлагает соединения комнат с ближайшими сегментами этажа (см. propose_room_connections),
+    при create=True создаёт их. Возвращает список предложений.
+    """
+    criteria = []
+    if building_id is not None:
+        criteria.append(Room.building_id == building_id)
+    if floor_id is not None:
+        criteria.append(Room.floor_id == floor_id)
+    if max_distance is None:
+        max_distance = settings.ROOM_AUTO_CONNECT_MAX_DISTANCE or math.inf
+    proposals = propose_room_connections(db, *criteria, max_distance=max_distance, only_unconnected=only_unconnected)
+    if create and proposals:
+        add_room_connections(db, proposals, settings.ROOM_AUTO_CONNECT_WEIGHT)
+        db.commit()
+        emit_map_change(db, MapChange(rooms=[proposal.room_id for proposal in proposals]))
+    return proposals
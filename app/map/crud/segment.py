@@ -5,6 +5,7 @@ from app.map.models.connection import Connection
 from app.map.schemas.segment import SegmentCreate
 from app.map.models.building import Building
 from app.map.models.floor import Floor
+from app.map.utils.patcher import MapChange, emit_map_change
 
 
 # Получить сегмент по ID
@@ -75,6 +76,7 @@ def create_segment_with_connections(db: Session, segment_data: SegmentCreate):
 
         db.commit()
         db.refresh(db_segment)
+        emit_map_change(db, MapChange(segments=[db_segment.id]))
         return db_segment
     except Exception as e:
         db.rollback()
@@ -85,7 +87,6 @@ def update_segment(db: Session, segment_id: int, segment_data: SegmentCreate):
     db_segment = get_segment(db, segment_id)
     if not db_segment:
         raise HTTPException(status_code=404, detail="Segment not found")
-
     # Обновляем только переданные поля сегмента
     update_data = segment_data.model_dump(exclude_unset=True, exclude={"connections"})
     for key, value in update_data.items():
@@ -141,6 +142,7 @@ def update_segment(db: Session, segment_id: int, segment_data: SegmentCreate):
 
     db.commit()
     db.refresh(db_segment)
+    emit_map_change(db, MapChange(segments=[segment_id]))
     return db_segment
 
 # Удалить сегмент
@@ -154,4 +156,5 @@ def delete_segment(db: Session, segment_id: int):
 
     db.delete(db_segment)
     db.commit()
+    emit_map_change(db, MapChange(segments=[segment_id]))
     return db_segment
\ No newline at end of file
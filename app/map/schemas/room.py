@@ -66,4 +66,33 @@ class RoomSearchResponse(BaseModel):
     image_path: Optional[str] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+# Предложенное соединение комнаты с ближайшим сегментом этажа
+class ProposedConnectionResponse(BaseModel):
+    room_id: int
+    segment_id: int
+    distance: float = Field(..., description="Расстояние от входа в кабинет до сегмента")
+
+# Схема ответа автоматического соединения комнат с коридорами
+class AutoConnectResponse(BaseModel):
+    created: bool = Field(..., description="Соединения созданы (иначе только предложены)")
+    connections: List[ProposedConnectionResponse]
+
+# Комната, найденная по точке
+class RoomHit(BaseModel):
+    id: int
+    name: str
+    cab_id: str
+    building_id: int
+    floor_id: int
+
+# Сегмент коридора, ближайший к точке
+class SegmentHit(BaseModel):
+    id: int
+    floor_id: int
+    distance: float = Field(..., description="Расстояние от точки до сегмента")
+
+# Схема ответа поиска по точке
+class HitTestResponse(BaseModel):
+    room: Optional[RoomHit] = Field(None, description="Комната, в многоугольнике которой лежит точка")
+    segment: Optional[SegmentHit] = Field(None, description="Ближайший сегмент, если точка не попала в комнату")
@@ -0,0 +1,37 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+
+# Схема запроса матрицы расстояний
+class RouteMatrixRequest(BaseModel):
+    sources: List[str] = Field(..., description="Начальные комнаты в формате room_<id>")
+    targets: List[str] = Field(..., description="Конечные комнаты в формате room_<id>")
+    next_hop: bool = Field(False, description="Вернуть первую вершину пути для каждой пары")
+
+# Схема ответа матрицы расстояний
+class RouteMatrixResponse(BaseModel):
+    sources: List[str]
+    targets: List[str]
+    distances: List[List[Optional[float]]] = Field(..., description="Веса кратчайших путей, null — путь не найден")
+    next_hops: Optional[List[List[Optional[str]]]] = Field(None, description="Первая вершина пути из источника к цели")
+
+
+# Пара концов пакетного запроса маршрутов
+class RoutePair(BaseModel):
+    start: str = Field(..., description="Начальная комната room_<id> или точка карты point_<building_id>_<floor_number>_<x>_<y>")
+    end: str = Field(..., description="Конечная комната room_<id> или точка карты point_<building_id>_<floor_number>_<x>_<y>")
+
+# Схема пакетного запроса маршрутов
+class RouteBatchRequest(BaseModel):
+    pairs: List[RoutePair] = Field(..., description="Пары комнат, маршрут для каждой строится независимо")
+
+# Результат для одной пары: маршрут или ошибка
+class RouteBatchItem(BaseModel):
+    start: str
+    end: str
+    status: int = Field(..., description="HTTP-код результата для пары: 200 или код ошибки, как у /route")
+    route: Optional[Dict[str, Any]] = Field(None, description="Маршрут в формате ответа /route")
+    error: Optional[str] = Field(None, description="Описание ошибки, если маршрут не построен")
+
+# Схема ответа пакетного запроса маршрутов
+class RouteBatchResponse(BaseModel):
+    results: List[RouteBatchItem] = Field(..., description="Результаты в порядке пар запроса")
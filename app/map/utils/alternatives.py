@@ -0,0 +1,114 @@
+# app/map/utils/alternatives.py
+from typing import Dict, FrozenSet, List, Optional, Tuple
+import logging
+
+from .graph import Graph
+from .pathfinder import dijkstra
+
+logger = logging.getLogger(__name__)
+
+
+def alternative_paths(
+    graph: Graph,
+    start: str,
+    end: str,
+    shortest: List[str],
+    weight: float,
+    count: int,
+    max_stretch: float = 1.5,
+    max_overlap: float = 0.7,
+    min_plateau: float = 0.1,
+) -> List[Tuple[List[str], float]]:
+    """
+    До count альтернатив кратчайшему пути shortest (вес weight) методом промежуточной вершины.
+
+    Строятся два дерева кратчайших путей — от start и от end — в пределах max_stretch * weight.
+    Путь через вершину v — ветка первого дерева до v и ветка второго от v: для него не нужен
+    новый поиск, поэтому k альтернатив стоят столько же, сколько одна. Кандидаты группируются
+    по «плато» — участкам, общим для обоих деревьев (через все вершины плато проходит один и тот
+    же путь); длинное плато означает естественную альтернативу, например другую лестницу или
+    другой выход из здания. Плато короче min_plateau * weight не рассматриваются (короткое плато —
+    признак пути с лишним крюком). Путь отбрасывается, если он длиннее max_stretch * weight,
+    содержит петлю или совпадает с уже выбранными путями больше чем на max_overlap по весу.
+    Возвращает пары (путь, вес) в порядке выбора, без самого shortest.
+    """
+    if count <= 0 or not shortest:
+        return []
+
+    limit = weight * max_stretch
+    forward, forward_parents = dijkstra(graph, start, limit)
+    backward, backward_parents = dijkstra(graph, end, limit)
+
+    chosen = [_edge_weights(graph, shortest)]
+    alternatives: List[Tuple[List[str], float]] = []
+    for total, head in _plateaus(forward, forward_parents, backward, backward_parents, limit, min_plateau * weight):
+        if head not in (start, end) and forward_parents.get(head) == backward_parents.get(head):
+            continue  # Разворот в тупике (например, заход в чужую комнату) — сразу без сборки пути
+        path = _tree_path(forward_parents, start, head)[::-1][:-1] + _tree_path(backward_parents, end, head)
+        if len(set(path)) != len(path):
+            continue  # Ветки деревьев пересекаются — путь с петлёй
+        edges = _edge_weights(graph, path)
+        if any(_overlap(edges, other) > max_overlap * total for other in chosen):
+            continue
+        chosen.append(edges)
+        alternatives.append((path, total))
+        if len(alternatives) == count:
+            break
+
+    logger.info(f"Найдено альтернативных путей от {start} до {end}: {len(alternatives)} из {count}")
+    return alternatives
+
+
+def _plateaus(
+    forward: Dict[str, float],
+    forward_parents: Dict[str, str],
+    backward: Dict[str, float],
+    backward_parents: Dict[str, str],
+    limit: float,
+    min_length: float,
+) -> List[Tuple[float, str]]:
+    # Ребро (u, v) лежит на плато, если u — предок v в дереве от start, а v — следующая
+    # вершина после u в дереве от end. Плато — цепочка таких рёбер; от начала плато путь
+    # идёт по дереву от start, дальше по дереву от end
+    candidates = {vertex for vertex, distance in forward.items() if distance + backward.get(vertex, limit + 1) <= limit}
+
+    def plateau_next(vertex: str) -> Optional[str]:
+        following = backward_parents.get(vertex)
+        return following if following in candidates and forward_parents.get(following) == vertex else None
+
+    plateaus = []
+    for vertex in candidates:
+        parent = forward_parents.get(vertex)
+        if parent is not None and plateau_next(parent) == vertex:
+            continue  # Не начало плато
+        tail = vertex
+        while True:
+            following = plateau_next(tail)
+            if following is None:
+                break
+            tail = following
+        length = forward[tail] - forward[vertex]
+        if length < min_length:
+            continue
+        plateaus.append((length, forward[vertex] + backward[vertex], vertex))
+
+    # Сначала длинные плато, при равной длине — более короткие пути; имя вершины — для детерминизма
+    plateaus.sort(key=lambda item: (-item[0], item[1], item[2]))
+    return [(total, head) for _, total, head in plateaus]
+
+
+def _tree_path(parents: Dict[str, str], root: str, vertex: str) -> List[str]:
+    # Путь от vertex к корню дерева
+    path = [vertex]
+    while vertex != root:
+        vertex = parents[vertex]
+        path.append(vertex)
+    return path
+
+
+def _edge_weights(graph: Graph, path: List[str]) -> Dict[FrozenSet[str], float]:
+    return {frozenset((a, b)): graph.get_edge_weight(a, b) for a, b in zip(path, path[1:])}
+
+
+def _overlap(edges: Dict[FrozenSet[str], float], other: Dict[FrozenSet[str], float]) -> float:
+    return sum(weight for edge, weight in edges.items() if edge in other)
@@ -0,0 +1,240 @@
+# app/map/utils/assembly.py
+from typing import Dict, List, Optional, Tuple
+import math
+import logging
+
+from sqlalchemy.orm import Session, aliased
+
+from app.map.models.room import Room
+from app.map.models.floor import Floor
+from app.map.models.connection import Connection
+
+logger = logging.getLogger(__name__)
+
+# Точки пути ближе DEDUP_RADIUS по обеим осям к уже принятой точке того же этажа отбрасываются
+DEDUP_RADIUS = 5
+# Ячейка сетки вдвое больше радиуса: все точки, которые могут совпасть, лежат в соседних ячейках
+GRID_CELL = DEDUP_RADIUS * 2
+
+
+def assemble_route(db: Session, graph, start: str, end: str, path: List[str], weight: float) -> dict:
+    """
+    Собирает ответ /route для найденного (уже отфильтрованного) пути: точки по этажам, вес и инструкции.
+    Работает за линейное время от длины пути и загружает из БД только соединения-лестницы
+    и комнаты, которые встречаются на пути.
+    """
+    filtered_points = _dedupe_points(graph, path)
+    stair_connections = _load_stair_connections(db, filtered_points)
+    rooms = _load_rooms(db, start, end)
+
+    result = []
+    current_floor = None
+    floor_points = []
+    instructions = []
+    seen_vertices = set()
+
+    for i, point in enumerate(filtered_points):
+        vertex = point["vertex"]
+        x, y, floor = point["x"], point["y"], point["floor"]
+
+        if vertex not in seen_vertices:
+            if floor != current_floor:
+                if floor_points:
+                    result.append({"floor": current_floor, "points": floor_points})
+                floor_points = []
+                current_floor = floor
+            floor_points.append({"x": x, "y": y, "vertex": vertex, "floor": floor})
+            seen_vertices.add(vertex)
+
+        if i == len(filtered_points) - 1:
+            continue
+
+        next_vertex = filtered_points[i + 1]["vertex"]
+        edge_data = graph.get_edge_data(vertex, next_vertex)
+        edge_type = edge_data.get("type")
+        if edge_type == "лестница":
+            next_floor = filtered_points[i + 1]["floor"]
+
+            stair = _parse_stair(vertex)
+            stair_floors = stair_connections.get(stair) if stair else None
+            if stair_floors:
+                from_seg, to_seg = stair
+                stair_end_vertex = f"stair_end_{from_seg}_to_{to_seg}"
+                # Вершина phantom_stair_<from>_to_<to> стоит на этаже сегмента from, _from_ — на этаже to
+                stair_floor = stair_floors[0] if "_to_" in vertex else stair_floors[1]
+                if floor_points[-1]["floor"] != stair_floor:
+                    result.append({"floor": current_floor, "points": floor_points})
+                    floor_points = []
+                    current_floor = stair_floor
+                if stair_end_vertex not in seen_vertices:
+                    floor_points.append({"x": x, "y": y, "vertex": stair_end_vertex, "floor": stair_floor})
+                    seen_vertices.add(stair_end_vertex)
+
+            # Соединение сегментов одного этажа тоже строится как «лестница», но этаж не меняет
+            if next_floor != floor:
+                means = "на лифте" if edge_data.get("connection") == "лифт" else "по лестнице"
+                if not _recent(instructions, means):
+                    verb = "Поднимитесь" if next_floor > floor else "Спуститесь"
+                    instructions.append(f"{verb} {means} с {floor}-го на {next_floor}-й этаж")
+
+        elif edge_type == "дверь":
+            if next_vertex.startswith("outdoor_") and not _recent(instructions, "выйдите"):
+                instructions.append("Выйдите из здания через дверь")
+            elif vertex.startswith("outdoor_") and not _recent(instructions, "войдите"):
+                instructions.append("Войдите в здание через дверь")
+
+    if floor_points:
+        result.append({"floor": current_floor, "points": floor_points})
+
+    directions = _directions(result, rooms.get(start), rooms.get(end))
+    final_instructions = _merge_instructions(instructions, directions)
+
+    # Добавляем пункт прибытия
+    if end in rooms:
+        final_instructions.append(f"Вы прибыли в {rooms[end].name} {rooms[end].cab_id} кабинет")
+
+    logger.info(f"Маршрут сформирован: путь={result}, вес={weight}, инструкции={final_instructions}")
+    return {"path": result, "weight": weight, "instructions": final_instructions}
+
+
+def _dedupe_points(graph, path: List[str]) -> List[dict]:
+    # Точки раскладываются по ячейкам сетки этажа, поэтому каждая новая точка сравнивается
+    # только с принятыми точками из 9 соседних ячеек, а не со всеми предыдущими.
+    # Точки разных этажей не совпадают: лестница обычно стоит в одних координатах на обоих этажах
+    points: List[dict] = []
+    grid: Dict[Tuple[int, int, int], List[dict]] = {}
+    for vertex in path:
+        vertex_data = graph.get_vertex_data(vertex)
+        if not vertex_data or "coords" not in vertex_data:
+            raise ValueError(f"Некорректные данные для вершины {vertex}")
+        x, y, floor = vertex_data["coords"]
+        if x is None or y is None:
+            if len(path) > 1:
+                raise ValueError(f"Отсутствуют координаты вершины {vertex}")
+            points.append({"x": x, "y": y, "vertex": vertex, "floor": floor})
+            continue
+
+        cx, cy = math.floor(x / GRID_CELL), math.floor(y / GRID_CELL)
+        duplicate = any(
+            abs(x - fp["x"]) <= DEDUP_RADIUS and abs(y - fp["y"]) <= DEDUP_RADIUS
+            for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+            for fp in grid.get((floor, cx + dx, cy + dy), ())
+        )
+        if not duplicate:
+            point = {"x": x, "y": y, "vertex": vertex, "floor": floor}
+            points.append(point)
+            grid.setdefault((floor, cx, cy), []).append(point)
+    return points
+
+
+def _parse_stair(vertex: str) -> Optional[Tuple[int, int]]:
+    """(from_segment_id, to_segment_id) соединения для phantom_stair_<from>_to_<to>[_far] и phantom_stair_<to>_from_<from>[_far]."""
+    if "stair" not in vertex:
+        return None
+    parts = vertex.split("_")
+    if len(parts) < 5:
+        return None
+    if parts[3] == "from":
+        return int(parts[4]), int(parts[2])
+    return int(parts[2]), int(parts[4])
+
+
+def _load_stair_connections(db: Session, points: List[dict]) -> Dict[Tuple[int, int], Tuple[int, int]]:
+    """Номера этажей (from, to) переходов между этажами на пути по паре сегментов соединения."""
+    pairs = set()
+    for point in points:
+        try:
+            stair = _parse_stair(point["vertex"])
+        except (ValueError, IndexError):
+            continue  # Ошибка разбора проявится при сборке маршрута
+        if stair:
+            pairs.add(stair)
+    if not pairs:
+        return {}
+
+    # Переходы любого типа (лестница, лифт, горка) соединяют два сегмента и два этажа
+    from_floor, to_floor = aliased(Floor), aliased(Floor)
+    connections = (
+        db.query(Connection.from_segment_id, Connection.to_segment_id, from_floor.floor_number, to_floor.floor_number)
+        .join(from_floor, from_floor.id == Connection.from_floor_id)
+        .join(to_floor, to_floor.id == Connection.to_floor_id)
+        .filter(
+            Connection.from_segment_id.in_({from_seg for from_seg, _ in pairs}),
+            Connection.to_segment_id.in_({to_seg for _, to_seg in pairs}),
+        )
+        .order_by(Connection.id)
+    )
+    return {(conn[0], conn[1]): (conn[2], conn[3]) for conn in connections}
+
+
+def _load_rooms(db: Session, *vertices: str) -> Dict[str, Room]:
+    room_ids = set()
+    for vertex in vertices:
+        if vertex.startswith("room_") and vertex[len("room_"):].isdigit():
+            room_ids.add(int(vertex[len("room_"):]))
+    if not room_ids:
+        return {}
+    return {f"room_{room.id}": room for room in db.query(Room).filter(Room.id.in_(room_ids))}
+
+
+def _recent(instructions: List[str], word: str) -> bool:
+    # Повтор одной и той же инструкции подавляется, если она была среди двух последних
+    return any(word in instruction.lower() for instruction in instructions[-2:])
+
+
+def _directions(result: List[dict], start_room: Optional[Room], end_room: Optional[Room]) -> List[str]:
+    # Генерация направлений на основе координат
+    directions = []
+    for k, floor_data in enumerate(result):
+        # Точки в тех же координатах (конец лестницы stair_end_*) не дают направления
+        floor_points = []
+        for point in floor_data["points"]:
+            if not floor_points or (point["x"], point["y"]) != (floor_points[-1]["x"], floor_points[-1]["y"]):
+                floor_points.append(point)
+        for j in range(len(floor_points) - 1):
+            current = floor_points[j]
+            next_point = floor_points[j + 1]
+            prev_point = floor_points[j - 1] if j > 0 else None
+
+            dx = next_point["x"] - current["x"]
+            dy = next_point["y"] - current["y"]
+            angle = math.degrees(math.atan2(dy, dx))
+
+            if prev_point:
+                prev_dx = current["x"] - prev_point["x"]
+                prev_dy = current["y"] - prev_point["y"]
+                prev_angle = math.degrees(math.atan2(prev_dy, prev_dx))
+                turn_angle = (angle - prev_angle + 180) % 360 - 180
+                if -45 <= turn_angle <= 45:
+                    direction = "Идите прямо"
+                elif -135 <= turn_angle < -45:
+                    direction = "Поверните налево"
+                elif 45 < turn_angle <= 135:
+                    direction = "Поверните направо"
+                else:
+                    direction = "Развернитесь"
+            elif k == 0:
+                direction = f"Начните движение из {start_room.name} {start_room.cab_id} кабинет" if start_room else "Начните движение"
+            else:
+                continue  # Первая точка следующего этажа: переход уже описан инструкцией лестницы или лифта
+
+            directions.append(direction)
+    return directions
+
+
+def _merge_instructions(instructions: List[str], directions: List[str]) -> List[str]:
+    # Формирование итоговых инструкций с приоритетом начала
+    final_instructions = []
+    if directions and "Начните движение" in directions[0]:
+        final_instructions.append(directions[0])
+        directions = directions[1:]
+    instr_idx = 0
+    dir_idx = 0
+    while instr_idx < len(instructions) or dir_idx < len(directions):
+        if instr_idx < len(instructions):
+            final_instructions.append(instructions[instr_idx])
+            instr_idx += 1
+        if dir_idx < len(directions) and (instr_idx >= len(instructions) or "лестнице" not in instructions[instr_idx - 1].lower() and "лифте" not in instructions[instr_idx - 1].lower() and "дверь" not in instructions[instr_idx - 1].lower()):
+            final_instructions.append(directions[dir_idx])
+            dir_idx += 1
+    return final_instructions
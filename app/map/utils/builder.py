@@ -1,4 +1,14 @@
+from itertools import combinations
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Union
 from .graph import Graph
+from .compact import CompactGraph
+from .cache import graph_cache, map_change_listeners
+from .landmarks import build_landmarks
+from .contraction import ContractionHierarchy
+from .shared import schedule_republish, shared_graph, shared_graphs
+from .points import is_point, parse_point
+from app.database.config.settings import settings
+from app.map.models.building import Building
 from app.map.models.room import Room
 from app.map.models.segment import Segment
 from app.map.models.outdoor_segment import OutdoorSegment
@@ -10,178 +20,328 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-def build_graph(db: Session, start: str, end: str) -> Graph:
+def build_graph(db: Session, start: str, end: str) -> Union[Graph, CompactGraph]:
     logger.info(f"Начало построения графа для start={start}, end={end}")
-    graph = Graph()
+
+    # Точка карты point_<building>_<floor>_<x>_<y> сама задаёт здание; вершина для неё
+    # добавляется к графу на время запроса (with_points)
+    point_buildings = {vertex: parse_point(vertex).building_id for vertex in (start, end) if is_point(vertex)}
+    room_vertices = [vertex for vertex in (start, end) if vertex not in point_buildings]
 
     # Проверка начальной и конечной комнаты
     try:
-        start_id = int(start.replace("room_", ""))
-        end_id = int(end.replace("room_", ""))
-        start_room = db.query(Room).filter(Room.id == start_id).first()
-        end_room = db.query(Room).filter(Room.id == end_id).first()
-        if not start_room or not end_room:
-            logger.error(f"Комната с id {start_id} или {end_id} не найдена")
-            raise ValueError(f"Комната с id {start_id} или {end_id} не найдена")
+        room_ids = {int(vertex.replace("room_", "")) for vertex in room_vertices}
+        found_rooms = {
+            room.id: room
+            for room in db.query(Room.id, Room.building_id).filter(Room.id.in_(room_ids)).all()
+        } if room_ids else {}
+        missing = room_ids - set(found_rooms)
+        if missing:
+            logger.error(f"Комната с id {sorted(missing)} не найдена")
+            raise ValueError(f"Комната с id {sorted(missing)} не найдена")
     except ValueError as e:
         logger.error(f"Ошибка при парсинге ID комнат из {start} или {end}: {e}")
         raise ValueError(f"Неверный формат комнаты, ожидается room_<id>, получено {start} или {end}")
 
-    # Получение этажей
-    start_floor = db.query(Floor).filter(Floor.id == start_room.floor_id).first()
-    end_floor = db.query(Floor).filter(Floor.id == end_room.floor_id).first()
-    start_floor_number = start_floor.floor_number if start_floor else start_room.floor_id
-    end_floor_number = end_floor.floor_number if end_floor else end_room.floor_id
-    building_ids = {start_room.building_id, end_room.building_id} - {None}
-    floor_ids = {start_room.floor_id, end_room.floor_id}
-    logger.info(f"Актуальные ID зданий: {building_ids}, этажей: {floor_ids}")
+    # Здание точки берётся из её имени: несуществующее здание дало бы пустой граф в кеше
+    unknown = missing_building_ids(db, point_buildings.values())
+    if unknown:
+        logger.error(f"Здание с id {sorted(unknown)} не найдено")
+        raise ValueError(f"Здание с id {sorted(unknown)} не найдено")
+
+    building_ids = ({room.building_id for room in found_rooms.values()} | set(point_buildings.values())) - {None}
+    logger.info(f"Актуальные ID зданий: {building_ids}")
+    return get_graph(db, building_ids)
+
+
+def build_graph_for_rooms(db: Session, vertices: List[str]) -> Union[Graph, CompactGraph]:
+    """Граф, в котором есть все переданные комнаты room_<id> (для матриц и пакетных запросов)."""
+    try:
+        room_ids = {int(vertex.replace("room_", "")) for vertex in vertices}
+    except ValueError:
+        raise ValueError(f"Неверный формат комнаты, ожидается room_<id>, получено {vertices}")
+
+    building_ids = {}
+    for room in db.query(Room.id, Room.building_id).filter(Room.id.in_(room_ids)).all():
+        building_ids[room.id] = room.building_id
+    missing = room_ids - set(building_ids)
+    if missing:
+        raise ValueError(f"Комнаты с id {sorted(missing)} не найдены")
+    return get_graph(db, set(building_ids.values()) - {None})
+
+
+def missing_building_ids(db: Session, building_ids: Iterable[int]) -> Set[int]:
+    """ID из building_ids, которых нет в таблице зданий (один запрос)."""
+    building_ids = set(building_ids)
+    if not building_ids:
+        return set()
+    return building_ids - {building.id for building in db.query(Building.id).filter(Building.id.in_(building_ids))}
+
+
+def endpoint_building_ids(db: Session, vertices: Iterable[str]) -> Dict[str, Optional[int]]:
+    """
+    Здания концов маршрута: комнат room_<id> — одним запросом, точек карты
+    point_<building>_<floor>_<x>_<y> — из имени точки, как в build_graph.
+    Имена неверного формата, отсутствующие комнаты и точки несуществующих зданий
+    в результат не попадают.
+    """
+    result = {}
+    vertices_by_id = {}
+    for vertex in vertices:
+        if is_point(vertex):
+            try:
+                result[vertex] = parse_point(vertex).building_id
+            except ValueError:
+                pass
+        elif vertex.startswith("room_") and vertex[len("room_"):].isdigit():
+            vertices_by_id[int(vertex[len("room_"):])] = vertex
+    unknown = missing_building_ids(db, result.values())
+    result = {vertex: building_id for vertex, building_id in result.items() if building_id not in unknown}
+    if vertices_by_id:
+        rooms = db.query(Room.id, Room.building_id).filter(Room.id.in_(vertices_by_id)).all()
+        result.update({vertices_by_id[room.id]: room.building_id for room in rooms})
+    return result
+
+
+def get_graph(db: Session, building_ids: Set[int]) -> Union[Graph, CompactGraph]:
+    # Публикация новой версии в разделяемой памяти сбрасывает графы, закешированные воркером
+    shared = shared_graphs()
+    if shared is not None and shared.refresh():
+        graph_cache.invalidate()
+
+    key = frozenset(building_ids)
+
+    def loader():
+        graph = load_graph(db, building_ids)
+        build_landmarks(graph, settings.GRAPH_LANDMARKS, settings.GRAPH_LANDMARK_STRATEGY)
+        if settings.ROUTE_SEARCH_MODE == "ch":
+            graph.hierarchy = ContractionHierarchy(graph)
+        return CompactGraph.from_graph(graph) if settings.GRAPH_COMPACT else graph
+
+    # Граф зависит только от набора зданий, поэтому берём его из кеша;
+    # графы из разделяемой памяти кешируются без TTL
+    return graph_cache.get_or_build(key, loader, pinned=lambda: shared_graph(db, key))
+
+
+def build_snapshot_graphs(db: Session, pairs: bool = True) -> Dict[FrozenSet[int], CompactGraph]:
+    """
+    Графы для снимка (файл или разделяемая память): для каждого здания и, если pairs,
+    для каждой пары зданий одного кампуса — те же наборы, которые запрашивает build_graph
+    (маршрут между кампусами не строится, уличные сегменты у каждого кампуса свои).
+    """
+    campuses: Dict[Optional[int], List[int]] = {}
+    for building in db.query(Building.id, Building.campus_id).order_by(Building.id):
+        campuses.setdefault(building.campus_id, []).append(building.id)
+    keys = [frozenset({building_id}) for building_ids in campuses.values() for building_id in building_ids]
+    if pairs:
+        keys += [frozenset(pair) for building_ids in campuses.values() for pair in combinations(building_ids, 2)]
+
+    graphs = {}
+    for key in keys:
+        graph = load_graph(db, set(key))
+        build_landmarks(graph, settings.GRAPH_LANDMARKS, settings.GRAPH_LANDMARK_STRATEGY)
+        graphs[key] = CompactGraph.from_graph(graph)
+    return graphs
+
+
+# Изменения карты из CRUD заново публикуют графы в разделяемой памяти (с задержкой, одной сборкой)
+map_change_listeners.append(lambda: schedule_republish(build_snapshot_graphs))
+
+
+def load_graph(db: Session, building_ids: Set[int]) -> Graph:
+    logger.info(f"Загрузка графа из БД для зданий {building_ids}")
+    graph = Graph()
 
     # Определяем, нужно ли включать уличные сегменты
     include_outdoor = len(building_ids) > 1  # Если здания разные, включаем уличные сегменты
 
-    # Добавление комнат
-    rooms = db.query(Room).filter(Room.building_id.in_(building_ids)).all()
+    # Добавление комнат (номер этажа берём JOIN-ом, без запроса на каждую комнату)
+    rooms = query_rooms(db, Room.building_id.in_(building_ids))
     for room in rooms:
-        if not hasattr(room, 'floor_id'):
-            logger.error(f"Объект комнаты не имеет атрибута floor_id: {room}")
-            raise ValueError(f"Некорректный объект комнаты: {room}")
-        floor = db.query(Floor).filter(Floor.id == room.floor_id).first()
-        floor_number = floor.floor_number if floor else room.floor_id
-        vertex = f"room_{room.id}"
-        graph.add_vertex(vertex, {"coords": (room.cab_x, room.cab_y, floor_number), "building_id": room.building_id})
+        add_room(graph, room)
 
     # Добавление сегментов
-    segments = {}
-    floor_numbers = {}
-    segment_query = db.query(Segment).filter(Segment.building_id.in_(building_ids)).all()
-    for segment in segment_query:
-        floor = db.query(Floor).filter(Floor.id == segment.floor_id).first()
-        floor_number = floor.floor_number if floor else segment.floor_id
-        floor_numbers[segment.id] = floor_number
-        start_vertex = f"segment_{segment.id}_start"
-        end_vertex = f"segment_{segment.id}_end"
-        graph.add_vertex(start_vertex, {"coords": (segment.start_x, segment.start_y, floor_number), "building_id": segment.building_id})
-        graph.add_vertex(end_vertex, {"coords": (segment.end_x, segment.end_y, floor_number), "building_id": segment.building_id})
-        segments[segment.id] = (start_vertex, end_vertex)
-        weight = max(0.1, math.sqrt((segment.end_x - segment.start_x) ** 2 + (segment.end_y - segment.start_y) ** 2))
-        graph.add_edge(start_vertex, end_vertex, weight, {"type": "segment"})
+    segment_rows = {}
+    for segment in query_segments(db, Segment.building_id.in_(building_ids)):
+        segment_rows[segment.id] = segment
+        add_segment(graph, segment)
 
     # Добавление уличных сегментов (только если нужно)
-    outdoor_segments = {}
+    outdoor_ids = set()
     if include_outdoor:
         for outdoor in db.query(OutdoorSegment).all():
-            start_vertex = f"outdoor_{outdoor.id}_start"
-            end_vertex = f"outdoor_{outdoor.id}_end"
-            coords_start = (outdoor.start_x, outdoor.start_y, 1)
-            coords_end = (outdoor.end_x, outdoor.end_y, 1)
-            graph.add_vertex(start_vertex, {"coords": coords_start, "building_id": None})
-            graph.add_vertex(end_vertex, {"coords": coords_end, "building_id": None})
-            weight = outdoor.weight if outdoor.weight else max(0.1, math.sqrt((outdoor.end_x - outdoor.start_x) ** 2 + (outdoor.end_y - outdoor.start_y) ** 2))
-            graph.add_edge(start_vertex, end_vertex, weight, {"type": "outdoor"})
-            outdoor_segments[outdoor.id] = (start_vertex, end_vertex)
+            add_outdoor(graph, outdoor)
+            outdoor_ids.add(outdoor.id)
+
+    # Все соединения загружаем одним запросом и группируем по комнатам в памяти
+    all_connections = query_connections(db)
+    room_connections = {}
+    for conn in all_connections:
+        if conn.room_id is not None:
+            room_connections.setdefault(conn.room_id, []).append(conn)
 
     # Соединение комнат с сегментами
     for room in rooms:
-        room_vertex = f"room_{room.id}"
-        connections = db.query(Connection).filter(Connection.room_id == room.id).all()
-        for conn in connections:
-            if conn.segment_id and conn.segment_id in segments:
-                segment_start, segment_end = segments[conn.segment_id]
-                phantom_vertex = f"phantom_room_{room.id}_segment_{conn.segment_id}"
-                floor = db.query(Floor).filter(Floor.id == room.floor_id).first()
-                floor_number = floor.floor_number if floor else room.floor_id
-                # Получаем данные сегмента
-                segment_data = db.query(Segment).filter(Segment.id == conn.segment_id).first()
-                if segment_data:
-                    # Определяем, вертикальный или горизонтальный сегмент
-                    if segment_data.start_x == segment_data.end_x:  # Вертикальный сегмент
-                        x = segment_data.start_x  # X сегмента
-                        y = room.cab_y  # Y комнаты
-                    else:  # Горизонтальный сегмент
-                        x = room.cab_x  # X комнаты
-                        y = segment_data.start_y  # Y сегмента
-                    coords = (x, y, floor_number)
-                else:
-                    coords = (room.cab_x, room.cab_y, floor_number)  # По умолчанию координаты комнаты
-                graph.add_vertex(phantom_vertex, {"coords": coords, "building_id": room.building_id})
-                weight = conn.weight if conn.weight else 2.0
-                graph.add_edge(room_vertex, phantom_vertex, weight, {"type": "phantom"})
-                graph.add_edge(phantom_vertex, segment_start, weight, {"type": "segment"})
-                graph.add_edge(phantom_vertex, segment_end, weight, {"type": "segment"})
-
-    # Обработка соединений
-    # Обработка соединений (лестниц)
-    for conn in db.query(Connection).all():
-        if conn.from_segment_id and conn.to_segment_id:
-            if conn.from_segment_id not in segments or conn.to_segment_id not in segments:
-                continue
-            from_start, from_end = segments[conn.from_segment_id]
-            to_start, to_end = segments[conn.to_segment_id]
-            from_floor = floor_numbers[conn.from_segment_id]
-            to_floor = floor_numbers[conn.to_segment_id]
-
-            # Получаем данные сегментов из базы
-            from_segment = db.query(Segment).filter(Segment.id == conn.from_segment_id).first()
-            to_segment = db.query(Segment).filter(Segment.id == conn.to_segment_id).first()
-
-            if from_segment and to_segment:
-                # Для верхнего этажа (from_segment) — конец сегмента
-                from_coords = (from_segment.end_x, from_segment.end_y, from_floor)
-                # Для нижнего этажа (to_segment) — начало сегмента
-                to_coords = (to_segment.start_x, to_segment.start_y, to_floor)
-
-                # Создаём фантомные точки для лестницы
-                phantom_from = f"phantom_stair_{conn.from_segment_id}_to_{conn.to_segment_id}"
-                phantom_to = f"phantom_stair_{conn.to_segment_id}_from_{conn.from_segment_id}"
-                graph.add_vertex(phantom_from, {"coords": from_coords, "building_id": None})
-                graph.add_vertex(phantom_to, {"coords": to_coords, "building_id": None})
-
-                # Соединяем всё правильно
-                weight = conn.weight if conn.weight else 2.0
-                graph.add_edge(from_end, phantom_from, weight, {"type": "segment"})  # Конец сегмента 9 -> лестница
-                graph.add_edge(phantom_from, phantom_to, weight, {"type": "лестница"})  # Лестница вниз
-                graph.add_edge(phantom_to, to_start, weight, {"type": "segment"})  # Лестница -> начало сегмента 7
-                graph.add_edge(phantom_to, to_end, weight, {"type": "segment"})  # Для полноты пути
-
-        # Дверь-улица (только если нужно)
-        elif include_outdoor and conn.from_segment_id and conn.to_outdoor_id:
-            if conn.from_segment_id not in segments or conn.to_outdoor_id not in outdoor_segments:
-                continue
-            from_start, from_end = segments[conn.from_segment_id]
-            to_start, to_end = outdoor_segments[conn.to_outdoor_id]
-            phantom_from = f"phantom_segment_{conn.from_segment_id}_to_outdoor_{conn.to_outdoor_id}"
-            from_coords = graph.get_vertex_data(from_end)["coords"]
-            graph.add_vertex(phantom_from, {"coords": from_coords, "building_id": None})
-            weight = conn.weight if conn.weight else 2.0
-            graph.add_edge(from_start, phantom_from, weight, {"type": "segment"})
-            graph.add_edge(from_end, phantom_from, weight, {"type": "segment"})
-            graph.add_edge(phantom_from, to_start, weight, {"type": "дверь"})
-            graph.add_edge(phantom_from, to_end, weight, {"type": "дверь"})
-
-        # Улица-дверь (только если нужно)
-        elif include_outdoor and conn.from_outdoor_id and conn.to_segment_id:
-            if conn.from_outdoor_id not in outdoor_segments or conn.to_segment_id not in segments:
-                continue
-            from_start, from_end = outdoor_segments[conn.from_outdoor_id]
-            to_start, to_end = segments[conn.to_segment_id]
-            phantom_to = f"phantom_segment_{conn.to_segment_id}_from_outdoor_{conn.from_outdoor_id}"
-            to_coords = graph.get_vertex_data(to_start)["coords"]
-            graph.add_vertex(phantom_to, {"coords": to_coords, "building_id": None})
-            weight = conn.weight if conn.weight else 2.0
-            graph.add_edge(from_start, phantom_to, weight, {"type": "дверь"})
-            graph.add_edge(from_end, phantom_to, weight, {"type": "дверь"})
-            graph.add_edge(phantom_to, to_start, weight, {"type": "segment"})
-            graph.add_edge(phantom_to, to_end, weight, {"type": "segment"})
-
-        # Улица-улица (только если нужно)
-        elif include_outdoor and conn.from_outdoor_id and conn.to_outdoor_id:
-            if conn.from_outdoor_id not in outdoor_segments or conn.to_outdoor_id not in outdoor_segments:
-                continue
-            from_start, from_end = outdoor_segments[conn.from_outdoor_id]
-            to_start, to_end = outdoor_segments[conn.to_outdoor_id]
-            weight = conn.weight if conn.weight else 10.0
-            graph.add_edge(from_start, to_start, weight, {"type": "улица"})
-            graph.add_edge(from_end, to_end, weight, {"type": "улица"})
+        for conn in room_connections.get(room.id, []):
+            add_room_connection(graph, room, conn, segment_rows)
+
+    # Обработка соединений (лестниц и выходов на улицу)
+    for conn in all_connections:
+        add_connection(graph, conn, segment_rows, outdoor_ids)
 
     logger.info(f"Граф построен: {len(graph.vertices)} вершин, {sum(len(neighbors) for neighbors in graph.edges.values()) // 2} рёбер")
-    return graph
\ No newline at end of file
+    return graph
+
+
+# --- Построение графа по отдельным сущностям (общее для load_graph и patcher) ---
+
+def query_rooms(db: Session, *criteria) -> list:
+    return (
+        db.query(Room.id, Room.building_id, Room.floor_id, Room.cab_x, Room.cab_y, Floor.floor_number)
+        .outerjoin(Floor, Floor.id == Room.floor_id)
+        .filter(*criteria)
+        .all()
+    )
+
+
+def query_segments(db: Session, *criteria) -> list:
+    return (
+        db.query(
+            Segment.id, Segment.building_id, Segment.floor_id,
+            Segment.start_x, Segment.start_y, Segment.end_x, Segment.end_y,
+            Floor.floor_number
+        )
+        .outerjoin(Floor, Floor.id == Segment.floor_id)
+        .filter(*criteria)
+        .all()
+    )
+
+
+def query_connections(db: Session, *criteria) -> list:
+    return db.query(
+        Connection.type, Connection.weight, Connection.room_id, Connection.segment_id,
+        Connection.from_segment_id, Connection.to_segment_id,
+        Connection.from_outdoor_id, Connection.to_outdoor_id
+    ).filter(*criteria).all()
+
+
+def floor_number_of(row) -> int:
+    # Если этаж не найден, используем floor_id, как и раньше
+    return row.floor_number if row.floor_number is not None else row.floor_id
+
+
+def add_room(graph: Graph, room) -> None:
+    graph.add_vertex(f"room_{room.id}", {"coords": (room.cab_x, room.cab_y, floor_number_of(room)), "building_id": room.building_id})
+
+
+def add_segment(graph: Graph, segment) -> None:
+    floor_number = floor_number_of(segment)
+    start_vertex = f"segment_{segment.id}_start"
+    end_vertex = f"segment_{segment.id}_end"
+    graph.add_vertex(start_vertex, {"coords": (segment.start_x, segment.start_y, floor_number), "building_id": segment.building_id})
+    graph.add_vertex(end_vertex, {"coords": (segment.end_x, segment.end_y, floor_number), "building_id": segment.building_id})
+    weight = max(0.1, math.sqrt((segment.end_x - segment.start_x) ** 2 + (segment.end_y - segment.start_y) ** 2))
+    graph.add_edge(start_vertex, end_vertex, weight, {"type": "segment"})
+
+
+def add_outdoor(graph: Graph, outdoor) -> None:
+    start_vertex = f"outdoor_{outdoor.id}_start"
+    end_vertex = f"outdoor_{outdoor.id}_end"
+    coords_start = (outdoor.start_x, outdoor.start_y, 1)
+    coords_end = (outdoor.end_x, outdoor.end_y, 1)
+    graph.add_vertex(start_vertex, {"coords": coords_start, "building_id": None})
+    graph.add_vertex(end_vertex, {"coords": coords_end, "building_id": None})
+    weight = outdoor.weight if outdoor.weight else max(0.1, math.sqrt((outdoor.end_x - outdoor.start_x) ** 2 + (outdoor.end_y - outdoor.start_y) ** 2))
+    graph.add_edge(start_vertex, end_vertex, weight, {"type": "outdoor"})
+
+
+def add_room_connection(graph: Graph, room, conn, segment_rows: Dict[int, object]) -> None:
+    """Фантомная вершина входа в комнату на сегменте. segment_rows — сегменты, входящие в граф."""
+    if not conn.segment_id or conn.segment_id not in segment_rows:
+        return
+    room_vertex = f"room_{room.id}"
+    phantom_vertex = f"phantom_room_{room.id}_segment_{conn.segment_id}"
+    floor_number = floor_number_of(room)
+    segment_data = segment_rows[conn.segment_id]
+    # Определяем, вертикальный или горизонтальный сегмент
+    if segment_data.start_x == segment_data.end_x:  # Вертикальный сегмент
+        x = segment_data.start_x  # X сегмента
+        y = room.cab_y  # Y комнаты
+    else:  # Горизонтальный сегмент
+        x = room.cab_x  # X комнаты
+        y = segment_data.start_y  # Y сегмента
+    graph.add_vertex(phantom_vertex, {"coords": (x, y, floor_number), "building_id": room.building_id})
+    weight = conn.weight if conn.weight else 2.0
+    graph.add_edge(room_vertex, phantom_vertex, weight, {"type": "phantom"})
+    graph.add_edge(phantom_vertex, f"segment_{conn.segment_id}_start", weight, {"type": "segment"})
+    graph.add_edge(phantom_vertex, f"segment_{conn.segment_id}_end", weight, {"type": "segment"})
+
+
+def add_connection(graph: Graph, conn, segment_rows: Dict[int, object], outdoor_ids: Set[int]) -> None:
+    """
+    Лестница между сегментами, выход на улицу или переход между уличными сегментами.
+    Соединение пропускается, если один из его концов не входит в граф.
+    """
+    if conn.from_segment_id and conn.to_segment_id:
+        if conn.from_segment_id not in segment_rows or conn.to_segment_id not in segment_rows:
+            return
+        from_segment = segment_rows[conn.from_segment_id]
+        to_segment = segment_rows[conn.to_segment_id]
+
+        # Для верхнего этажа (from_segment) — конец сегмента
+        from_coords = (from_segment.end_x, from_segment.end_y, floor_number_of(from_segment))
+        # Для нижнего этажа (to_segment) — начало сегмента
+        to_coords = (to_segment.start_x, to_segment.start_y, floor_number_of(to_segment))
+
+        # Создаём фантомные точки для лестницы
+        phantom_from = f"phantom_stair_{conn.from_segment_id}_to_{conn.to_segment_id}"
+        phantom_to = f"phantom_stair_{conn.to_segment_id}_from_{conn.from_segment_id}"
+        graph.add_vertex(phantom_from, {"coords": from_coords, "building_id": None})
+        graph.add_vertex(phantom_to, {"coords": to_coords, "building_id": None})
+
+        # Соединяем всё правильно
+        weight = conn.weight if conn.weight else 2.0
+        graph.add_edge(f"segment_{conn.from_segment_id}_end", phantom_from, weight, {"type": "segment"})  # Конец сегмента 9 -> лестница
+        # type "лестница" — любой переход между этажами (для filter_path и сборки маршрута),
+        # connection — настоящий тип соединения (лестница, лифт, горка) для профилей маршрутизации
+        graph.add_edge(phantom_from, phantom_to, weight, {"type": "лестница", "connection": conn.type})  # Лестница вниз
+        graph.add_edge(phantom_to, f"segment_{conn.to_segment_id}_start", weight, {"type": "segment"})  # Лестница -> начало сегмента 7
+        graph.add_edge(phantom_to, f"segment_{conn.to_segment_id}_end", weight, {"type": "segment"})  # Для полноты пути
+
+    # Дверь-улица
+    elif conn.from_segment_id and conn.to_outdoor_id:
+        if conn.from_segment_id not in segment_rows or conn.to_outdoor_id not in outdoor_ids:
+            return
+        from_start, from_end = f"segment_{conn.from_segment_id}_start", f"segment_{conn.from_segment_id}_end"
+        to_start, to_end = f"outdoor_{conn.to_outdoor_id}_start", f"outdoor_{conn.to_outdoor_id}_end"
+        phantom_from = f"phantom_segment_{conn.from_segment_id}_to_outdoor_{conn.to_outdoor_id}"
+        from_coords = graph.get_vertex_data(from_end)["coords"]
+        graph.add_vertex(phantom_from, {"coords": from_coords, "building_id": None})
+        weight = conn.weight if conn.weight else 2.0
+        graph.add_edge(from_start, phantom_from, weight, {"type": "segment"})
+        graph.add_edge(from_end, phantom_from, weight, {"type": "segment"})
+        graph.add_edge(phantom_from, to_start, weight, {"type": "дверь"})
+        graph.add_edge(phantom_from, to_end, weight, {"type": "дверь"})
+
+    # Улица-дверь
+    elif conn.from_outdoor_id and conn.to_segment_id:
+        if conn.from_outdoor_id not in outdoor_ids or conn.to_segment_id not in segment_rows:
+            return
+        from_start, from_end = f"outdoor_{conn.from_outdoor_id}_start", f"outdoor_{conn.from_outdoor_id}_end"
+        to_start, to_end = f"segment_{conn.to_segment_id}_start", f"segment_{conn.to_segment_id}_end"
+        phantom_to = f"phantom_segment_{conn.to_segment_id}_from_outdoor_{conn.from_outdoor_id}"
+        to_coords = graph.get_vertex_data(to_start)["coords"]
+        graph.add_vertex(phantom_to, {"coords": to_coords, "building_id": None})
+        weight = conn.weight if conn.weight else 2.0
+        graph.add_edge(from_start, phantom_to, weight, {"type": "дверь"})
+        graph.add_edge(from_end, phantom_to, weight, {"type": "дверь"})
+        graph.add_edge(phantom_to, to_start, weight, {"type": "segment"})
+        graph.add_edge(phantom_to, to_end, weight, {"type": "segment"})
+
+    # Улица-улица
+    elif conn.from_outdoor_id and conn.to_outdoor_id:
+        if conn.from_outdoor_id not in outdoor_ids or conn.to_outdoor_id not in outdoor_ids:
+            return
+        weight = conn.weight if conn.weight else 10.0
+        graph.add_edge(f"outdoor_{conn.from_outdoor_id}_start", f"outdoor_{conn.to_outdoor_id}_start", weight, {"type": "улица"})
+        graph.add_edge(f"outdoor_{conn.from_outdoor_id}_end", f"outdoor_{conn.to_outdoor_id}_end", weight, {"type": "улица"})
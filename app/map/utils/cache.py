@@ -0,0 +1,183 @@
+# app/map/utils/cache.py
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Iterable, List, Optional, Tuple, Union
+import threading
+import time
+import logging
+
+from .graph import Graph
+from .compact import CompactGraph
+from .spatial import floor_indexes
+from app.database.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+GraphKey = FrozenSet[int]
+CachedGraph = Union[Graph, CompactGraph]
+
+
+class GraphCache:
+    """
+    Долгоживущий кеш графов маршрутизации внутри процесса.
+    Ключ — набор ID зданий, для которого строился граф.
+    Любая запись в CRUD сбрасывает затронутые графы и увеличивает версию карты.
+    Графы из снимка и разделяемой памяти хранятся без TTL (время построения None):
+    они сверены с отпечатком данных карты и сбрасываются только записью в CRUD.
+    """
+
+    def __init__(self, ttl: float = 0):
+        self.ttl = ttl  # Секунды; 0 — без ограничения по времени
+        self.version = 0
+        self._graphs: Dict[GraphKey, Tuple[CachedGraph, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: GraphKey, loader: Callable[[], CachedGraph],
+                     pinned: Optional[Callable[[], Optional[CachedGraph]]] = None) -> CachedGraph:
+        """
+        Граф из кеша или построенный loader. pinned — источник готовых графов (разделяемая
+        память): если он вернул граф, тот кешируется без TTL и loader не вызывается.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._graphs.get(key)
+            if entry and (entry[1] is None or not self.ttl or now - entry[1] < self.ttl):
+                return entry[0]
+            version = self.version
+
+        # Строим граф вне блокировки, чтобы не задерживать запросы к другим ключам
+        graph = pinned() if pinned is not None else None
+        built_at = None if graph is not None else now
+        if graph is None:
+            graph = loader()
+
+        with self._lock:
+            # Если во время построения пришла запись в БД, граф мог устареть — не кешируем его
+            if self.version == version:
+                self._graphs[key] = (graph, built_at)
+            else:
+                logger.info(f"Граф для зданий {sorted(key)} построен по устаревшим данным и не будет закеширован")
+        return graph
+
+    def put(self, key: GraphKey, graph: CachedGraph, expires: bool = True) -> None:
+        """expires=False — граф не ограничен TTL (графы из снимка)."""
+        with self._lock:
+            self._graphs[key] = (graph, time.monotonic() if expires else None)
+
+    def patch(self, patcher: Callable[[GraphKey, CachedGraph], Optional[CachedGraph]]) -> None:
+        """
+        Применяет изменение карты к закешированным графам и увеличивает версию карты.
+        patcher возвращает тот же граф, если изменение его не касается, изменённую копию
+        или None — тогда граф сбрасывается и будет построен заново. Копии строятся вне
+        блокировки и подменяются, только если запись в кеше за это время не поменялась.
+        """
+        with self._lock:
+            self.version += 1
+            entries = dict(self._graphs)
+
+        results = {key: patcher(key, graph) for key, (graph, _) in entries.items()}
+
+        patched = dropped = 0
+        now = time.monotonic()
+        with self._lock:
+            for key, (graph, built_at) in entries.items():
+                result = results[key]
+                current = self._graphs.get(key)
+                if result is graph or current is None:
+                    continue
+                if result is not None and current[0] is graph:
+                    # Время построения не обновляем: TTL по-прежнему ограничивает жизнь графа.
+                    # Исправленный граф из снимка уже не совпадает со снимком — TTL отсчитывается с правки
+                    self._graphs[key] = (result, now if built_at is None else built_at)
+                    patched += 1
+                else:
+                    del self._graphs[key]
+                    dropped += 1
+            logger.info(f"Изменение карты применено к кешу: обновлено графов {patched}, сброшено {dropped}, версия карты {self.version}")
+
+    def invalidate(self, building_ids: Optional[Iterable[int]] = None) -> None:
+        with self._lock:
+            self.version += 1
+            if building_ids is None:
+                self._graphs.clear()
+                logger.info(f"Кеш графов полностью сброшен, версия карты {self.version}")
+                return
+            affected = set(building_ids)
+            for key in [key for key in self._graphs if key & affected]:
+                del self._graphs[key]
+            logger.info(f"Кеш графов сброшен для зданий {sorted(affected)}, версия карты {self.version}")
+
+
+class LRUCache:
+    """
+    Ограниченный по размеру кеш с вытеснением давно не использованных записей и TTL.
+    Ключи должны включать версию карты (graph_cache.version): после записи в CRUD
+    старые записи просто перестают запрашиваться и со временем вытесняются.
+    """
+
+    def __init__(self, maxsize: int, ttl: float = 0):
+        self.maxsize = maxsize
+        self.ttl = ttl  # Секунды; 0 — без ограничения по времени
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and now - entry[1] >= self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+graph_cache = GraphCache(ttl=settings.GRAPH_CACHE_TTL)
+# Готовые ответы /route по (start, end, версия карты)
+route_cache = LRUCache(maxsize=settings.ROUTE_CACHE_SIZE, ttl=settings.ROUTE_CACHE_TTL)
+# Результаты поиска по неупорядоченной паре концов: общие для прямого и обратного запроса
+route_search_cache = LRUCache(maxsize=settings.ROUTE_CACHE_SIZE, ttl=settings.ROUTE_CACHE_TTL)
+
+
+# Вызываются после каждого изменения карты из CRUD (invalidate_graph_cache и emit_map_change),
+# например, для повторной публикации графов в разделяемой памяти
+map_change_listeners: List[Callable[[], None]] = []
+
+
+def notify_map_change() -> None:
+    for listener in map_change_listeners:
+        try:
+            listener()
+        except Exception as e:
+            logger.error(f"Ошибка обработчика изменения карты: {str(e)}")
+
+
+def invalidate_graph_cache(*building_ids: Optional[int]) -> None:
+    """
+    Сбрасывает закешированные графы. Без аргументов — все графы,
+    иначе только графы, в которые входят указанные здания.
+    Индексы этажей для поиска по точке сбрасываются целиком: изменение этажа
+    (номер, здание) меняет их состав.
+    """
+    ids = {building_id for building_id in building_ids if building_id is not None}
+    graph_cache.invalidate(ids if ids else None)
+    floor_indexes.invalidate()
+    notify_map_change()
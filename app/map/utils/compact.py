@@ -0,0 +1,254 @@
+# app/map/utils/compact.py
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from math import sqrt, isnan, inf
+
+from .graph import Graph
+
+NO_BUILDING = -1
+
+
+class CompactGraph:
+    """
+    Компактное представление графа маршрутизации.
+    Вершины — целые числа 0..n-1, координаты хранятся плоскими массивами,
+    рёбра — в формате CSR (offsets/targets/weights), тип ребра — код в таблице edge_types.
+    Имена вершин (room_1, segment_2_start, ...) используются только на границе API.
+    """
+
+    def __init__(
+        self,
+        names: List[str],
+        xs: array,
+        ys: array,
+        floors: array,
+        building_ids: array,
+        offsets: array,
+        targets: array,
+        weights: array,
+        edge_codes: array,
+        edge_types: List[Dict[str, Any]],
+    ):
+        self.names = names
+        self.xs = xs
+        self.ys = ys
+        self.floors = floors
+        self.building_ids = building_ids
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.edge_codes = edge_codes
+        self.edge_types = edge_types
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(names)}
+        self.landmarks: List[str] = []
+        self.landmark_distances: List[array] = []  # Расстояния от ориентиров по ID вершин
+        self.hierarchy = None  # ContractionHierarchy, строится для режима поиска "ch"
+        self._floor_weight = None  # Кеш floor_weight()
+
+    @classmethod
+    def from_graph(cls, graph: Graph) -> "CompactGraph":
+        names = list(graph.vertices)
+        index = {name: i for i, name in enumerate(names)}
+
+        xs, ys = array("d"), array("d")
+        floors, building_ids = array("i"), array("i")
+        for name in names:
+            data = graph.vertices[name]
+            x, y, floor = data["coords"]
+            xs.append(float("nan") if x is None else x)
+            ys.append(float("nan") if y is None else y)
+            floors.append(floor)
+            building_id = data.get("building_id")
+            building_ids.append(NO_BUILDING if building_id is None else building_id)
+
+        # Одинаковые словари данных рёбер интернируются в общую таблицу
+        edge_types: List[Dict[str, Any]] = []
+        type_codes: Dict[Tuple, int] = {}
+        offsets, targets = array("i", [0]), array("i")
+        weights, edge_codes = array("d"), array("H")
+        for name in names:
+            for neighbor, weight, edge_data in graph.edges[name]:
+                key = tuple(sorted(edge_data.items()))
+                code = type_codes.get(key)
+                if code is None:
+                    code = type_codes[key] = len(edge_types)
+                    edge_types.append(dict(edge_data))
+                targets.append(index[neighbor])
+                weights.append(weight)
+                edge_codes.append(code)
+            offsets.append(len(targets))
+
+        compact = cls(names, xs, ys, floors, building_ids, offsets, targets, weights, edge_codes, edge_types)
+        compact.landmarks = list(graph.landmarks)
+        compact.hierarchy = graph.hierarchy
+        compact.landmark_distances = [
+            array("d", (distances.get(name, inf) for name in names))
+            for distances in graph.landmark_distances
+        ]
+        return compact
+
+    def with_weights(self, weights: array) -> "CompactGraph":
+        """
+        Граф той же топологии с другими весами рёбер (по одному на элемент targets):
+        все остальные массивы, таблица типов и индекс имён общие с исходным графом.
+        Иерархия сжатия не переносится — она построена по исходным весам.
+        """
+        graph = object.__new__(CompactGraph)
+        graph.__dict__.update(self.__dict__)
+        graph.weights = weights
+        graph.hierarchy = None
+        graph._floor_weight = None
+        return graph
+
+    def __getstate__(self) -> dict:
+        # Для передачи в процессы пула: индекс имён восстанавливается, иерархия не нужна
+        state = dict(self.__dict__)
+        state.pop("index")
+        state["hierarchy"] = None
+        # Массивы из снимка (memoryview над mmap) не сериализуются — передаём копии
+        for name, value in state.items():
+            if isinstance(value, memoryview):
+                state[name] = array(value.format, value)
+        state["landmark_distances"] = [
+            array(d.format, d) if isinstance(d, memoryview) else d for d in self.landmark_distances
+        ]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+    # --- Доступ по целочисленным ID ---
+
+    def vertex_id(self, vertex: str) -> Optional[int]:
+        return self.index.get(vertex)
+
+    def vertex_name(self, vertex_id: int) -> str:
+        return self.names[vertex_id]
+
+    def heuristic_id(self, v: int, target: int) -> float:
+        dx = self.xs[v] - self.xs[target]
+        dy = self.ys[v] - self.ys[target]
+        distance_2d = sqrt(dx * dx + dy * dy)
+        if isnan(distance_2d):
+            distance_2d = 0.0  # У комнаты может не быть координат входа
+        return distance_2d + abs(self.floors[v] - self.floors[target]) * 10
+
+    def landmark_heuristic_id(self, v: int, target: int) -> float:
+        bound = 0.0
+        for distances in self.landmark_distances:
+            distance_v, distance_target = distances[v], distances[target]
+            if distance_v == inf or distance_target == inf:
+                continue
+            bound = max(bound, abs(distance_v - distance_target))
+        return bound
+
+    def combined_heuristic_id(self, v: int, target: int) -> float:
+        floor_bound = abs(self.floors[v] - self.floors[target]) * self.floor_weight()
+        return max(floor_bound, self.landmark_heuristic_id(v, target))
+
+    def floor_weight(self) -> float:
+        """Наименьший вес ребра на один этаж перехода, как Graph.floor_weight."""
+        if self._floor_weight is None:
+            floors, offsets, targets, weights = self.floors, self.offsets, self.targets, self.weights
+            best = inf
+            for v in range(len(self.names)):
+                floor = floors[v]
+                for k in range(offsets[v], offsets[v + 1]):
+                    change = abs(floors[targets[k]] - floor)
+                    if change and weights[k] / change < best:
+                        best = weights[k] / change
+            self._floor_weight = 0.0 if best == inf else best
+        return self._floor_weight
+
+    def heuristic_to(self, target: int, heuristic: str = "geometric") -> Callable[[int], float]:
+        """
+        Оценка расстояния до target на время одного запроса: данные цели читаются один раз,
+        значение для каждой вершины считается при первом обращении и запоминается в массиве.
+        geometric — heuristic_id, alt — landmark_heuristic_id, combined — combined_heuristic_id.
+        """
+        xs, ys, floors = self.xs, self.ys, self.floors
+        tx, ty, tf = xs[target], ys[target], floors[target]
+        use_geometric = heuristic == "geometric"
+        floor_weight = self.floor_weight() if heuristic == "combined" else 0.0
+        tables = [] if heuristic == "geometric" else [
+            (distances, distances[target]) for distances in self.landmark_distances if distances[target] != inf
+        ]
+        memo = array("d", [-1.0]) * len(self.names)
+
+        def estimate(v: int) -> float:
+            value = memo[v]
+            if value >= 0:
+                return value
+            value = 0.0
+            if use_geometric:
+                dx, dy = xs[v] - tx, ys[v] - ty
+                value = sqrt(dx * dx + dy * dy)
+                if isnan(value):
+                    value = 0.0
+                value += abs(floors[v] - tf) * 10
+            elif floor_weight:
+                value = abs(floors[v] - tf) * floor_weight
+            for distances, distance_target in tables:
+                distance_v = distances[v]
+                if distance_v != inf and abs(distance_v - distance_target) > value:
+                    value = abs(distance_v - distance_target)
+            memo[v] = value
+            return value
+
+        return estimate
+
+    def nbytes(self) -> int:
+        arrays = (self.xs, self.ys, self.floors, self.building_ids, self.offsets, self.targets, self.weights, self.edge_codes)
+        arrays += tuple(self.landmark_distances)
+        return sum(a.itemsize * len(a) for a in arrays)
+
+    # --- Интерфейс Graph по именам вершин (для filter_path и сборки маршрута) ---
+
+    @property
+    def vertices(self) -> Dict[str, int]:
+        return self.index
+
+    def get_vertex_data(self, vertex: str) -> dict:
+        i = self.index.get(vertex)
+        if i is None:
+            return {"coords": (0, 0, 0), "building_id": None}
+        x, y = self.xs[i], self.ys[i]
+        building_id = self.building_ids[i]
+        return {
+            "coords": (None if isnan(x) else x, None if isnan(y) else y, self.floors[i]),
+            "building_id": None if building_id == NO_BUILDING else building_id,
+        }
+
+    def get_neighbors(self, vertex: str) -> List[Tuple[str, float, Dict[str, Any]]]:
+        i = self.index.get(vertex)
+        if i is None:
+            return []
+        return [
+            (self.names[self.targets[k]], self.weights[k], self.edge_types[self.edge_codes[k]])
+            for k in range(self.offsets[i], self.offsets[i + 1])
+        ]
+
+    def _find_edge(self, from_vertex: str, to_vertex: str) -> Optional[int]:
+        i = self.index.get(from_vertex)
+        j = self.index.get(to_vertex)
+        if i is None or j is None:
+            return None
+        for k in range(self.offsets[i], self.offsets[i + 1]):
+            if self.targets[k] == j:
+                return k
+        return None
+
+    def get_edge_data(self, from_vertex: str, to_vertex: str) -> Dict[str, Any]:
+        k = self._find_edge(from_vertex, to_vertex)
+        return {} if k is None else self.edge_types[self.edge_codes[k]]
+
+    def get_edge_weight(self, from_vertex: str, to_vertex: str) -> float:
+        k = self._find_edge(from_vertex, to_vertex)
+        return float('inf') if k is None else self.weights[k]
+
+    def heuristic(self, vertex1: str, vertex2: str) -> float:
+        return self.heuristic_id(self.index[vertex1], self.index[vertex2])
+
+    def landmark_heuristic(self, a: str, b: str) -> float:
+        return self.landmark_heuristic_id(self.index[a], self.index[b])
@@ -0,0 +1,185 @@
+# app/map/utils/contraction.py
+from typing import Dict, List, Optional, Tuple
+import heapq
+import math
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Ограничения локального поиска свидетелей: если свидетель не найден в пределах лимита,
+# добавляется лишний шорткат — это влияет только на размер иерархии, но не на корректность
+WITNESS_SETTLE_LIMIT = 60
+
+
+class ContractionHierarchy:
+    """
+    Иерархия сжатия (contraction hierarchies) для неориентированного графа маршрутизации.
+    Строится один раз на версию карты; запрос — двунаправленный поиск только «вверх» по рангу
+    с последующей распаковкой шорткатов в исходные вершины графа.
+    """
+
+    def __init__(self, graph):
+        self.names: List[str] = list(graph.vertices)
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        self.rank: List[int] = []
+        self.up: List[List[Tuple[int, float]]] = []  # Рёбра к вершинам с большим рангом
+        self.middle: Dict[Tuple[int, int], int] = {}  # Шорткат (a, b), a < b -> вершина, через которую он проходит
+        self.shortcuts = 0
+        self._preprocess(graph)
+
+    def _preprocess(self, graph) -> None:
+        n = len(self.names)
+        adjacency: List[Dict[int, float]] = [{} for _ in range(n)]
+        for i, name in enumerate(self.names):
+            for neighbor, weight, _ in graph.get_neighbors(name):
+                j = self.index[neighbor]
+                if j != i and weight < adjacency[i].get(j, math.inf):
+                    adjacency[i][j] = weight
+                    adjacency[j][i] = weight
+
+        contracted = [False] * n
+        deleted_neighbors = [0] * n
+        self.rank = [0] * n
+        # Рабочий граф: из него удаляются сжатые вершины, шорткаты добавляются
+        remaining = [dict(edges) for edges in adjacency]
+        final_edges = [dict(edges) for edges in adjacency]
+
+        queue = [(self._priority(v, remaining, deleted_neighbors), v) for v in range(n)]
+        heapq.heapify(queue)
+        order = 0
+        while queue:
+            priority, v = heapq.heappop(queue)
+            if contracted[v]:
+                continue
+            # Ленивое обновление: если приоритет вырос, откладываем вершину
+            current = self._priority(v, remaining, deleted_neighbors)
+            if queue and current > queue[0][0]:
+                heapq.heappush(queue, (current, v))
+                continue
+
+            for u, w, weight in self._shortcuts_for(v, remaining):
+                if weight < remaining[u].get(w, math.inf):
+                    remaining[u][w] = remaining[w][u] = weight
+                    final_edges[u][w] = final_edges[w][u] = weight
+                    self.middle[(min(u, w), max(u, w))] = v
+                    self.shortcuts += 1
+
+            for u in remaining[v]:
+                del remaining[u][v]
+                deleted_neighbors[u] += 1
+            remaining[v] = {}
+            contracted[v] = True
+            self.rank[v] = order
+            order += 1
+
+        self.up = [
+            [(w, weight) for w, weight in final_edges[v].items() if self.rank[w] > self.rank[v]]
+            for v in range(n)
+        ]
+        logger.info(f"Иерархия сжатия построена: {n} вершин, {self.shortcuts} шорткатов")
+
+    def _shortcuts_for(self, v: int, remaining: List[Dict[int, float]]) -> List[Tuple[int, int, float]]:
+        neighbors = list(remaining[v].items())
+        shortcuts = []
+        for i, (u, weight_u) in enumerate(neighbors):
+            targets = {w: weight_u + weight_w for w, weight_w in neighbors[i + 1:]}
+            if not targets:
+                continue
+            witnesses = self._witness_search(u, v, targets, max(targets.values()), remaining)
+            for w, via_v in targets.items():
+                if witnesses.get(w, math.inf) > via_v:
+                    shortcuts.append((u, w, via_v))
+        return shortcuts
+
+    def _witness_search(self, source: int, excluded: int, targets: Dict[int, float], limit: float,
+                        remaining: List[Dict[int, float]]) -> Dict[int, float]:
+        distances = {source: 0.0}
+        open_set = [(0.0, source)]
+        settled = 0
+        found = 0
+        while open_set and settled < WITNESS_SETTLE_LIMIT:
+            distance, current = heapq.heappop(open_set)
+            if distance > distances.get(current, math.inf):
+                continue
+            if distance > limit:
+                break
+            settled += 1
+            if current in targets:
+                found += 1
+                if found == len(targets):
+                    break
+            for neighbor, weight in remaining[current].items():
+                if neighbor == excluded:
+                    continue
+                tentative = distance + weight
+                if tentative < distances.get(neighbor, math.inf):
+                    distances[neighbor] = tentative
+                    heapq.heappush(open_set, (tentative, neighbor))
+        return distances
+
+    def _priority(self, v: int, remaining: List[Dict[int, float]], deleted_neighbors: List[int]) -> int:
+        # Разность рёбер + число уже сжатых соседей (равномерность сжатия)
+        added = len(self._shortcuts_for(v, remaining))
+        return added - len(remaining[v]) + deleted_neighbors[v]
+
+    def query(self, start: str, end: str) -> Tuple[List[str], float]:
+        source, target = self.index.get(start), self.index.get(end)
+        if source is None or target is None:
+            return [], float("inf")
+        if source == target:
+            return [start], 0.0
+
+        distances = ({source: 0.0}, {target: 0.0})
+        parents: Tuple[Dict[int, int], Dict[int, int]] = ({}, {})
+        queues = ([(0.0, source)], [(0.0, target)])
+        best, meeting = math.inf, None
+
+        while queues[0] or queues[1]:
+            for side in (0, 1):
+                queue = queues[side]
+                if not queue:
+                    continue
+                distance, current = heapq.heappop(queue)
+                if distance > distances[side].get(current, math.inf):
+                    continue
+                if distance >= best:
+                    queue.clear()  # Дальше в этом направлении улучшений быть не может
+                    continue
+                other = distances[1 - side].get(current)
+                if other is not None and distance + other < best:
+                    best, meeting = distance + other, current
+                for neighbor, weight in self.up[current]:
+                    tentative = distance + weight
+                    if tentative < distances[side].get(neighbor, math.inf):
+                        distances[side][neighbor] = tentative
+                        parents[side][neighbor] = current
+                        heapq.heappush(queue, (tentative, neighbor))
+
+        if meeting is None:
+            return [], float("inf")
+
+        forward = [meeting]
+        while forward[-1] != source:
+            forward.append(parents[0][forward[-1]])
+        forward.reverse()
+        backward = [meeting]
+        while backward[-1] != target:
+            backward.append(parents[1][backward[-1]])
+
+        packed = forward + backward[1:]
+        path = [packed[0]]
+        for a, b in zip(packed, packed[1:]):
+            self._unpack(a, b, path)
+        return [self.names[v] for v in path], best
+
+    def _unpack(self, a: int, b: int, path: List[int]) -> None:
+        # Рекурсивно раскрывает шорткат (a, b) в цепочку исходных рёбер; a уже добавлена в path
+        stack = [(a, b)]
+        while stack:
+            a, b = stack.pop()
+            middle: Optional[int] = self.middle.get((min(a, b), max(a, b)))
+            if middle is None:
+                path.append(b)
+            else:
+                stack.append((middle, b))
+                stack.append((a, middle))
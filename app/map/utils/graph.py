@@ -1,17 +1,24 @@
 # app/map/utils/graph.py
-from typing import Dict, List, Tuple, Union, Any
-from math import sqrt
+from typing import Callable, Dict, List, Tuple, Union, Any
+from math import sqrt, inf
 
 class Graph:
     def __init__(self):
         self.vertices: Dict[str, dict] = {}
         self.edges: Dict[str, List[Tuple[str, float, Dict[str, Any]]]] = {}
+        # Индекс рёбер по соседу: get_edge_data/get_edge_weight за O(1) вместо просмотра списка.
+        # При кратных рёбрах хранится первое добавленное, как и при линейном поиске
+        self.edge_index: Dict[str, Dict[str, Tuple[float, Dict[str, Any]]]] = {}
         self.landmarks: List[str] = []
+        self.landmark_distances: List[Dict[str, float]] = []  # Расстояния от каждого ориентира
+        self.hierarchy = None  # ContractionHierarchy, строится для режима поиска "ch"
+        self._floor_weight = None  # Кеш floor_weight(), сбрасывается при добавлении рёбер
 
     def add_vertex(self, vertex: str, data: dict) -> None:
         if vertex not in self.vertices:
             self.vertices[vertex] = data
             self.edges[vertex] = []
+            self.edge_index[vertex] = {}
 
     def add_edge(self, from_vertex: str, to_vertex: str, weight: float, edge_data: Dict[str, Any] = None) -> None:
         if from_vertex not in self.vertices:
@@ -22,22 +29,42 @@ class Graph:
         edge_data = edge_data or {}
         self.edges[from_vertex].append((to_vertex, weight, edge_data))
         self.edges[to_vertex].append((from_vertex, weight, edge_data))
+        self.edge_index[from_vertex].setdefault(to_vertex, (weight, edge_data))
+        self.edge_index[to_vertex].setdefault(from_vertex, (weight, edge_data))
+        self._floor_weight = None
+
+    def remove_vertex(self, vertex: str) -> None:
+        """Удаляет вершину вместе со всеми инцидентными рёбрами."""
+        if vertex not in self.vertices:
+            return
+        for neighbor in {neighbor for neighbor, _, _ in self.edges[vertex]} - {vertex}:
+            self.edges[neighbor] = [edge for edge in self.edges[neighbor] if edge[0] != vertex]
+            self.edge_index[neighbor].pop(vertex, None)
+        del self.vertices[vertex]
+        del self.edges[vertex]
+        del self.edge_index[vertex]
+
+    def copy(self) -> "Graph":
+        """
+        Копия для изменения, пока исходный граф читают другие запросы: списки смежности
+        и индексы копируются, словари данных вершин и рёбер общие (они не изменяются).
+        Иерархия сжатия не переносится — после изменения графа она недействительна.
+        """
+        graph = Graph()
+        graph.vertices = dict(self.vertices)
+        graph.edges = {vertex: list(neighbors) for vertex, neighbors in self.edges.items()}
+        graph.edge_index = {vertex: dict(index) for vertex, index in self.edge_index.items()}
+        graph.landmarks = list(self.landmarks)
+        graph.landmark_distances = list(self.landmark_distances)
+        return graph
 
     def get_edge_data(self, from_vertex: str, to_vertex: str) -> Dict[str, Any]:
-        if from_vertex not in self.edges:
-            return {}
-        for neighbor, _, edge_data in self.edges[from_vertex]:
-            if neighbor == to_vertex:
-                return edge_data
-        return {}
+        edge = self.edge_index.get(from_vertex, {}).get(to_vertex)
+        return edge[1] if edge else {}
 
     def get_edge_weight(self, from_vertex: str, to_vertex: str) -> float:
-        if from_vertex not in self.edges:
-            return float('inf')
-        for neighbor, weight, _ in self.edges[from_vertex]:
-            if neighbor == to_vertex:
-                return weight
-        return float('inf')
+        edge = self.edge_index.get(from_vertex, {}).get(to_vertex)
+        return edge[0] if edge else float('inf')
 
     def get_neighbors(self, vertex: str) -> List[Tuple[str, float, Dict[str, Any]]]:
         return self.edges.get(vertex, [])
@@ -50,9 +77,72 @@ class Graph:
         return distance_2d + floor_diff
 
     def landmark_heuristic(self, a: str, b: str) -> float:
+        # Нижняя оценка ALT: |d(L, a) - d(L, b)| <= d(a, b) по неравенству треугольника
         if not self.landmarks:
             return 0.0
-        return 0.0
+        bound = 0.0
+        for distances in self.landmark_distances:
+            distance_a = distances.get(a)
+            distance_b = distances.get(b)
+            if distance_a is None or distance_b is None:
+                continue
+            bound = max(bound, abs(distance_a - distance_b))
+        return bound
+
+    def floor_weight(self) -> float:
+        """
+        Наименьший вес ребра в пересчёте на один этаж перехода: |разность этажей| * floor_weight()
+        не больше длины любого пути между вершинами (нижняя оценка для эвристики combined).
+        Удаление рёбер оценку только ослабляет, поэтому кеш сбрасывается лишь в add_edge.
+        """
+        if self._floor_weight is None:
+            best = inf
+            for vertex, neighbors in self.edges.items():
+                floor = self.vertices[vertex]["coords"][2]
+                for neighbor, weight, _ in neighbors:
+                    change = abs(self.vertices[neighbor]["coords"][2] - floor)
+                    if change and weight / change < best:
+                        best = weight / change
+            self._floor_weight = 0.0 if best == inf else best
+        return self._floor_weight
+
+    def heuristic_to(self, end: str, heuristic: str = "geometric") -> Callable[[str], float]:
+        """
+        Оценка расстояния до end на время одного запроса: координаты и расстояния от ориентиров
+        цели читаются один раз, значения для вершин считаются лениво и запоминаются.
+        Вершина без координат получает нулевую геометрическую оценку, как в CompactGraph.
+        combined вместо геометрической оценки берёт допустимую оценку по этажам (floor_weight).
+        """
+        vertices = self.vertices
+        tx, ty, tf = self.get_vertex_data(end)["coords"]
+        use_geometric = heuristic == "geometric"
+        floor_weight = self.floor_weight() if heuristic == "combined" else 0.0
+        has_position = tx is not None and ty is not None
+        tables = [] if heuristic == "geometric" else [
+            (distances, distances[end]) for distances in self.landmark_distances if end in distances
+        ]
+        memo: Dict[str, float] = {}
+
+        def estimate(vertex: str) -> float:
+            value = memo.get(vertex)
+            if value is not None:
+                return value
+            value = 0.0
+            if use_geometric:
+                x, y, floor = vertices[vertex]["coords"]
+                if has_position and x is not None and y is not None:
+                    value = sqrt((x - tx) ** 2 + (y - ty) ** 2)
+                value += abs(floor - tf) * 10
+            elif floor_weight:
+                value = abs(vertices[vertex]["coords"][2] - tf) * floor_weight
+            for distances, distance_end in tables:
+                distance = distances.get(vertex)
+                if distance is not None and abs(distance - distance_end) > value:
+                    value = abs(distance - distance_end)
+            memo[vertex] = value
+            return value
+
+        return estimate
 
     def get_vertex_data(self, vertex: str) -> dict:
         return self.vertices.get(vertex, {"coords": (0, 0, 0), "building_id": None})
\ No newline at end of file
@@ -0,0 +1,108 @@
+# app/map/utils/landmarks.py
+from typing import Dict, List, Optional
+import logging
+
+from .graph import Graph
+from .pathfinder import dijkstra
+
+logger = logging.getLogger(__name__)
+
+LANDMARK_STRATEGIES = ("farthest", "avoid")
+
+
+def build_landmarks(graph: Graph, count: int, strategy: str = "avoid") -> None:
+    """
+    Выбирает ориентиры для эвристики ALT и сохраняет в графе таблицы расстояний от них.
+    farthest — каждый следующий ориентир максимально удалён от уже выбранных;
+    avoid — ориентир ставится в ту часть дерева кратчайших путей, где текущая оценка хуже всего.
+    """
+    if strategy not in LANDMARK_STRATEGIES:
+        raise ValueError(f"Неизвестная стратегия выбора ориентиров: {strategy}")
+
+    graph.landmarks = []
+    graph.landmark_distances = []
+    if count <= 0 or not graph.vertices:
+        return
+
+    # Расстояние от каждой вершины до ближайшего уже выбранного ориентира
+    closest: Dict[str, float] = {vertex: float("inf") for vertex in graph.vertices}
+    first_vertex = next(iter(graph.vertices))
+
+    for _ in range(min(count, len(graph.vertices))):
+        if strategy == "farthest":
+            landmark = _pick_farthest(graph, closest, first_vertex)
+        else:
+            landmark = _pick_avoid(graph, closest, first_vertex)
+        if landmark is None:
+            break
+
+        distances, _ = dijkstra(graph, landmark)
+        graph.landmarks.append(landmark)
+        graph.landmark_distances.append(distances)
+        for vertex, distance in distances.items():
+            if distance < closest[vertex]:
+                closest[vertex] = distance
+
+    logger.info(f"Выбрано ориентиров ALT: {len(graph.landmarks)} (стратегия {strategy})")
+
+
+def refresh_landmarks(graph: Graph) -> None:
+    """
+    Пересчитывает таблицы расстояний для уже выбранных ориентиров после изменения графа.
+    Старые таблицы могли стать недопустимой оценкой; ориентиры, удалённые из графа, отбрасываются.
+    """
+    graph.landmarks = [landmark for landmark in graph.landmarks if landmark in graph.vertices]
+    graph.landmark_distances = [dijkstra(graph, landmark)[0] for landmark in graph.landmarks]
+
+
+def _farthest_vertex(graph: Graph, closest: Dict[str, float]) -> Optional[str]:
+    # Недостижимые от всех ориентиров вершины (другая компонента связности) выбираются первыми
+    landmarks = set(graph.landmarks)
+    return max((vertex for vertex in graph.vertices if vertex not in landmarks), key=lambda v: closest[v], default=None)
+
+
+def _pick_farthest(graph: Graph, closest: Dict[str, float], first_vertex: str) -> str:
+    if not graph.landmarks:
+        # Первый ориентир — самая дальняя вершина от произвольной стартовой
+        distances, _ = dijkstra(graph, first_vertex)
+        return max(distances, key=distances.get)
+    return _farthest_vertex(graph, closest)
+
+
+def _pick_avoid(graph: Graph, closest: Dict[str, float], first_vertex: str) -> Optional[str]:
+    root = first_vertex if not graph.landmarks else _farthest_vertex(graph, closest)
+    if root is None:
+        return None
+    distances, parents = dijkstra(graph, root)
+
+    # Вес вершины — насколько текущая нижняя оценка d(root, v) хуже точного расстояния
+    order = sorted(distances, key=distances.get, reverse=True)
+    children: Dict[str, List[str]] = {}
+    for vertex in order:
+        parent = parents.get(vertex)
+        if parent is not None:
+            children.setdefault(parent, []).append(vertex)
+
+    # size(v) — суммарный вес поддерева v, или 0, если в поддереве уже есть ориентир
+    landmarks = set(graph.landmarks)
+    sizes: Dict[str, float] = {}
+    covered = set()
+    for vertex in order:  # Потомки всегда дальше от корня, чем родитель
+        subtree = children.get(vertex, [])
+        if vertex in landmarks or any(child in covered for child in subtree):
+            covered.add(vertex)
+            sizes[vertex] = 0.0
+            continue
+        error = distances[vertex] - graph.landmark_heuristic(root, vertex)
+        sizes[vertex] = error + sum(sizes[child] for child in subtree)
+
+    vertex = max(sizes, key=sizes.get)
+    if sizes[vertex] <= 0:
+        return _farthest_vertex(graph, closest)
+
+    # Спускаемся от самой «тяжёлой» вершины к листу, выбирая самого тяжёлого потомка
+    while True:
+        subtree = [child for child in children.get(vertex, []) if sizes[child] > 0]
+        if not subtree:
+            return vertex
+        vertex = max(subtree, key=sizes.get)
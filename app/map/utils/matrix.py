@@ -0,0 +1,150 @@
+# app/map/utils/matrix.py
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+import heapq
+import math
+import multiprocessing
+import threading
+import weakref
+import logging
+
+from .graph import Graph
+from .compact import CompactGraph
+
+logger = logging.getLogger(__name__)
+
+# Граф воркера пула процессов: передаётся один раз через initializer, а не с каждой задачей
+_worker_graph: Optional[CompactGraph] = None
+
+# CSR-форма закешированных графов Graph: строится один раз и пропадает вместе с исходным графом
+_compact_graphs: "weakref.WeakKeyDictionary[Graph, CompactGraph]" = weakref.WeakKeyDictionary()
+_compact_lock = threading.Lock()
+
+# Пул процессов общий для всех запросов: пересоздаётся, только когда меняется граф или число процессов
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_graph: Optional["weakref.ref[CompactGraph]"] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def distance_matrix(
+    graph: Union[Graph, CompactGraph],
+    sources: List[str],
+    targets: List[str],
+    with_next_hop: bool = False,
+    workers: int = 1,
+) -> Tuple[List[List[Optional[float]]], Optional[List[List[Optional[str]]]]]:
+    """
+    Матрица кратчайших расстояний sources x targets.
+    Для каждого источника выполняется один поиск Дейкстры «один-ко-многим», который
+    останавливается, как только достигнуты все цели. Недостижимые пары — None.
+    with_next_hop — дополнительно вернуть первую вершину пути из источника к каждой цели.
+    workers > 1 — распределить источники по пулу процессов.
+    """
+    compact = compact_graph(graph)
+    target_ids = [compact.vertex_id(target) for target in targets]
+    jobs = [(compact.vertex_id(source), target_ids, with_next_hop) for source in sources]
+
+    if workers > 1 and len(sources) > 1:
+        rows = list(_process_pool(compact, workers).map(_worker_row, jobs))
+    else:
+        rows = [_row(compact, *job) for job in jobs]
+
+    distances = [row[0] for row in rows]
+    if not with_next_hop:
+        return distances, None
+    next_hops = [[None if hop is None else compact.names[hop] for hop in row[1]] for row in rows]
+    return distances, next_hops
+
+
+def compact_graph(graph: Union[Graph, CompactGraph]) -> CompactGraph:
+    """CSR-форма графа для поиска «один-ко-многим»: для Graph строится один раз на объект графа."""
+    if isinstance(graph, CompactGraph):
+        return graph
+    with _compact_lock:
+        compact = _compact_graphs.get(graph)
+    if compact is None:
+        compact = CompactGraph.from_graph(graph)
+        with _compact_lock:
+            compact = _compact_graphs.setdefault(graph, compact)
+        logger.info(f"Построена CSR-форма графа для матрицы: {len(compact.names)} вершин")
+    return compact
+
+
+def _process_pool(graph: CompactGraph, workers: int) -> ProcessPoolExecutor:
+    """
+    Пул процессов с графом graph в каждом воркере. Граф передаётся один раз при создании пула,
+    поэтому пул переиспользуется, пока запросы приходят к тому же графу. Задачи прежнего пула
+    дорабатывают после его замены. Процессы запускаются через spawn: fork из потока
+    многопоточного сервера небезопасен.
+    """
+    global _pool, _pool_graph, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_graph() is not graph or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker, initargs=(graph,),
+            )
+            _pool_graph, _pool_workers = weakref.ref(graph), workers
+            logger.info(f"Создан пул процессов для матрицы: {workers} процессов")
+        return _pool
+
+
+def _init_worker(graph: CompactGraph) -> None:
+    global _worker_graph
+    _worker_graph = graph
+
+
+def _worker_row(job: Tuple[Optional[int], List[Optional[int]], bool]):
+    return _row(_worker_graph, *job)
+
+
+def _row(graph: CompactGraph, source: Optional[int], target_ids: List[Optional[int]],
+         with_next_hop: bool) -> Tuple[List[Optional[float]], List[Optional[int]]]:
+    if source is None:
+        return [None] * len(target_ids), [None] * len(target_ids)
+
+    distances, parents = _one_to_many(graph, source, {t for t in target_ids if t is not None})
+    row = [distances.get(t) if t is not None else None for t in target_ids]
+    hops: List[Optional[int]] = []
+    if with_next_hop:
+        for t in target_ids:
+            hops.append(_next_hop(parents, source, t) if t is not None and t in distances else None)
+    return row, hops
+
+
+def _one_to_many(graph: CompactGraph, source: int, remaining: set) -> Tuple[Dict[int, float], Dict[int, int]]:
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+    remaining = set(remaining)
+    distances = {source: 0.0}
+    parents: Dict[int, int] = {}
+    open_set = [(0.0, source)]
+    visited = set()
+
+    while open_set and remaining:
+        distance, current = heapq.heappop(open_set)
+        if current in visited:
+            continue
+        visited.add(current)
+        remaining.discard(current)
+        for k in range(offsets[current], offsets[current + 1]):
+            neighbor = targets[k]
+            tentative = distance + weights[k]
+            if tentative < distances.get(neighbor, math.inf):
+                distances[neighbor] = tentative
+                parents[neighbor] = current
+                heapq.heappush(open_set, (tentative, neighbor))
+
+    # Оставляем только окончательные расстояния: непросмотренные вершины могли не успеть улучшиться
+    return {v: distances[v] for v in visited}, parents
+
+
+def _next_hop(parents: Dict[int, int], source: int, target: int) -> Optional[int]:
+    if target == source:
+        return None
+    vertex = target
+    while parents[vertex] != source:
+        vertex = parents[vertex]
+    return vertex
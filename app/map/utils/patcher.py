@@ -0,0 +1,185 @@
+# app/map/utils/patcher.py
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+import logging
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from .graph import Graph
+from .cache import graph_cache, notify_map_change
+from .landmarks import refresh_landmarks
+from .spatial import floor_indexes
+from .builder import (
+    add_connection, add_outdoor, add_room, add_room_connection, add_segment,
+    query_connections, query_rooms, query_segments,
+)
+from app.database.config.settings import settings
+from app.map.models.room import Room
+from app.map.models.segment import Segment
+from app.map.models.connection import Connection
+from app.map.models.outdoor_segment import OutdoorSegment
+
+logger = logging.getLogger(__name__)
+
+
+class MapChange:
+    """
+    Событие изменения карты из CRUD: ID затронутых комнат, сегментов и уличных сегментов.
+    Для изменённого соединения в событие входят его концы и до, и после изменения.
+    """
+
+    def __init__(self, rooms: Iterable[Optional[int]] = (), segments: Iterable[Optional[int]] = (),
+                 outdoors: Iterable[Optional[int]] = ()):
+        self.rooms: Set[int] = {room_id for room_id in rooms if room_id is not None}
+        self.segments: Set[int] = {segment_id for segment_id in segments if segment_id is not None}
+        self.outdoors: Set[int] = {outdoor_id for outdoor_id in outdoors if outdoor_id is not None}
+
+    @classmethod
+    def for_connection(cls, *connections) -> "MapChange":
+        """Событие по соединениям (ORM-объектам или строкам) — все их концы."""
+        return cls(
+            rooms=[conn.room_id for conn in connections],
+            segments=[getattr(conn, field) for conn in connections for field in ("segment_id", "from_segment_id", "to_segment_id")],
+            outdoors=[getattr(conn, field) for conn in connections for field in ("from_outdoor_id", "to_outdoor_id")],
+        )
+
+    def __or__(self, other: "MapChange") -> "MapChange":
+        return MapChange(self.rooms | other.rooms, self.segments | other.segments, self.outdoors | other.outdoors)
+
+    def __repr__(self) -> str:
+        return f"MapChange(rooms={sorted(self.rooms)}, segments={sorted(self.segments)}, outdoors={sorted(self.outdoors)})"
+
+
+class ChangeData:
+    """Текущие строки БД, нужные для применения изменения: один набор запросов на все графы кеша."""
+
+    def __init__(self, db: Session, change: MapChange):
+        criteria = []
+        if change.rooms:
+            criteria.append(Connection.room_id.in_(change.rooms))
+        if change.segments:
+            criteria += [
+                Connection.segment_id.in_(change.segments),
+                Connection.from_segment_id.in_(change.segments),
+                Connection.to_segment_id.in_(change.segments),
+            ]
+        if change.outdoors:
+            criteria += [Connection.from_outdoor_id.in_(change.outdoors), Connection.to_outdoor_id.in_(change.outdoors)]
+        # Соединения, касающиеся затронутых сущностей, добавляются в граф заново целиком
+        self.connections: List = query_connections(db, or_(*criteria)) if criteria else []
+
+        # Вторые концы этих соединений не меняются, но их данные нужны для фантомных вершин
+        room_ids = change.rooms | {conn.room_id for conn in self.connections if conn.room_id}
+        segment_ids = change.segments | {
+            segment_id for conn in self.connections
+            for segment_id in (conn.segment_id, conn.from_segment_id, conn.to_segment_id) if segment_id
+        }
+        outdoor_ids = change.outdoors | {
+            outdoor_id for conn in self.connections
+            for outdoor_id in (conn.from_outdoor_id, conn.to_outdoor_id) if outdoor_id
+        }
+        self.rooms: Dict[int, object] = {room.id: room for room in query_rooms(db, Room.id.in_(room_ids))} if room_ids else {}
+        self.segments: Dict[int, object] = {
+            segment.id: segment for segment in query_segments(db, Segment.id.in_(segment_ids))
+        } if segment_ids else {}
+        self.outdoors: Dict[int, OutdoorSegment] = {
+            outdoor.id: outdoor for outdoor in db.query(OutdoorSegment).filter(OutdoorSegment.id.in_(outdoor_ids))
+        } if outdoor_ids else {}
+
+
+def patch_graph(graph, building_ids: FrozenSet[int], change: MapChange, data: ChangeData):
+    """
+    Применяет изменение к графу набора зданий building_ids.
+    Возвращает тот же граф, если изменение его не касается, изменённую копию (исходный граф
+    в это время могут читать другие запросы) или None, если граф нужно построить заново.
+
+    Вершины затронутых сущностей удаляются вместе с фантомными вершинами их соединений,
+    затем сущности и все касающиеся их соединения добавляются из БД теми же функциями,
+    что и в load_graph. Результат совпадает с полной перестройкой с точностью до порядка рёбер.
+    """
+    include_outdoor = len(building_ids) > 1
+    owned = [f"room_{room_id}" for room_id in change.rooms]
+    owned += [f"segment_{segment_id}_{end}" for segment_id in change.segments for end in ("start", "end")]
+    if include_outdoor:
+        owned += [f"outdoor_{outdoor_id}_{end}" for outdoor_id in change.outdoors for end in ("start", "end")]
+    present = [vertex for vertex in owned if vertex in graph.vertices]
+
+    rooms = [data.rooms[room_id] for room_id in change.rooms
+             if room_id in data.rooms and data.rooms[room_id].building_id in building_ids]
+    segments = [data.segments[segment_id] for segment_id in change.segments
+                if segment_id in data.segments and data.segments[segment_id].building_id in building_ids]
+    outdoors = [data.outdoors[outdoor_id] for outdoor_id in change.outdoors
+                if outdoor_id in data.outdoors] if include_outdoor else []
+
+    if not present and not rooms and not segments and not outdoors:
+        return graph
+    # Компактный граф (CSR) не изменяется по частям
+    if not settings.GRAPH_PATCHING or not isinstance(graph, Graph):
+        return None
+
+    patched = graph.copy()
+
+    # Фантомные вершины соединений смежны вершинам сущностей; пара вершин лестницы смежна между собой
+    removed = set(present)
+    stack = list(present)
+    while stack:
+        vertex = stack.pop()
+        for neighbor, _, _ in patched.edges[vertex]:
+            if neighbor.startswith("phantom_") and neighbor not in removed:
+                removed.add(neighbor)
+                stack.append(neighbor)
+    for vertex in removed:
+        patched.remove_vertex(vertex)
+
+    for room in rooms:
+        add_room(patched, room)
+    for segment in segments:
+        add_segment(patched, segment)
+    for outdoor in outdoors:
+        add_outdoor(patched, outdoor)
+
+    # Концы соединений берутся только из тех, что входят в граф, как в load_graph
+    segment_rows = {segment_id: row for segment_id, row in data.segments.items() if f"segment_{segment_id}_start" in patched.vertices}
+    outdoor_ids = {outdoor_id for outdoor_id in data.outdoors if f"outdoor_{outdoor_id}_start" in patched.vertices}
+    for conn in data.connections:
+        room = data.rooms.get(conn.room_id) if conn.room_id is not None else None
+        if room is not None and f"room_{room.id}" in patched.vertices:
+            add_room_connection(patched, room, conn, segment_rows)
+        add_connection(patched, conn, segment_rows, outdoor_ids)
+
+    # Расстояния от ориентиров ALT после изменения весов и рёбер могли стать недопустимой оценкой
+    refresh_landmarks(patched)
+    return patched
+
+
+def emit_map_change(db: Session, change: MapChange) -> None:
+    """
+    Вызывается CRUD после фиксации изменения в БД. Закешированные графы, которых касается
+    изменение, обновляются на месте без перестройки из БД; если обновить граф нельзя,
+    он сбрасывается, как при invalidate_graph_cache. Индексы этажей для поиска по точке
+    сбрасываются для этажей, где затронутые комнаты и сегменты были или оказались.
+    """
+    logger.info(f"Изменение карты: {change}")
+    try:
+        data = ChangeData(db, change)
+    except Exception as e:
+        logger.error(f"Не удалось загрузить данные изменения {change}: {str(e)}")
+        graph_cache.invalidate()
+        floor_indexes.invalidate()
+        notify_map_change()
+        return
+
+    floor_indexes.invalidate(
+        rooms=change.rooms, segments=change.segments,
+        floors={row.floor_id for row in [*data.rooms.values(), *data.segments.values()]},
+    )
+
+    def patcher(building_ids, graph):
+        try:
+            return patch_graph(graph, building_ids, change, data)
+        except Exception as e:
+            logger.error(f"Не удалось обновить граф для зданий {sorted(building_ids)}: {str(e)}")
+            return None
+
+    graph_cache.patch(patcher)
+    notify_map_change()
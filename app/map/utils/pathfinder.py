@@ -1,24 +1,63 @@
 # app/map/utils/pathfinder.py
-from typing import List
+from typing import Dict, List, Optional, Set, Tuple
 
 from .graph import Graph
+from .compact import CompactGraph
+from .contraction import ContractionHierarchy
+from bisect import bisect_left
 import heapq
 import math
 import logging
 
 logger = logging.getLogger(__name__)
 
-def find_path(graph: Graph, start: str, end: str) -> tuple:
+HEURISTICS = ("geometric", "alt", "combined")
+SEARCH_MODES = ("astar", "bidirectional", "ch")
+
+def find_path(graph: Graph, start: str, end: str, heuristic: str = "alt", mode: str = "astar") -> tuple:
+    """Поиск пути от start до end с фильтрацией служебных вершин (см. search_path)."""
+    path, weight = search_path(graph, start, end, heuristic, mode)
+    return filter_path(graph, path), weight
+
+def search_path(graph: Graph, start: str, end: str, heuristic: str = "alt", mode: str = "astar") -> tuple:
+    """
+    Поиск пути от start до end. Возвращает полный путь по вершинам графа (без filter_path):
+    граф неориентированный, поэтому такой путь можно развернуть для обратного запроса.
+    mode: astar — A*, bidirectional — двунаправленный A*, ch — запрос к иерархии сжатия
+    графа (строится при первом обращении).
+    heuristic (для A*) выбирает оценку расстояния до цели:
+    alt (по умолчанию) — нижняя граница по ориентирам (без ориентиров сводится к Дейкстре),
+    combined — максимум из неё и нижней границы по этажам (разность этажей, умноженная на
+    наименьший вес перехода на один этаж), geometric — евклидово расстояние со штрафом 10
+    за этаж: может переоценивать, потому что веса соединений не геометрические, и тогда
+    путь получается не кратчайшим.
+    Двунаправленный поиск всегда использует потенциалы ALT: ему нужна согласованная оценка,
+    а геометрическая ей не является. Без ориентиров он сводится к двунаправленному Дейкстре.
+    """
     logger.info(f"Начало поиска пути от {start} до {end}")
 
     if start not in graph.vertices or end not in graph.vertices:
         logger.error(f"Вершина {start} или {end} не найдена в графе")
         return [], float("inf")
 
+    if heuristic not in HEURISTICS:
+        raise ValueError(f"Неизвестная эвристика: {heuristic}")
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Неизвестный режим поиска: {mode}")
+
+    if mode == "ch":
+        return _find_path_ch(graph, start, end)
+    if mode == "bidirectional":
+        return _find_path_bidirectional(graph, start, end)
+
+    if isinstance(graph, CompactGraph):
+        return _find_path_compact(graph, start, end, heuristic)
+
+    estimate = graph.heuristic_to(end, heuristic)
     open_set = [(0, start)]
     came_from = {}
     g_scores = {start: 0}
-    f_scores = {start: graph.heuristic(start, end)}
+    f_scores = {start: estimate(start)}
     visited = set()
 
     while open_set:
@@ -32,7 +71,7 @@ def find_path(graph: Graph, start: str, end: str) -> tuple:
             path.append(start)
             path.reverse()
             logger.info(f"Путь найден: {path}, вес={g_scores[end]}")
-            return filter_path(graph, path), g_scores[end]
+            return path, g_scores[end]
 
         if current in visited:
             continue
@@ -46,77 +85,274 @@ def find_path(graph: Graph, start: str, end: str) -> tuple:
             if neighbor not in g_scores or tentative_g_score < g_scores[neighbor]:
                 came_from[neighbor] = current
                 g_scores[neighbor] = tentative_g_score
-                f_scores[neighbor] = tentative_g_score + graph.heuristic(neighbor, end)
+                f_scores[neighbor] = tentative_g_score + estimate(neighbor)
                 heapq.heappush(open_set, (f_scores[neighbor], neighbor))
 
     logger.info(f"Путь от {start} до {end} не найден")
     return [], float("inf")
 
+def _find_path_ch(graph: Graph, start: str, end: str) -> tuple:
+    if graph.hierarchy is None:
+        graph.hierarchy = ContractionHierarchy(graph)
+    path, weight = graph.hierarchy.query(start, end)
+    if not path:
+        logger.info(f"Путь от {start} до {end} не найден")
+        return [], float("inf")
+    logger.info(f"Путь найден: {path}, вес={weight}")
+    return path, weight
+
+def _find_path_bidirectional(graph: Graph, start: str, end: str) -> tuple:
+    # Средние потенциалы: p_f(v) = (pi_t(v) - pi_s(v)) / 2, p_r(v) = -p_f(v).
+    # Обе стороны тогда ищут в одном графе приведённых весов, и поиск можно
+    # останавливать, как только top_f + top_r >= mu (длина лучшего найденного пути)
+    potentials: Dict[str, float] = {}
+
+    def potential(vertex: str) -> float:
+        value = potentials.get(vertex)
+        if value is None:
+            value = potentials[vertex] = (graph.landmark_heuristic(vertex, end) - graph.landmark_heuristic(vertex, start)) / 2
+        return value
+
+    distances = ({start: 0.0}, {end: 0.0})
+    parents: Tuple[Dict[str, str], Dict[str, str]] = ({}, {})
+    open_sets = ([(potential(start), start)], [(-potential(end), end)])
+    visited = (set(), set())
+    best, meeting = (0.0, (start, start)) if start == end else (math.inf, None)
+
+    while open_sets[0] and open_sets[1]:
+        if open_sets[0][0][0] + open_sets[1][0][0] >= best:
+            break
+
+        side = 0 if open_sets[0][0][0] <= open_sets[1][0][0] else 1
+        sign = 1 if side == 0 else -1
+        _, current = heapq.heappop(open_sets[side])
+        if current in visited[side]:
+            continue
+        visited[side].add(current)
+
+        current_distance = distances[side][current]
+        for neighbor, weight, _ in graph.get_neighbors(current):
+            tentative = current_distance + weight
+            if tentative < distances[side].get(neighbor, math.inf):
+                distances[side][neighbor] = tentative
+                parents[side][neighbor] = current
+                heapq.heappush(open_sets[side], (tentative + sign * potential(neighbor), neighbor))
+            other = distances[1 - side].get(neighbor)
+            if other is not None and tentative + other < best:
+                best = tentative + other
+                meeting = (current, neighbor) if side == 0 else (neighbor, current)
+
+    if meeting is None:
+        logger.info(f"Путь от {start} до {end} не найден")
+        return [], float("inf")
+
+    # Путь: start .. u (прямой поиск), ребро u-v, v .. end (обратный поиск)
+    u, v = meeting
+    path = [u]
+    while path[-1] != start:
+        path.append(parents[0][path[-1]])
+    path.reverse()
+    if v != u:
+        path.append(v)
+    while path[-1] != end:
+        path.append(parents[1][path[-1]])
+
+    logger.info(f"Путь найден: {path}, вес={best}")
+    return path, best
+
+def _find_path_compact(graph: CompactGraph, start: str, end: str, heuristic: str) -> tuple:
+    # A* по целочисленным вершинам: имена нужны только для входа и результата
+    source, target = graph.vertex_id(start), graph.vertex_id(end)
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+    estimate = graph.heuristic_to(target, heuristic)
+
+    open_set = [(0.0, source)]
+    came_from = {}
+    g_scores = {source: 0.0}
+    visited = set()
+
+    while open_set:
+        _, current = heapq.heappop(open_set)
+
+        if current == target:
+            path = [current]
+            while current in came_from:
+                current = came_from[current]
+                path.append(current)
+            path = [graph.names[v] for v in reversed(path)]
+            logger.info(f"Путь найден: {path}, вес={g_scores[target]}")
+            return path, g_scores[target]
+
+        if current in visited:
+            continue
+
+        visited.add(current)
+        current_g = g_scores[current]
+        for k in range(offsets[current], offsets[current + 1]):
+            neighbor = targets[k]
+            if neighbor in visited:
+                continue
+
+            tentative_g_score = current_g + weights[k]
+            if tentative_g_score < g_scores.get(neighbor, math.inf):
+                came_from[neighbor] = current
+                g_scores[neighbor] = tentative_g_score
+                heapq.heappush(open_set, (tentative_g_score + estimate(neighbor), neighbor))
+
+    logger.info(f"Путь от {start} до {end} не найден")
+    return [], float("inf")
+
+def dijkstra(graph: Graph, source: str, limit: float = math.inf) -> Tuple[Dict[str, float], Dict[str, str]]:
+    """
+    Дерево кратчайших путей от source: расстояния до всех достижимых вершин и их предки.
+    limit — раскрывать только вершины не дальше limit; расстояния больше limit могут быть неточными.
+    """
+    distances = {source: 0.0}
+    parents: Dict[str, str] = {}
+    open_set = [(0.0, source)]
+    visited = set()
+
+    while open_set:
+        distance, current = heapq.heappop(open_set)
+        if distance > limit:
+            break
+        if current in visited:
+            continue
+        visited.add(current)
+        for neighbor, weight, _ in graph.get_neighbors(current):
+            tentative = distance + weight
+            if tentative < distances.get(neighbor, math.inf):
+                distances[neighbor] = tentative
+                parents[neighbor] = current
+                heapq.heappush(open_set, (tentative, neighbor))
+
+    return distances, parents
+
+def nearest_path(graph: Graph, start: str, goals: Set[str]) -> Tuple[Optional[str], List[str], float]:
+    """
+    Поиск Дейкстры от start сразу ко всем вершинам goals: останавливается на первой
+    достигнутой цели. Возвращает (цель, полный путь, вес) или (None, [], inf).
+    """
+    logger.info(f"Поиск ближайшей из {len(goals)} целей от {start}")
+    if start not in graph.vertices:
+        logger.error(f"Вершина {start} не найдена в графе")
+        return None, [], float("inf")
+
+    distances = {start: 0.0}
+    parents: Dict[str, str] = {}
+    open_set = [(0.0, start)]
+    visited = set()
+
+    while open_set:
+        distance, current = heapq.heappop(open_set)
+        if current in visited:
+            continue
+        if current in goals:
+            path = [current]
+            while path[-1] != start:
+                path.append(parents[path[-1]])
+            path.reverse()
+            logger.info(f"Ближайшая цель {current}, вес={distance}")
+            return current, path, distance
+        visited.add(current)
+        for neighbor, weight, _ in graph.get_neighbors(current):
+            tentative = distance + weight
+            if tentative < distances.get(neighbor, math.inf):
+                distances[neighbor] = tentative
+                parents[neighbor] = current
+                heapq.heappush(open_set, (tentative, neighbor))
+
+    logger.info(f"Ни одна из целей не достижима от {start}")
+    return None, [], float("inf")
+
 def filter_path(graph: Graph, path: List[str]) -> List[str]:
+    """
+    Убирает из пути служебные вершины сегментов, оставляя лестницы и уличные участки целиком.
+    Один проход по пути: типы рёбер и виды вершин вычисляются заранее, повторы отсекаются
+    множеством, а поиск _far-вершин идёт по таблице позиций вместо срезов пути.
+    """
+    n = len(path)
+    step_types = [graph.get_edge_data(path[k], path[k + 1]).get("type") for k in range(n - 1)]
+    positions: Dict[str, List[int]] = {}
+    for k, vertex in enumerate(path):
+        positions.setdefault(vertex, []).append(k)
+    kinds = {vertex: _vertex_kind(vertex) for vertex in positions}
+
     filtered_path = []
+    seen = set()
+
+    def add(vertex: str) -> None:
+        if vertex not in seen:
+            seen.add(vertex)
+            filtered_path.append(vertex)
+
+    def find(vertex: str, start: int) -> Optional[int]:
+        # Первая позиция вершины в path[start:], как path[start:].index(vertex) + start
+        indices = positions.get(vertex)
+        if not indices:
+            return None
+        k = bisect_left(indices, start)
+        return indices[k] if k < len(indices) else None
+
     i = 0
-    while i < len(path):
+    while i < n:
         vertex = path[i]
+        kind = kinds[vertex]
         # Пропускаем segment_X_start и segment_X_end
-        if vertex.startswith("segment_") and (vertex.endswith("_start") or vertex.endswith("_end")):
+        if kind == _SEGMENT_END:
             i += 1
             continue
 
-        if vertex not in filtered_path:
-            filtered_path.append(vertex)
+        add(vertex)
+        step = step_types[i] if i + 1 < n else None
 
         # Полностью отображаем лестницы (включая _far)
-        if i + 1 < len(path) and graph.get_edge_data(vertex, path[i + 1]).get("type") == "лестница":
-            while i + 1 < len(path) and graph.get_edge_data(path[i], path[i + 1]).get("type") == "лестница":
+        if step == "лестница":
+            while i + 1 < n and step_types[i] == "лестница":
                 i += 1
-                if path[i] not in filtered_path:
-                    filtered_path.append(path[i])
+                add(path[i])
             # Проверяем наличие _far точек
-            if vertex.startswith("phantom_stair_") and not vertex.endswith("_far"):
-                far_vertex = vertex + "_far"
-                if far_vertex in path[i:]:
-                    idx = path[i:].index(far_vertex) + i
-                    if far_vertex not in filtered_path:
-                        filtered_path.append(far_vertex)
+            if kind == _STAIR:
+                far_index = find(vertex + "_far", i)
+                if far_index is not None:
+                    add(vertex + "_far")
                     # Добавляем соответствующую _far точку для пары
-                    next_vertex = path[idx + 1] if idx + 1 < len(path) else None
-                    if next_vertex and next_vertex.startswith("phantom_stair_") and not next_vertex.endswith("_far"):
-                        far_next = next_vertex + "_far"
-                        if far_next in path[idx:]:
-                            if far_next not in filtered_path:
-                                filtered_path.append(far_next)
-                    i = idx
+                    if far_index + 1 < n:
+                        next_vertex = path[far_index + 1]
+                        if kinds[next_vertex] == _STAIR and find(next_vertex + "_far", far_index) is not None:
+                            add(next_vertex + "_far")
+                    i = far_index
 
         # Полностью отображаем уличные сегменты для "дверь-улица" или "улица-дверь"
-        elif i + 1 < len(path) and graph.get_edge_data(vertex, path[i + 1]).get("type") == "дверь":
-            next_vertex = path[i + 1]
-            if i + 2 < len(path):
-                next_next_vertex = path[i + 2]
-                if graph.get_edge_data(vertex, next_vertex).get("type") == "дверь":
-                    outdoor_id = None
-                    if next_vertex.startswith("outdoor_"):
-                        outdoor_id = int(next_vertex.split("_")[1])
-                    elif next_next_vertex.startswith("outdoor_"):
-                        outdoor_id = int(next_next_vertex.split("_")[1])
-                    if outdoor_id is not None:
-                        start_vertex = f"outdoor_{outdoor_id}_start"
-                        end_vertex = f"outdoor_{outdoor_id}_end"
-                        if start_vertex in path[i:i+3] and end_vertex in path[i:i+3]:
-                            # Добавляем только начальную и конечную точки уличного сегмента
-                            if start_vertex not in filtered_path:
-                                filtered_path.append(start_vertex)
-                            if end_vertex not in filtered_path:
-                                filtered_path.append(end_vertex)
-                            i += 2
-                        else:
-                            i += 1
-                    else:
-                        i += 1
-                else:
-                    i += 1
+        elif step == "дверь" and i + 2 < n:
+            next_vertex, next_next_vertex = path[i + 1], path[i + 2]
+            outdoor_id = None
+            if kinds[next_vertex] == _OUTDOOR:
+                outdoor_id = int(next_vertex.split("_")[1])
+            elif kinds[next_next_vertex] == _OUTDOOR:
+                outdoor_id = int(next_next_vertex.split("_")[1])
+            window = (vertex, next_vertex, next_next_vertex)
+            start_vertex = f"outdoor_{outdoor_id}_start"
+            end_vertex = f"outdoor_{outdoor_id}_end"
+            if outdoor_id is not None and start_vertex in window and end_vertex in window:
+                # Добавляем только начальную и конечную точки уличного сегмента
+                add(start_vertex)
+                add(end_vertex)
+                i += 2
             else:
                 i += 1
         else:
             i += 1
 
-    return filtered_path
\ No newline at end of file
+    return filtered_path
+
+_OTHER, _SEGMENT_END, _STAIR, _OUTDOOR = range(4)
+
+def _vertex_kind(vertex: str) -> int:
+    if vertex.startswith("segment_") and (vertex.endswith("_start") or vertex.endswith("_end")):
+        return _SEGMENT_END
+    if vertex.startswith("phantom_stair_") and not vertex.endswith("_far"):
+        return _STAIR
+    if vertex.startswith("outdoor_"):
+        return _OUTDOOR
+    return _OTHER
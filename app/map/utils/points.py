@@ -0,0 +1,218 @@
+# app/map/utils/points.py
+from collections import ChainMap
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from math import sqrt, inf, isfinite
+import logging
+
+from sqlalchemy.orm import Session
+
+from .compact import CompactGraph
+from .spatial import floor_indexes
+from app.database.config.settings import settings
+from app.map.models.building import Building
+
+logger = logging.getLogger(__name__)
+
+POINT_PREFIX = "point_"
+
+
+class MapPoint(NamedTuple):
+    building_id: int
+    floor_number: int
+    x: float
+    y: float
+
+
+def is_point(vertex: str) -> bool:
+    return vertex.startswith(POINT_PREFIX)
+
+
+def parse_point(vertex: str) -> MapPoint:
+    """Разбирает точку карты point_<building_id>_<floor_number>_<x>_<y>."""
+    try:
+        building_id, floor_number, x, y = vertex[len(POINT_PREFIX):].split("_")
+        point = MapPoint(int(building_id), int(floor_number), float(x), float(y))
+    except ValueError:
+        raise ValueError(f"Неверный формат точки, ожидается point_<building>_<floor>_<x>_<y>, получено {vertex}")
+    # float() принимает inf и nan: такие координаты не попадают ни в одну ячейку индекса
+    if not (isfinite(point.x) and isfinite(point.y)):
+        raise ValueError(f"Координаты точки {vertex} должны быть конечными числами")
+    return point
+
+
+class Snap(NamedTuple):
+    vertex: str  # Имя точки в запросе, оно же имя вершины разбиения
+    segment_id: int
+    x: float  # Проекция точки на сегмент
+    y: float
+    floor: int
+    building_id: int
+    distance: float  # От точки до сегмента
+
+
+def snap_point(db: Session, vertex: str, max_distance: Optional[float] = None) -> Snap:
+    """
+    Привязывает точку к ближайшему сегменту коридора того же этажа того же здания не дальше
+    max_distance (по умолчанию ROUTE_POINT_SNAP_MAX_DISTANCE) по индексу этажа (см. FloorIndexCache).
+    ValueError, если здания нет или рядом нет сегментов.
+    """
+    if max_distance is None:
+        max_distance = settings.ROUTE_POINT_SNAP_MAX_DISTANCE or inf
+    point = parse_point(vertex)
+    building = db.query(Building.campus_id).filter(Building.id == point.building_id).first()
+    if building is None:
+        raise ValueError(f"Здание с id {point.building_id} не найдено")
+    index = floor_indexes.get(db, building.campus_id, point.floor_number)
+
+    # В индексе этажа кампуса лежат сегменты всех зданий: поиск идёт только по сегментам здания точки
+    segment, snap_distance = index.nearest_segment(point.x, point.y, max_distance, point.building_id)
+    if segment is None:
+        raise ValueError(f"Рядом с точкой {vertex} нет коридоров")
+
+    dx, dy = segment.end_x - segment.start_x, segment.end_y - segment.start_y
+    length_2 = dx * dx + dy * dy
+    t = 0.0 if length_2 == 0 else max(0.0, min(1.0, ((point.x - segment.start_x) * dx + (point.y - segment.start_y) * dy) / length_2))
+    return Snap(
+        vertex, segment.id, segment.start_x + t * dx, segment.start_y + t * dy,
+        point.floor_number, point.building_id, snap_distance,
+    )
+
+
+class PointGraph:
+    """
+    Граф запроса с временными вершинами разбиения сегментов в точках привязки.
+    Закешированный граф не изменяется: вершина разбиения соединяется с концами своего
+    сегмента, а списки смежности этих концов дополняются только при обращении к ним.
+    Работает поверх Graph и CompactGraph через интерфейс по именам вершин.
+    Расстояния от ориентиров ALT до вершины разбиения точные: у неё только два соседа.
+    """
+
+    def __init__(self, graph, snaps: List[Snap]):
+        self.base = graph
+        self.hierarchy = None  # Иерархия сжатия построена без вершин разбиения
+        self.landmarks = graph.landmarks
+        self._data: Dict[str, dict] = {}
+        self._edges: Dict[str, List[Tuple[str, float, Dict[str, Any]]]] = {}
+
+        for snap in snaps:
+            self._data[snap.vertex] = {"coords": (snap.x, snap.y, snap.floor), "building_id": snap.building_id}
+            for end in ("start", "end"):
+                end_vertex = f"segment_{snap.segment_id}_{end}"
+                x, y, _ = graph.get_vertex_data(end_vertex)["coords"]
+                self._add_edge(snap.vertex, end_vertex, sqrt((x - snap.x) ** 2 + (y - snap.y) ** 2))
+        # Две точки на одном сегменте соединены напрямую, иначе путь между ними шёл бы через конец сегмента
+        for i, a in enumerate(snaps):
+            for b in snaps[i + 1:]:
+                if a.segment_id == b.segment_id and a.vertex != b.vertex:
+                    self._add_edge(a.vertex, b.vertex, sqrt((a.x - b.x) ** 2 + (a.y - b.y) ** 2))
+
+        self.vertices = ChainMap(self._data, graph.vertices)
+        self._landmark_distances = [
+            {vertex: min(
+                (self._base_landmark_distance(i, neighbor) + weight for neighbor, weight, _ in edges if neighbor not in self._data),
+                default=inf,
+            ) for vertex, edges in self._edges.items() if vertex in self._data}
+            for i in range(len(graph.landmarks))
+        ]
+
+    def _add_edge(self, a: str, b: str, weight: float) -> None:
+        weight = max(weight, 0.0)
+        self._edges.setdefault(a, []).append((b, weight, {"type": "segment"}))
+        self._edges.setdefault(b, []).append((a, weight, {"type": "segment"}))
+
+    def _base_landmark_distance(self, i: int, vertex: str) -> float:
+        distances = self.base.landmark_distances[i]
+        if isinstance(self.base, CompactGraph):
+            return distances[self.base.index[vertex]]
+        return distances.get(vertex, inf)
+
+    def _landmark_distance(self, i: int, vertex: str) -> float:
+        if vertex in self._data:
+            return self._landmark_distances[i][vertex]
+        return self._base_landmark_distance(i, vertex)
+
+    def get_vertex_data(self, vertex: str) -> dict:
+        data = self._data.get(vertex)
+        return data if data is not None else self.base.get_vertex_data(vertex)
+
+    def get_neighbors(self, vertex: str) -> List[Tuple[str, float, Dict[str, Any]]]:
+        extra = self._edges.get(vertex)
+        if vertex in self._data:
+            return extra
+        neighbors = self.base.get_neighbors(vertex)
+        return neighbors + extra if extra else neighbors
+
+    def _extra_edge(self, from_vertex: str, to_vertex: str) -> Optional[Tuple[str, float, Dict[str, Any]]]:
+        for edge in self._edges.get(from_vertex, ()):
+            if edge[0] == to_vertex:
+                return edge
+        return None
+
+    def get_edge_data(self, from_vertex: str, to_vertex: str) -> Dict[str, Any]:
+        edge = self._extra_edge(from_vertex, to_vertex)
+        return edge[2] if edge else self.base.get_edge_data(from_vertex, to_vertex)
+
+    def get_edge_weight(self, from_vertex: str, to_vertex: str) -> float:
+        edge = self._extra_edge(from_vertex, to_vertex)
+        return edge[1] if edge else self.base.get_edge_weight(from_vertex, to_vertex)
+
+    def heuristic(self, vertex1: str, vertex2: str) -> float:
+        return self.heuristic_to(vertex2, "geometric")(vertex1)
+
+    def landmark_heuristic(self, a: str, b: str) -> float:
+        bound = 0.0
+        for i in range(len(self.landmarks)):
+            distance_a, distance_b = self._landmark_distance(i, a), self._landmark_distance(i, b)
+            if distance_a != inf and distance_b != inf:
+                bound = max(bound, abs(distance_a - distance_b))
+        return bound
+
+    def heuristic_to(self, end: str, heuristic: str = "geometric") -> Callable[[str], float]:
+        """Оценка расстояния до end, как Graph.heuristic_to, с учётом вершин разбиения."""
+        tx, ty, tf = self.get_vertex_data(end)["coords"]
+        use_geometric = heuristic == "geometric"
+        # Рёбра к вершинам разбиения не меняют этаж: оценка по этажам исходного графа остаётся допустимой
+        floor_weight = self.base.floor_weight() if heuristic == "combined" else 0.0
+        has_position = tx is not None and ty is not None
+        tables = [] if heuristic == "geometric" else [
+            (i, self._landmark_distance(i, end)) for i in range(len(self.landmarks))
+        ]
+        tables = [(i, distance_end) for i, distance_end in tables if distance_end != inf]
+        memo: Dict[str, float] = {}
+
+        def estimate(vertex: str) -> float:
+            value = memo.get(vertex)
+            if value is not None:
+                return value
+            value = 0.0
+            if use_geometric:
+                x, y, floor = self.get_vertex_data(vertex)["coords"]
+                if has_position and x is not None and y is not None:
+                    value = sqrt((x - tx) ** 2 + (y - ty) ** 2)
+                value += abs(floor - tf) * 10
+            elif floor_weight:
+                value = abs(self.get_vertex_data(vertex)["coords"][2] - tf) * floor_weight
+            for i, distance_end in tables:
+                distance = self._landmark_distance(i, vertex)
+                if distance != inf and abs(distance - distance_end) > value:
+                    value = abs(distance - distance_end)
+            memo[vertex] = value
+            return value
+
+        return estimate
+
+
+def with_points(db: Session, graph, *vertices: str):
+    """
+    Граф запроса, в котором есть точки карты среди vertices (см. PointGraph).
+    Если точек нет, возвращает сам граф.
+    """
+    points = sorted({vertex for vertex in vertices if is_point(vertex)})
+    if not points:
+        return graph
+    snaps = [snap_point(db, vertex) for vertex in points]
+    for snap in snaps:
+        if f"segment_{snap.segment_id}_start" not in graph.vertices:
+            raise ValueError(f"Сегмент {snap.segment_id} точки {snap.vertex} не входит в граф")
+        logger.info(f"Точка {snap.vertex} привязана к сегменту {snap.segment_id} на расстоянии {snap.distance:.1f}")
+    return PointGraph(graph, snaps)
@@ -0,0 +1,82 @@
+# app/map/utils/profiles.py
+from array import array
+from typing import Any, Dict, Optional
+import math
+import threading
+import weakref
+import logging
+
+from .graph import Graph
+from .compact import CompactGraph
+
+logger = logging.getLogger(__name__)
+
+# Профили маршрутизации: множитель веса для вида ребра (см. edge_kind), inf — ребро закрыто.
+# Множители не меньше 1, поэтому расстояния от ориентиров ALT исходного графа остаются
+# допустимой оценкой и для графа профиля
+PROFILES: Dict[str, Dict[str, float]] = {
+    "hurry": {},  # Кратчайший путь без ограничений
+    "wheelchair": {"лестница": math.inf, "горка": math.inf},  # Между этажами только на лифте
+}
+
+# Графы профилей для каждого закешированного графа: пропадают вместе с исходным графом
+_overlays: "weakref.WeakKeyDictionary[Any, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def edge_kind(edge_data: Dict[str, Any]) -> Optional[str]:
+    """Вид ребра для профиля: тип соединения для переходов между этажами, иначе тип ребра."""
+    return edge_data.get("connection") or edge_data.get("type")
+
+
+def profile_graph(graph, profile: Optional[str]):
+    """
+    Граф для поиска по профилю: та же топология с весами профиля. Для профиля без множителей
+    (или None) возвращается сам граф. Граф профиля строится один раз на закешированный граф
+    без обращения к БД: у CompactGraph заменяется только массив весов (закрытые рёбра — inf),
+    у Graph — списки смежности, данные вершин и ориентиры общие.
+    """
+    if profile is None:
+        return graph
+    factors = PROFILES.get(profile)
+    if factors is None:
+        raise ValueError(f"Неизвестный профиль маршрутизации: {profile}")
+    if not factors:
+        return graph
+
+    with _lock:
+        overlay = _overlays.setdefault(graph, {}).get(profile)
+    if overlay is None:
+        overlay = _build_overlay(graph, factors)
+        with _lock:
+            overlay = _overlays[graph].setdefault(profile, overlay)
+        logger.info(f"Построен граф профиля {profile}: {len(graph.vertices)} вершин")
+    return overlay
+
+
+def _build_overlay(graph, factors: Dict[str, float]):
+    if any(factor < 1 for factor in factors.values()):
+        raise ValueError("Множители профиля должны быть не меньше 1")
+
+    if isinstance(graph, CompactGraph):
+        code_factors = [factors.get(edge_kind(edge_type), 1.0) for edge_type in graph.edge_types]
+        weights = array("d", (weight * code_factors[code] for weight, code in zip(graph.weights, graph.edge_codes)))
+        return graph.with_weights(weights)
+
+    # В Graph закрытое ребро удаляется: A* по словарям не отсеивает бесконечные веса
+    overlay = Graph()
+    overlay.vertices = graph.vertices
+    for vertex, neighbors in graph.edges.items():
+        edges = []
+        index = {}
+        for neighbor, weight, edge_data in neighbors:
+            factor = factors.get(edge_kind(edge_data), 1.0)
+            if factor == math.inf:
+                continue
+            edges.append((neighbor, weight * factor, edge_data))
+            index.setdefault(neighbor, (weight * factor, edge_data))
+        overlay.edges[vertex] = edges
+        overlay.edge_index[vertex] = index
+    overlay.landmarks = graph.landmarks
+    overlay.landmark_distances = graph.landmark_distances
+    return overlay
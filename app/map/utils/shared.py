@@ -0,0 +1,263 @@
+# app/map/utils/shared.py
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+import fcntl
+import inspect
+import os
+import secrets
+import threading
+import logging
+
+from sqlalchemy.orm import Session
+
+from .compact import CompactGraph
+from .cache import graph_cache
+from .snapshot import decode_snapshot, encode_snapshot, map_fingerprint
+from app.database.config.settings import settings
+from app.database.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Имена сегментов: короткие, чтобы уложиться в ограничение длины имени POSIX shm на macOS (31 символ)
+SEGMENT_PREFIX = "mapgraph_"
+
+
+# Python 3.13+ умеет не регистрировать сегмент в resource_tracker; в старых версиях снимаем регистрацию вручную
+_TRACK_PARAMETER = "track" in inspect.signature(shared_memory.SharedMemory).parameters
+
+
+def _open_segment(name: str, create: bool = False, size: int = 0) -> shared_memory.SharedMemory:
+    # Сегментом владеет указатель, а не процесс: resource_tracker не должен удалять его
+    # при завершении воркера или публикатора
+    if _TRACK_PARAMETER:
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    segment = shared_memory.SharedMemory(name=name, create=create, size=size)
+    resource_tracker.unregister(segment._name, "shared_memory")
+    return segment
+
+
+def _unlink_segment(name: str) -> None:
+    try:
+        segment = _open_segment(name)
+    except FileNotFoundError:
+        return
+    segment.close()
+    if not _TRACK_PARAMETER:
+        # unlink() в старых версиях снимает регистрацию, которой уже нет
+        resource_tracker.register(segment._name, "shared_memory")
+    segment.unlink()
+
+
+def read_pointer(pointer_path: str) -> Optional[str]:
+    """Имя текущего сегмента с графами или None, если ещё ничего не опубликовано."""
+    try:
+        with open(pointer_path, encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def publish_graphs(pointer_path: str, graphs: Dict[FrozenSet[int], CompactGraph], fingerprint: str) -> str:
+    """
+    Публикует новую версию графов: снимок пишется в новый сегмент разделяемой памяти,
+    затем указатель атомарно переключается на него (os.replace). Воркеры видят либо старую,
+    либо новую версию целиком. Предыдущий сегмент удаляется из пространства имён сразу:
+    уже подключённые воркеры продолжают читать его, пока не переключатся.
+    Возвращает имя нового сегмента.
+    """
+    data = encode_snapshot(graphs, fingerprint)
+    name = f"{SEGMENT_PREFIX}{secrets.token_hex(6)}"
+    segment = _open_segment(name, create=True, size=len(data))
+    try:
+        segment.buf[:len(data)] = data
+    finally:
+        segment.close()
+
+    previous = read_pointer(pointer_path)
+    tmp_path = f"{pointer_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(tmp_path, pointer_path)
+
+    if previous and previous != name:
+        _unlink_segment(previous)
+    logger.info(f"Опубликованы графы в разделяемой памяти {name}: {len(graphs)} графов, {len(data) / 1024:.0f} KiB")
+    return name
+
+
+def unpublish_graphs(pointer_path: str) -> None:
+    """Удаляет текущий сегмент и указатель."""
+    name = read_pointer(pointer_path)
+    if name:
+        _unlink_segment(name)
+    try:
+        os.remove(pointer_path)
+    except FileNotFoundError:
+        pass
+
+
+class SharedGraphs:
+    """
+    Подключение воркера к графам в разделяемой памяти. Массивы CompactGraph — memoryview
+    над сегментом, поэтому страницы графа общие для всех воркеров; в каждом процессе
+    заводятся только имена вершин и их индекс.
+    """
+
+    def __init__(self, pointer_path: str):
+        self.pointer_path = pointer_path
+        self.name: Optional[str] = None
+        self.header: Optional[dict] = None
+        self.graphs: Dict[FrozenSet[int], CompactGraph] = {}
+        self._segment: Optional[shared_memory.SharedMemory] = None
+        self._retired: List[shared_memory.SharedMemory] = []
+        self._lock = threading.Lock()
+
+    def refresh(self) -> bool:
+        """Переподключается, если указатель сменился. Возвращает True при смене версии."""
+        name = read_pointer(self.pointer_path)
+        with self._lock:
+            switched = False
+            if name and name != self.name:
+                try:
+                    self._attach(name)
+                    switched = True
+                except FileNotFoundError:
+                    # Между чтением указателя и подключением вышла ещё более новая версия —
+                    # подхватим её при следующем обращении
+                    logger.warning(f"Сегмент графов {name} уже удалён, используется предыдущая версия")
+                except ValueError as e:
+                    # Сегмент в другом формате (опубликован прежней версией приложения) —
+                    # ensure_shared_graphs опубликует графы заново
+                    logger.warning(f"Сегмент графов {name} не подходит: {str(e)}")
+            self._release_retired()
+            return switched
+
+    def current(self) -> Tuple[Optional[dict], Dict[FrozenSet[int], CompactGraph]]:
+        """Заголовок и графы текущей опубликованной версии."""
+        self.refresh()
+        with self._lock:
+            return self.header, self.graphs
+
+    def _attach(self, name: str) -> None:
+        segment = _open_segment(name)
+        header, graphs = decode_snapshot(segment.buf)
+        if self._segment is not None:
+            self._retired.append(self._segment)
+        self._segment, self.name, self.header, self.graphs = segment, name, header, graphs
+        logger.info(f"Подключены графы из разделяемой памяти {name}, созданы {header['created_at']}")
+
+    def _release_retired(self) -> None:
+        # Старый сегмент можно отключить, только когда на его память не осталось ссылок
+        # (графы старой версии вытеснены из кеша и не используются запросами)
+        still_used = []
+        for segment in self._retired:
+            try:
+                segment.close()
+            except BufferError:
+                still_used.append(segment)
+        self._retired = still_used
+
+
+_shared_graphs: Optional[SharedGraphs] = None
+
+
+def shared_graphs() -> Optional[SharedGraphs]:
+    global _shared_graphs
+    if not settings.GRAPH_SHARED_MEMORY:
+        return None
+    if _shared_graphs is None or _shared_graphs.pointer_path != settings.GRAPH_SHARED_MEMORY:
+        _shared_graphs = SharedGraphs(settings.GRAPH_SHARED_MEMORY)
+    return _shared_graphs
+
+
+# Отпечаток карты для версии graph_cache: любое изменение из CRUD и смена опубликованных
+# графов увеличивают версию, поэтому между ними отпечаток не пересчитывается
+_fingerprint: Tuple[Optional[int], str] = (None, "")
+_fingerprint_lock = threading.Lock()
+
+
+def current_fingerprint(db: Session) -> str:
+    global _fingerprint
+    version = graph_cache.version
+    with _fingerprint_lock:
+        if _fingerprint[0] == version:
+            return _fingerprint[1]
+    fingerprint = map_fingerprint(db)
+    with _fingerprint_lock:
+        _fingerprint = (version, fingerprint)
+    return fingerprint
+
+
+def shared_graph(db: Session, building_ids: FrozenSet[int]) -> Optional[CompactGraph]:
+    """
+    Граф из разделяемой памяти для набора зданий или None, если режим выключен,
+    такого графа нет или опубликованная версия не совпадает с данными карты.
+    """
+    shared = shared_graphs()
+    if shared is None:
+        return None
+    header, graphs = shared.current()
+    graph = graphs.get(building_ids)
+    if graph is None:
+        return None
+    if header["fingerprint"] != current_fingerprint(db):
+        logger.warning(f"Графы в разделяемой памяти {shared.name} устарели, граф будет построен из БД")
+        return None
+    return graph
+
+
+def ensure_shared_graphs(db: Session, build: Callable[[], Dict[FrozenSet[int], CompactGraph]]) -> bool:
+    """
+    Вызывается каждым воркером при старте и после изменений карты (schedule_republish).
+    Под файловой блокировкой только один процесс
+    строит и публикует графы, если актуальной версии ещё нет; остальные дожидаются его
+    и подключаются. Возвращает True, если графы опубликовал этот процесс.
+    """
+    with open(f"{settings.GRAPH_SHARED_MEMORY}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            fingerprint = map_fingerprint(db)
+            header, _ = shared_graphs().current()
+            if header is not None and header["fingerprint"] == fingerprint:
+                return False
+            publish_graphs(settings.GRAPH_SHARED_MEMORY, build(), fingerprint)
+            return True
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+_republish_timer: Optional[threading.Timer] = None
+_republish_lock = threading.Lock()
+
+
+def schedule_republish(build: Callable[[Session], Dict[FrozenSet[int], CompactGraph]]) -> None:
+    """
+    Откладывает повторную публикацию графов после изменения карты на GRAPH_SHARED_REPUBLISH_DELAY:
+    все правки, пришедшие до срабатывания таймера, попадают в одну сборку. Публикация идёт
+    через ensure_shared_graphs — под файловой блокировкой и со сменой указателя, поэтому
+    из нескольких воркеров, получивших правки, графы строит только один.
+    """
+    global _republish_timer
+    if not settings.GRAPH_SHARED_MEMORY:
+        return
+    with _republish_lock:
+        if _republish_timer is not None:
+            return
+        _republish_timer = threading.Timer(settings.GRAPH_SHARED_REPUBLISH_DELAY, _republish, args=(build,))
+        _republish_timer.daemon = True
+        _republish_timer.start()
+
+
+def _republish(build: Callable[[Session], Dict[FrozenSet[int], CompactGraph]]) -> None:
+    global _republish_timer
+    # Правки, пришедшие во время сборки, запланируют следующую публикацию
+    with _republish_lock:
+        _republish_timer = None
+    db = SessionLocal()
+    try:
+        if ensure_shared_graphs(db, lambda: build(db)):
+            logger.info("Графы в разделяемой памяти опубликованы заново после изменения карты")
+    except Exception as e:
+        logger.error(f"Не удалось опубликовать графы в разделяемой памяти: {str(e)}")
+    finally:
+        db.close()
@@ -0,0 +1,180 @@
+# app/map/utils/snapshot.py
+from array import array
+from datetime import datetime
+from typing import Dict, FrozenSet, List, Tuple
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+import logging
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .compact import CompactGraph
+from .cache import graph_cache
+from app.map.models.room import Room
+from app.map.models.floor import Floor
+from app.map.models.segment import Segment
+from app.map.models.connection import Connection
+from app.map.models.outdoor_segment import OutdoorSegment
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"MAUGRAPH"
+FORMAT_VERSION = 2  # 2: тип соединения в данных рёбер между этажами
+_PREAMBLE = struct.Struct("<8sII")  # magic, версия формата, длина JSON-заголовка
+_ALIGN = 8
+
+# Массивы CompactGraph, которые пишутся в снимок как есть
+_ARRAYS = ("xs", "ys", "floors", "building_ids", "offsets", "targets", "weights", "edge_codes")
+
+# Колонки, от которых зависит граф: по ним считается отпечаток карты
+_FINGERPRINT_COLUMNS = {
+    Room: (Room.building_id, Room.floor_id, Room.cab_x, Room.cab_y),
+    Floor: (Floor.building_id, Floor.floor_number),
+    Segment: (Segment.start_x, Segment.start_y, Segment.end_x, Segment.end_y, Segment.floor_id, Segment.building_id),
+    Connection: (
+        Connection.weight, Connection.room_id, Connection.segment_id, Connection.from_segment_id,
+        Connection.to_segment_id, Connection.from_outdoor_id, Connection.to_outdoor_id,
+        Connection.from_floor_id, Connection.to_floor_id,
+    ),
+    OutdoorSegment: (OutdoorSegment.start_x, OutdoorSegment.start_y, OutdoorSegment.end_x, OutdoorSegment.end_y, OutdoorSegment.weight),
+}
+
+
+def map_fingerprint(db: Session) -> str:
+    """
+    Дешёвый отпечаток данных карты: по одному агрегирующему запросу на таблицу.
+    Суммы значений, умноженных на ID строки, меняются при любой правке координат, весов и связей.
+    Тип соединения строковый: по нему считаются число и сумма ID строк каждого типа.
+    """
+    parts = []
+    for model, columns in _FINGERPRINT_COLUMNS.items():
+        row = db.query(func.count(model.id), func.sum(model.id), *[func.sum(model.id * column) for column in columns]).one()
+        parts.append(f"{model.__tablename__}:{','.join(repr(value) for value in row)}")
+    types = db.query(Connection.type, func.count(Connection.id), func.sum(Connection.id)).group_by(Connection.type).order_by(Connection.type)
+    parts.append(f"types:{','.join(repr(tuple(row)) for row in types)}")
+    return hashlib.sha256(";".join(parts).encode()).hexdigest()[:32]
+
+
+def encode_snapshot(graphs: Dict[FrozenSet[int], CompactGraph], fingerprint: str, compress: bool = False) -> bytes:
+    """Сериализует графы в формат снимка (файл или сегмент разделяемой памяти)."""
+    chunks: List[bytes] = []
+    offset = 0
+
+    def section(data: bytes) -> List[int]:
+        nonlocal offset
+        raw_length = len(data)
+        if compress:
+            data = zlib.compress(data)
+        start = offset
+        chunks.append(data)
+        padding = -len(data) % _ALIGN
+        chunks.append(b"\0" * padding)
+        offset += len(data) + padding
+        return [start, len(data), raw_length]
+
+    entries = []
+    for key, graph in graphs.items():
+        sections = {name: section(getattr(graph, name).tobytes()) for name in _ARRAYS}
+        sections["names"] = section("\n".join(graph.names).encode("utf-8"))
+        for i, distances in enumerate(graph.landmark_distances):
+            sections[f"landmark_{i}"] = section(array("d", distances).tobytes())
+        entries.append({
+            "buildings": sorted(key),
+            "vertices": len(graph.names),
+            "edge_types": graph.edge_types,
+            "landmarks": graph.landmarks,
+            "sections": sections,
+        })
+
+    header = json.dumps({
+        "fingerprint": fingerprint,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "byteorder": sys.byteorder,
+        "itemsizes": {typecode: array(typecode).itemsize for typecode in "dHi"},
+        "compressed": compress,
+        "graphs": entries,
+    }, ensure_ascii=False).encode("utf-8")
+    header += b" " * (-(_PREAMBLE.size + len(header)) % _ALIGN)
+
+    return b"".join([_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)), header, *chunks])
+
+
+def write_snapshot(path: str, graphs: Dict[FrozenSet[int], CompactGraph], fingerprint: str, compress: bool = False) -> int:
+    """Записывает графы в файл снимка, возвращает его размер в байтах."""
+    data = encode_snapshot(graphs, fingerprint, compress)
+    # Пишем во временный файл и переименовываем, чтобы воркеры не увидели недописанный снимок
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+def load_snapshot(path: str) -> Tuple[dict, Dict[FrozenSet[int], CompactGraph]]:
+    """
+    Отображает файл снимка в память и возвращает (заголовок, графы по наборам зданий).
+    Массивы несжатого снимка — представления memoryview над mmap: страницы файла
+    не копируются и делятся между всеми воркерами, открывшими тот же файл.
+    """
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header, graphs = decode_snapshot(buffer)
+    logger.info(f"Загружен снимок графа {path}: {len(graphs)} графов, создан {header['created_at']}")
+    return header, graphs
+
+
+def decode_snapshot(buffer) -> Tuple[dict, Dict[FrozenSet[int], CompactGraph]]:
+    """Читает снимок из буфера (mmap, разделяемая память) без копирования несжатых массивов."""
+    magic, version, header_length = _PREAMBLE.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("Буфер не является снимком графа")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Версия формата снимка {version}, ожидается {FORMAT_VERSION}")
+    header = json.loads(bytes(memoryview(buffer)[_PREAMBLE.size:_PREAMBLE.size + header_length]))
+    itemsizes = {typecode: array(typecode).itemsize for typecode in "dHi"}
+    if header["byteorder"] != sys.byteorder or header["itemsizes"] != itemsizes:
+        raise ValueError("Снимок собран на платформе с другим представлением чисел")
+
+    data = memoryview(buffer)[_PREAMBLE.size + header_length:]
+    compressed = header["compressed"]
+
+    def read(section: List[int]) -> memoryview:
+        start, length, raw_length = section
+        chunk = data[start:start + length]
+        return memoryview(zlib.decompress(chunk)) if compressed else chunk
+
+    graphs = {}
+    for entry in header["graphs"]:
+        sections = entry["sections"]
+        arrays = {name: read(sections[name]).cast(typecode) for name, typecode in (
+            ("xs", "d"), ("ys", "d"), ("floors", "i"), ("building_ids", "i"),
+            ("offsets", "i"), ("targets", "i"), ("weights", "d"), ("edge_codes", "H"),
+        )}
+        names = bytes(read(sections["names"])).decode("utf-8").split("\n") if entry["vertices"] else []
+        graph = CompactGraph(names, edge_types=entry["edge_types"], **arrays)
+        graph.landmarks = entry["landmarks"]
+        graph.landmark_distances = [read(sections[f"landmark_{i}"]).cast("d") for i in range(len(entry["landmarks"]))]
+        graphs[frozenset(entry["buildings"])] = graph
+    return header, graphs
+
+
+def preload_snapshot(db: Session, path: str) -> int:
+    """
+    Загружает графы из снимка в кеш графов. Снимок отбрасывается, если данные карты
+    изменились после его сборки. Возвращает число загруженных графов.
+    """
+    header, graphs = load_snapshot(path)
+    fingerprint = map_fingerprint(db)
+    if header["fingerprint"] != fingerprint:
+        logger.warning(f"Снимок графа {path} устарел (создан {header['created_at']}), графы будут построены из БД")
+        return 0
+    # Снимок сверен с отпечатком карты: графы не истекают по TTL, их сбрасывает только запись в CRUD
+    for key, graph in graphs.items():
+        graph_cache.put(key, graph, expires=False)
+    return len(graphs)
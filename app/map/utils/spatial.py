@@ -0,0 +1,318 @@
+# app/map/utils/spatial.py
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+import math
+import threading
+import time
+import logging
+
+from sqlalchemy import exists
+from sqlalchemy.orm import Session
+
+from app.database.config.settings import settings
+from app.map.models.building import Building
+from app.map.models.floor import Floor
+from app.map.models.room import Room
+from app.map.models.segment import Segment
+from app.map.models.connection import Connection
+
+logger = logging.getLogger(__name__)
+
+
+class GridIndex:
+    """
+    Равномерная сетка над объектами одного этажа: объект попадает во все ячейки,
+    которые пересекает его ограничивающий прямоугольник. Поиск ближайшего объекта
+    просматривает ячейки кольцами вокруг точки и останавливается, как только следующее
+    кольцо заведомо дальше лучшего найденного объекта.
+    """
+
+    def __init__(self, cell: float):
+        self.cell = cell
+        self.cells: Dict[Tuple[int, int], List[Tuple[int, Any]]] = {}  # (порядковый номер, объект)
+        self.count = 0
+        self._bounds: Optional[List[int]] = None  # min_cx, min_cy, max_cx, max_cy занятых ячеек
+
+    def _cell_of(self, x: float, y: float) -> Tuple[int, int]:
+        return math.floor(x / self.cell), math.floor(y / self.cell)
+
+    def insert(self, item: Any, min_x: float, min_y: float, max_x: float, max_y: float) -> None:
+        (x0, y0), (x1, y1) = self._cell_of(min_x, min_y), self._cell_of(max_x, max_y)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                self.cells.setdefault((cx, cy), []).append((self.count, item))
+        self.count += 1
+        if self._bounds is None:
+            self._bounds = [x0, y0, x1, y1]
+        else:
+            bounds = self._bounds
+            bounds[0], bounds[1] = min(bounds[0], x0), min(bounds[1], y0)
+            bounds[2], bounds[3] = max(bounds[2], x1), max(bounds[3], y1)
+
+    def at(self, x: float, y: float) -> List[Any]:
+        """Объекты, прямоугольники которых могут содержать точку (x, y)."""
+        return [item for _, item in self.cells.get(self._cell_of(x, y), ())]
+
+    def _rings(self, cx: int, cy: int) -> Iterator[Tuple[int, List[Tuple[int, int]]]]:
+        # Кольцо r — ячейки на расстоянии r по Чебышёву от ячейки точки. Просматриваются только
+        # части колец внутри занятых ячеек, кольца до первой и после последней занятой ячейки
+        # пропускаются: для точки далеко от этажа поиск не дольше, чем для точки на этаже
+        min_cx, min_cy, max_cx, max_cy = self._bounds
+        first = max(min_cx - cx, cx - max_cx, min_cy - cy, cy - max_cy, 0)
+        last = max(cx - min_cx, max_cx - cx, cy - min_cy, max_cy - cy, 0)
+        for r in range(first, last + 1):
+            ring = []
+            x0, x1 = max(cx - r, min_cx), min(cx + r, max_cx)
+            for y in {cy - r, cy + r}:
+                if min_cy <= y <= max_cy:
+                    ring += [(x, y) for x in range(x0, x1 + 1)]
+            y0, y1 = max(cy - r + 1, min_cy), min(cy + r - 1, max_cy)
+            for x in {cx - r, cx + r}:
+                if min_cx <= x <= max_cx:
+                    ring += [(x, y) for y in range(y0, y1 + 1)]
+            yield r, ring
+
+    def nearest(self, x: float, y: float, distance: Callable[[Any], float],
+                max_distance: float = math.inf) -> Tuple[Optional[Any], float]:
+        """
+        Ближайший к точке объект по функции distance и расстояние до него; (None, inf), если
+        в пределах max_distance нет. При равных расстояниях — объект, вставленный раньше.
+        """
+        best, best_distance, best_number = None, math.inf, -1
+        if self._bounds is None:
+            return best, best_distance
+        seen: Set[int] = set()
+        for r, ring in self._rings(*self._cell_of(x, y)):
+            # Любая точка кольца r не ближе (r - 1) * cell: точка лежит внутри своей ячейки
+            if min(best_distance, max_distance) < (r - 1) * self.cell:
+                break
+            for key in ring:
+                for number, item in self.cells.get(key, ()):
+                    if number in seen:
+                        continue
+                    seen.add(number)
+                    d = distance(item)
+                    if d < best_distance or d == best_distance and number < best_number:
+                        best, best_distance, best_number = item, d, number
+        if best_distance > max_distance:
+            return None, math.inf
+        return best, best_distance
+
+
+def point_segment_distance(x: float, y: float, x1: float, y1: float, x2: float, y2: float) -> float:
+    dx, dy = x2 - x1, y2 - y1
+    length_2 = dx * dx + dy * dy
+    t = 0.0 if length_2 == 0 else max(0.0, min(1.0, ((x - x1) * dx + (y - y1) * dy) / length_2))
+    return math.hypot(x - (x1 + t * dx), y - (y1 + t * dy))
+
+
+def segment_indexes(db: Session, *criteria) -> Dict[int, GridIndex]:
+    """
+    Сетки сегментов по этажам (floor_id) одним запросом. Размер ячейки — средняя длина
+    сегмента этажа: коридор занимает несколько ячеек, а в ячейке немного сегментов.
+    При равном расстоянии ближайшим считается сегмент с меньшим ID.
+    """
+    rows = db.query(
+        Segment.id, Segment.floor_id, Segment.start_x, Segment.start_y, Segment.end_x, Segment.end_y
+    ).filter(*criteria).order_by(Segment.id).all()
+    by_floor: Dict[int, List] = {}
+    for row in rows:
+        by_floor.setdefault(row.floor_id, []).append(row)
+
+    return {floor_id: _segment_grid(segments) for floor_id, segments in by_floor.items()}
+
+
+def _segment_grid(segments: list) -> GridIndex:
+    extent = sum(max(abs(s.end_x - s.start_x), abs(s.end_y - s.start_y)) for s in segments) / len(segments) if segments else 1.0
+    index = GridIndex(max(extent, 1.0))
+    for s in segments:
+        index.insert(s, min(s.start_x, s.end_x), min(s.start_y, s.end_y), max(s.start_x, s.end_x), max(s.start_y, s.end_y))
+    return index
+
+
+class ProposedConnection(NamedTuple):
+    room_id: int
+    segment_id: int
+    distance: float
+
+
+def propose_room_connections(db: Session, *criteria, max_distance: float = math.inf,
+                             only_unconnected: bool = True) -> List[ProposedConnection]:
+    """
+    Для комнат, отобранных условиями criteria, находит ближайший к входу (cab_x, cab_y)
+    сегмент того же этажа. only_unconnected — только комнаты без соединений с коридором:
+    без них комната недостижима при построении графа. Комнаты без координат входа
+    и без сегментов на этаже (или дальше max_distance) пропускаются.
+    """
+    query = db.query(Room.id, Room.floor_id, Room.cab_x, Room.cab_y).filter(
+        Room.cab_x.isnot(None), Room.cab_y.isnot(None), *criteria
+    )
+    if only_unconnected:
+        query = query.filter(~exists().where(Connection.room_id == Room.id, Connection.segment_id.isnot(None)))
+    rooms = query.all()
+    if not rooms:
+        return []
+
+    indexes = segment_indexes(db, Segment.floor_id.in_({room.floor_id for room in rooms}))
+    proposals = []
+    for room in rooms:
+        index = indexes.get(room.floor_id)
+        if index is None:
+            continue
+        x, y = room.cab_x, room.cab_y
+        segment, distance = index.nearest(
+            x, y, lambda s: point_segment_distance(x, y, s.start_x, s.start_y, s.end_x, s.end_y), max_distance
+        )
+        if segment is not None:
+            proposals.append(ProposedConnection(room.id, segment.id, distance))
+    logger.info(f"Предложено соединений комнат с коридорами: {len(proposals)} из {len(rooms)} комнат")
+    return proposals
+
+
+def add_room_connections(db: Session, proposals: List[ProposedConnection], weight: float) -> None:
+    """Добавляет в сессию соединения-двери по предложениям propose_room_connections (без commit)."""
+    db.add_all([
+        Connection(room_id=proposal.room_id, segment_id=proposal.segment_id, type="дверь", weight=weight)
+        for proposal in proposals
+    ])
+
+
+def point_in_polygon(x: float, y: float, polygon: List[Tuple[float, float]]) -> bool:
+    # Чётность числа пересечений луча вправо от точки с рёбрами многоугольника
+    inside = False
+    x2, y2 = polygon[-1]
+    for x1, y1 in polygon:
+        if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+            inside = not inside
+        x2, y2 = x1, y1
+    return inside
+
+
+def _polygon(coordinates) -> Optional[List[Tuple[float, float]]]:
+    try:
+        polygon = [(float(point["x"]), float(point["y"])) for point in coordinates or ()]
+    except (TypeError, KeyError, ValueError):
+        return None
+    return polygon if len(polygon) >= 3 else None
+
+
+class FloorIndex:
+    """
+    Индекс одного этажа кампуса для поиска по точке: сетка по ограничивающим прямоугольникам
+    многоугольников комнат (Room.coordinates) и сетки сегментов коридоров: общая и по зданиям.
+    """
+
+    def __init__(self, floors: Dict[int, int], rooms: list, segments: list):
+        self.floors = floors  # floor_id -> building_id
+        self.floor_ids: Set[int] = set(floors)
+        self.room_ids: Set[int] = set()
+        self.segment_ids: Set[int] = {segment.id for segment in segments}
+
+        shapes = []
+        for room in rooms:
+            self.room_ids.add(room.id)
+            polygon = _polygon(room.coordinates)
+            if polygon is None:
+                continue
+            xs, ys = [x for x, _ in polygon], [y for _, y in polygon]
+            area = abs(sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(polygon, polygon[1:] + polygon[:1]))) / 2
+            shapes.append((room, polygon, (min(xs), min(ys), max(xs), max(ys)), area))
+        extent = sum(max(b[2] - b[0], b[3] - b[1]) for _, _, b, _ in shapes) / len(shapes) if shapes else 1.0
+        self.rooms = GridIndex(max(extent, 1.0))
+        for shape in shapes:
+            self.rooms.insert(shape, *shape[2])
+
+        self.segments = _segment_grid(segments)
+        by_building: Dict[int, List] = {}
+        for segment in segments:
+            by_building.setdefault(floors[segment.floor_id], []).append(segment)
+        self.building_segments = {building_id: _segment_grid(items) for building_id, items in by_building.items()}
+
+    def room_at(self, x: float, y: float):
+        """Комната, многоугольник которой содержит точку; из вложенных — наименьшая по площади."""
+        best = None
+        for room, polygon, (min_x, min_y, max_x, max_y), area in self.rooms.at(x, y):
+            if min_x <= x <= max_x and min_y <= y <= max_y and point_in_polygon(x, y, polygon):
+                if best is None or area < best[1]:
+                    best = (room, area)
+        return best[0] if best else None
+
+    def nearest_segment(self, x: float, y: float, max_distance: float = math.inf, building_id: Optional[int] = None):
+        """
+        Ближайший сегмент (только здания building_id, если задано) и расстояние до него;
+        (None, inf), если в пределах max_distance нет.
+        """
+        grid = self.segments if building_id is None else self.building_segments.get(building_id)
+        if grid is None:
+            return None, math.inf
+        return grid.nearest(
+            x, y, lambda s: point_segment_distance(x, y, s.start_x, s.start_y, s.end_x, s.end_y), max_distance
+        )
+
+
+class FloorIndexCache:
+    """
+    Индексы этажей по (campus_id, floor_number), строятся при первом обращении. Изменение
+    комнаты или сегмента (emit_map_change) сбрасывает только индексы этажей, на которых
+    сущность была или оказалась; остальные этажи не перестраиваются. TTL, как у кеша
+    графов, ограничивает устаревание в воркерах, которые не выполняли запись.
+    """
+
+    def __init__(self, ttl: float = 0):
+        self.ttl = ttl
+        self._entries: Dict[Tuple[int, int], Tuple[FloorIndex, float]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, campus_id: int, floor_number: int) -> FloorIndex:
+        key = (campus_id, floor_number)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and (not self.ttl or now - entry[1] < self.ttl):
+                return entry[0]
+            generation = self._generation
+
+        index = _load_floor_index(db, campus_id, floor_number)
+        with self._lock:
+            # Изменение во время построения могло не попасть в индекс — тогда не кешируем его
+            if self._generation == generation:
+                self._entries[key] = (index, now)
+        logger.info(f"Построен индекс этажа {floor_number} кампуса {campus_id}: "
+                    f"{index.rooms.count} комнат, {index.segments.count} сегментов")
+        return index
+
+    def invalidate(self, rooms: Iterable[int] = (), segments: Iterable[int] = (),
+                   floors: Optional[Iterable[int]] = None) -> None:
+        """
+        Сбрасывает индексы, где есть комнаты rooms или сегменты segments либо этажи floors
+        (floor_id). Без аргументов сбрасывает все индексы.
+        """
+        rooms, segments = set(rooms), set(segments)
+        floors = set(floors) if floors is not None else None
+        with self._lock:
+            self._generation += 1
+            if not rooms and not segments and floors is None:
+                self._entries.clear()
+                return
+            for key, (index, _) in list(self._entries.items()):
+                if index.room_ids & rooms or index.segment_ids & segments or floors and index.floor_ids & floors:
+                    del self._entries[key]
+
+
+def _load_floor_index(db: Session, campus_id: int, floor_number: int) -> FloorIndex:
+    floors = {
+        floor.id: floor.building_id for floor in db.query(Floor.id, Floor.building_id)
+        .join(Building, Building.id == Floor.building_id)
+        .filter(Building.campus_id == campus_id, Floor.floor_number == floor_number)
+    }
+    floor_ids = set(floors)
+    rooms = db.query(
+        Room.id, Room.name, Room.cab_id, Room.building_id, Room.floor_id, Room.coordinates
+    ).filter(Room.floor_id.in_(floor_ids)).order_by(Room.id).all() if floor_ids else []
+    segments = db.query(
+        Segment.id, Segment.floor_id, Segment.start_x, Segment.start_y, Segment.end_x, Segment.end_y
+    ).filter(Segment.floor_id.in_(floor_ids)).order_by(Segment.id).all() if floor_ids else []
+    return FloorIndex(floors, rooms, segments)
+
+
+floor_indexes = FloorIndexCache(ttl=settings.GRAPH_CACHE_TTL)
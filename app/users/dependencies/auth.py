@@ -44,11 +44,11 @@ def set_auth_cookies(response: Response, access: str, refresh: str):
         **settings.COOKIE_CONFIG
     )
 
-async def get_token(request: Request) -> str | None:
+def get_token(request: Request) -> str | None:
     return request.cookies.get("access_token") or \
            (request.headers.get("Authorization") or "").replace("Bearer ", "") or None
 
-async def refresh_access_token(request: Request, response: Response, db: Session) -> str:
+def refresh_access_token(request: Request, response: Response, db: Session) -> str:
     refresh_token = request.cookies.get("refresh_token")
     if not refresh_token:
         raise HTTPException(status_code=401, detail="Отсутствует refresh_token")
@@ -71,14 +71,17 @@ async def refresh_access_token(request: Request, response: Response, db: Session
     except JWTError:
         raise HTTPException(status_code=401, detail="Недействительный refresh_token")
 
-async def admin_required(request: Request, response: Response, db: Session = Depends(get_db)) -> Optional[str]:
-    """Проверяет токены и права админа, обновляет токены только если access_token отсутствует."""
+def admin_required(request: Request, response: Response, db: Session = Depends(get_db)) -> Optional[str]:
+    """
+    Проверяет токены и права админа, обновляет токены только если access_token отсутствует.
+    Обычная функция: при обновлении токена идёт синхронный запрос к БД, FastAPI выполнит её в пуле потоков.
+    """
     if request.method == "GET":
         return None  # GET-запросы не требуют авторизации
 
-    token = await get_token(request)
+    token = get_token(request)
     if not token:  # Если access_token отсутствует
-        new_access_token = await refresh_access_token(request, response, db)
+        new_access_token = refresh_access_token(request, response, db)
         return new_access_token  # Возвращаем новый токен
 
     # Если access_token присутствует, проверяем его
@@ -0,0 +1,37 @@
+import argparse
+import time
+from app.database.database import SessionLocal
+from app.map.crud.room import auto_connect_rooms
+
+
+def connect_rooms(building_id: int, floor_id: int, max_distance: float, dry_run: bool):
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        proposals = auto_connect_rooms(db, building_id, floor_id, max_distance, create=not dry_run)
+        elapsed = time.perf_counter() - started
+
+        if dry_run:
+            for proposal in proposals:
+                print(f"room_{proposal.room_id} -> segment_{proposal.segment_id} ({proposal.distance:.1f})")
+            print(f"🟢 Proposed {len(proposals)} connections, {elapsed:.1f} s")
+        else:
+            print(f"✅ Created {len(proposals)} room connections, {elapsed:.1f} s")
+
+    except Exception as e:
+        db.rollback()
+        print(f"🔴 Error: {str(e)}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Connect rooms without connections to the nearest corridor segment")
+    parser.add_argument("--building-id", type=int, default=None)
+    parser.add_argument("--floor-id", type=int, default=None)
+    parser.add_argument("--max-distance", type=float, default=None,
+                        help="Максимальное расстояние от входа до сегмента (по умолчанию ROOM_AUTO_CONNECT_MAX_DISTANCE)")
+    parser.add_argument("--dry-run", action="store_true", help="Только показать предложенные соединения")
+
+    args = parser.parse_args()
+    connect_rooms(args.building_id, args.floor_id, args.max_distance, args.dry_run)
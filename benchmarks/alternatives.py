@@ -0,0 +1,47 @@
+import argparse
+import random
+import time
+from app.map.utils.alternatives import alternative_paths
+from app.map.utils.landmarks import build_landmarks
+from app.map.utils.pathfinder import search_path
+from benchmarks.synthetic import synthetic_graph, room_vertices
+
+
+def run(buildings: int, floors: int, rooms_per_floor: int, queries: int, max_k: int, stretch: float, seed: int):
+    graph = synthetic_graph(buildings, floors, rooms_per_floor, seed)
+    build_landmarks(graph, 8)
+    print(f"Граф: {len(graph.vertices)} вершин")
+
+    rooms = room_vertices(graph)
+    rnd = random.Random(seed)
+    pairs = [(rnd.choice(rooms), rnd.choice(rooms)) for _ in range(queries)]
+
+    started = time.perf_counter()
+    shortest = [search_path(graph, start, end, heuristic="alt") for start, end in pairs]
+    single = (time.perf_counter() - started) / queries * 1000
+    print(f"Кратчайший путь (A* alt): {single:8.3f} мс/запрос")
+
+    # Для сравнения: методы, которые ищут каждую альтернативу отдельным поиском (Йена, штрафов),
+    # стоят не меньше k+1 поисков; здесь оба дерева строятся один раз на все k
+    for k in range(1, max_k + 1):
+        found = 0
+        started = time.perf_counter()
+        for (start, end), (path, weight) in zip(pairs, shortest):
+            found += len(alternative_paths(graph, start, end, path, weight, k, max_stretch=stretch))
+        elapsed = (time.perf_counter() - started) / queries * 1000
+        print(f"k={k}: {elapsed:8.3f} мс/запрос (+ кратчайший путь), "
+              f"найдено альтернатив в среднем {found / queries:.2f}, {k + 1} поисков A* — {single * (k + 1):.3f} мс")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Alternative routes: latency vs number of alternatives")
+    parser.add_argument("--buildings", type=int, default=3)
+    parser.add_argument("--floors", type=int, default=5)
+    parser.add_argument("--rooms-per-floor", type=int, default=120)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--max-k", type=int, default=5)
+    parser.add_argument("--stretch", type=float, default=1.5)
+    parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    run(args.buildings, args.floors, args.rooms_per_floor, args.queries, args.max_k, args.stretch, args.seed)
@@ -0,0 +1,47 @@
+import argparse
+import random
+import time
+from sqlalchemy import event
+from app.map.models.building import Building
+from app.map.utils.assembly import assemble_route
+from app.map.utils.builder import load_graph
+from app.map.utils.pathfinder import find_path
+from benchmarks.synthetic import create_session, populate_campus, room_vertices
+
+
+def run(buildings: int, floors: int, rooms_per_floor: int, routes: int, seed: int):
+    db = create_session()
+    populate_campus(db, buildings, floors, rooms_per_floor, seed)
+    graph = load_graph(db, {building.id for building in db.query(Building)})
+
+    # Длинные маршруты: между первым этажом одного здания и верхним этажом другого
+    rooms = room_vertices(graph)
+    by_floor = {}
+    for room in rooms:
+        by_floor.setdefault(graph.get_vertex_data(room)["coords"][2], []).append(room)
+    rnd = random.Random(seed)
+    pairs = [(rnd.choice(by_floor[1]), rnd.choice(by_floor[floors])) for _ in range(routes)]
+    paths = [(start, end, *find_path(graph, start, end, heuristic="alt")) for start, end in pairs]
+    paths = [item for item in paths if item[2]]
+    print(f"Граф: {len(graph.vertices)} вершин, маршрутов: {len(paths)}, "
+          f"средняя длина пути: {sum(len(item[2]) for item in paths) / len(paths):.0f} вершин")
+
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    started = time.perf_counter()
+    for start, end, path, weight in paths:
+        assemble_route(db, graph, start, end, path, weight)
+    elapsed = time.perf_counter() - started
+    print(f"Сборка маршрута: {elapsed / len(paths) * 1000:.3f} мс, SQL-запросов на маршрут: {len(statements) / len(paths):.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Route assembly benchmark on long multi-floor paths")
+    parser.add_argument("--buildings", type=int, default=3)
+    parser.add_argument("--floors", type=int, default=8)
+    parser.add_argument("--rooms-per-floor", type=int, default=200)
+    parser.add_argument("--routes", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    run(args.buildings, args.floors, args.rooms_per_floor, args.routes, args.seed)
@@ -0,0 +1,48 @@
+import argparse
+import random
+import time
+from app.map.models.room import Room
+from app.map.models.segment import Segment
+from app.map.utils.spatial import point_segment_distance, propose_room_connections
+from benchmarks.synthetic import create_session, populate_campus
+
+
+def run(buildings: int, floors: int, rooms_per_floor: int, checks: int, seed: int):
+    db = create_session()
+    populate_campus(db, buildings, floors, rooms_per_floor, seed)
+    print(f"Комнат: {db.query(Room).count()}, сегментов: {db.query(Segment).count()}")
+
+    started = time.perf_counter()
+    proposals = propose_room_connections(db, only_unconnected=False)
+    print(f"Сетка по этажам: {time.perf_counter() - started:.2f} с на {len(proposals)} комнат")
+
+    # Полный перебор сегментов этажа — O(комнаты x сегменты), проверяется на выборке комнат
+    segments = {}
+    for segment in db.query(Segment).order_by(Segment.id):
+        segments.setdefault(segment.floor_id, []).append(segment)
+    rooms = {room.id: room for room in db.query(Room)}
+    sample = random.Random(seed).sample(proposals, min(checks, len(proposals)))
+    started = time.perf_counter()
+    mismatches = 0
+    for proposal in sample:
+        room = rooms[proposal.room_id]
+        best = min(
+            segments[room.floor_id],
+            key=lambda s: point_segment_distance(room.cab_x, room.cab_y, s.start_x, s.start_y, s.end_x, s.end_y)
+        )
+        mismatches += best.id != proposal.segment_id
+    elapsed = (time.perf_counter() - started) / max(len(sample), 1)
+    print(f"Перебор: {elapsed * 1000:.3f} мс на комнату, оценка на все комнаты {elapsed * len(proposals):.2f} с")
+    print(f"Расхождений с перебором: {mismatches} из {len(sample)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Room to nearest segment: grid index vs full scan")
+    parser.add_argument("--buildings", type=int, default=2)
+    parser.add_argument("--floors", type=int, default=5)
+    parser.add_argument("--rooms-per-floor", type=int, default=2000)
+    parser.add_argument("--checks", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    run(args.buildings, args.floors, args.rooms_per_floor, args.checks, args.seed)
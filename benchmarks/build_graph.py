@@ -0,0 +1,89 @@
+import argparse
+import time
+import tracemalloc
+from sqlalchemy import create_engine, event
+from app.database.config.settings import settings
+from app.database.database import Base
+from app.map.models.building import Building
+from app.map.models.room import Room
+from app.map.utils.builder import load_graph
+from app.map.utils.compact import CompactGraph
+from app.map.utils.landmarks import build_landmarks
+from benchmarks.synthetic import campus_shape, create_session, populate_campus
+
+
+def measure(db, building_ids):
+    """Время этапов построения графа как в get_graph, число SQL-запросов и пик памяти."""
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    started = time.perf_counter()
+    graph = load_graph(db, building_ids)
+    load = time.perf_counter() - started
+    event.remove(db.get_bind(), "before_cursor_execute", listener)
+    db.expire_all()
+
+    started = time.perf_counter()
+    build_landmarks(graph, settings.GRAPH_LANDMARKS, settings.GRAPH_LANDMARK_STRATEGY)
+    landmarks = time.perf_counter() - started
+    started = time.perf_counter()
+    compact = CompactGraph.from_graph(graph)
+    compacting = time.perf_counter() - started
+
+    # Память меряется отдельным прогоном: tracemalloc замедляет выделения в несколько раз
+    tracemalloc.start()
+    graph = load_graph(db, building_ids)
+    build_landmarks(graph, settings.GRAPH_LANDMARKS, settings.GRAPH_LANDMARK_STRATEGY)
+    CompactGraph.from_graph(graph)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.expire_all()
+
+    return {
+        "vertices": len(compact.vertices), "load": load, "landmarks": landmarks, "compact": compacting,
+        "queries": len(statements), "peak": peak / 2 ** 20, "nbytes": compact.nbytes() / 2 ** 20,
+    }
+
+
+def run(sizes, floors: int, rooms_per_floor: int, url: str, seed: int):
+    print(f"{'комнат':>7} {'зданий':>6} {'заполн., с':>10} | "
+          f"{'пара: вершин':>12} {'БД, мс':>8} {'ALT, мс':>8} {'CSR, мс':>8} {'SQL':>4} {'пик, МиБ':>8} | "
+          f"{'кампус: вершин':>14} {'БД, с':>6} {'ALT, с':>6} {'SQL':>4} {'пик, МиБ':>8} {'CSR, МиБ':>8}")
+    for size in sizes:
+        buildings, floors_, rooms_per_floor_ = campus_shape(size, floors, rooms_per_floor)
+        if url is None:
+            db = create_session()
+        else:
+            # Внешняя БД очищается перед каждым размером
+            Base.metadata.drop_all(create_engine(url))
+            db = create_session(url)
+
+        started = time.perf_counter()
+        populate_campus(db, buildings, floors_, rooms_per_floor_, seed)
+        populating = time.perf_counter() - started
+        rooms = db.query(Room).count()
+
+        # build_graph загружает одно здание или пару зданий, compileGraph — весь кампус
+        building_ids = sorted(building.id for building in db.query(Building.id))
+        pair = measure(db, set(building_ids[:2]))
+        campus = measure(db, set(building_ids))
+        print(f"{rooms:>7} {buildings:>6} {populating:>10.1f} | "
+              f"{pair['vertices']:>12} {pair['load'] * 1000:>8.1f} {pair['landmarks'] * 1000:>8.1f} "
+              f"{pair['compact'] * 1000:>8.1f} {pair['queries']:>4} {pair['peak']:>8.1f} | "
+              f"{campus['vertices']:>14} {campus['load']:>6.2f} {campus['landmarks']:>6.2f} "
+              f"{campus['queries']:>4} {campus['peak']:>8.1f} {campus['nbytes']:>8.1f}")
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Graph build time, SQL query count and memory against campus size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 10000, 50000, 100000],
+                        help="Число комнат в кампусе")
+    parser.add_argument("--floors", type=int, default=5)
+    parser.add_argument("--rooms-per-floor", type=int, default=200)
+    parser.add_argument("--url", default=None,
+                        help="SQLAlchemy URL локальной SQLite или Postgres (все таблицы удаляются!), по умолчанию SQLite в памяти")
+    parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    run(args.sizes, args.floors, args.rooms_per_floor, args.url, args.seed)
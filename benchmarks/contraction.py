@@ -0,0 +1,50 @@
+import argparse
+import random
+import time
+from app.map.utils.contraction import ContractionHierarchy
+from app.map.utils.landmarks import build_landmarks
+from app.map.utils.pathfinder import find_path
+from benchmarks.synthetic import synthetic_graph, room_vertices
+
+
+def run(buildings: int, floors: int, rooms_per_floor: int, queries: int, seed: int):
+    graph = synthetic_graph(buildings, floors, rooms_per_floor, seed)
+    print(f"Граф: {len(graph.vertices)} вершин")
+
+    started = time.perf_counter()
+    build_landmarks(graph, 8)
+    print(f"Ориентиры ALT: {time.perf_counter() - started:.2f} с")
+
+    started = time.perf_counter()
+    graph.hierarchy = ContractionHierarchy(graph)
+    print(f"Иерархия сжатия: {time.perf_counter() - started:.2f} с, {graph.hierarchy.shortcuts} шорткатов")
+
+    rooms = room_vertices(graph)
+    rnd = random.Random(seed)
+    pairs = [(rnd.choice(rooms), rnd.choice(rooms)) for _ in range(queries)]
+
+    results = {}
+    for label, kwargs in (
+        ("A* geometric", {"heuristic": "geometric"}),
+        ("A* alt", {"heuristic": "alt"}),
+        ("CH", {"mode": "ch"}),
+    ):
+        started = time.perf_counter()
+        results[label] = [find_path(graph, start, end, **kwargs)[1] for start, end in pairs]
+        elapsed = time.perf_counter() - started
+        print(f"{label:14} {elapsed / queries * 1000:8.3f} мс/запрос")
+
+    mismatches = sum(1 for a, b in zip(results["A* alt"], results["CH"]) if abs(a - b) > 1e-6)
+    print(f"Расхождений веса CH и A* alt: {mismatches}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Contraction hierarchies vs find_path benchmark")
+    parser.add_argument("--buildings", type=int, default=3)
+    parser.add_argument("--floors", type=int, default=5)
+    parser.add_argument("--rooms-per-floor", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    run(args.buildings, args.floors, args.rooms_per_floor, args.queries, args.seed)
@@ -0,0 +1,54 @@
+import argparse
+import timeit
+from app.map.utils.compact import CompactGraph
+from app.map.utils.graph import Graph
+from benchmarks.synthetic import synthetic_graph
+
+
+def scan_edge_data(graph: Graph, from_vertex: str, to_vertex: str) -> dict:
+    # Прежняя реализация get_edge_data: линейный просмотр списка смежности
+    for neighbor, _, edge_data in graph.edges.get(from_vertex, []):
+        if neighbor == to_vertex:
+            return edge_data
+    return {}
+
+
+def measure(label: str, graph: Graph, pairs, repeat: int):
+    compact = CompactGraph.from_graph(graph)
+    for name, lookup in (
+        ("линейный поиск", lambda a, b: scan_edge_data(graph, a, b)),
+        ("индекс Graph", graph.get_edge_data),
+        ("CompactGraph", compact.get_edge_data),
+    ):
+        assert all(lookup(a, b) == scan_edge_data(graph, a, b) for a, b in pairs)
+        elapsed = timeit.timeit(lambda: [lookup(a, b) for a, b in pairs], number=repeat)
+        print(f"{label:28} {name:16} {elapsed / (repeat * len(pairs)) * 1e9:10.0f} нс/вызов")
+
+
+def run(buildings: int, floors: int, rooms_per_floor: int, hub_degree: int, repeat: int):
+    graph = synthetic_graph(buildings, floors, rooms_per_floor)
+    hubs = sorted(graph.edges, key=lambda vertex: len(graph.edges[vertex]), reverse=True)[:10]
+    pairs = [(hub, neighbor) for hub in hubs for neighbor, _, _ in graph.edges[hub]]
+    print(f"Граф: {len(graph.vertices)} вершин, максимальная степень {len(graph.edges[hubs[0]])}")
+    measure("синтетический кампус, хабы", graph, pairs, repeat)
+
+    # Звезда: одна вершина высокой степени, как уличный узел с множеством входов
+    star = Graph()
+    star.add_vertex("hub", {"coords": (0, 0, 1), "building_id": None})
+    for i in range(hub_degree):
+        star.add_vertex(f"leaf_{i}", {"coords": (i, 0, 1), "building_id": None})
+        star.add_edge("hub", f"leaf_{i}", 1.0, {"type": "phantom"})
+    pairs = [("hub", f"leaf_{i}") for i in range(hub_degree)]
+    measure(f"звезда степени {hub_degree}", star, pairs, repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Edge lookup micro-benchmark")
+    parser.add_argument("--buildings", type=int, default=2)
+    parser.add_argument("--floors", type=int, default=3)
+    parser.add_argument("--rooms-per-floor", type=int, default=200)
+    parser.add_argument("--hub-degree", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+
+    args = parser.parse_args()
+    run(args.buildings, args.floors, args.rooms_per_floor, args.hub_degree, args.repeat)
@@ -0,0 +1,152 @@
+import argparse
+import heapq
+import math
+import random
+import sys
+import time
+from types import SimpleNamespace
+from app.map.utils import contraction, pathfinder
+from app.map.utils.compact import CompactGraph
+from app.map.utils.contraction import ContractionHierarchy
+from app.map.utils.landmarks import build_landmarks
+from app.map.utils.pathfinder import dijkstra, search_path
+from app.map.utils.profiles import profile_graph
+from benchmarks.synthetic import synthetic_graph, room_vertices
+
+TOLERANCE = 1e-6
+
+
+class HeapCounter:
+    """
+    Подменяет модуль heapq в движках поиска на время подсчёта: число вставок в кучу
+    и раскрытых вершин (уникальных извлечённых из каждой кучи, устаревшие записи не считаются).
+    """
+
+    def __init__(self):
+        self.pushes = 0
+        self.expanded = set()
+
+    def heappush(self, heap, item):
+        self.pushes += 1
+        heapq.heappush(heap, item)
+
+    def heappop(self, heap):
+        item = heapq.heappop(heap)
+        self.expanded.add((id(heap), item[-1]))
+        return item
+
+    def __enter__(self):
+        proxy = SimpleNamespace(heappush=self.heappush, heappop=self.heappop)
+        pathfinder.heapq = contraction.heapq = proxy
+        return self
+
+    def __exit__(self, *exc):
+        pathfinder.heapq = contraction.heapq = heapq
+
+
+def path_weight(graph, path) -> float:
+    """Вес пути по рёбрам графа: inf, если какого-то ребра в графе нет."""
+    weight = 0.0
+    for a, b in zip(path, path[1:]):
+        weights = [w for neighbor, w, _ in graph.get_neighbors(a) if neighbor == b]
+        if not weights:
+            return math.inf
+        weight += min(weights)
+    return weight
+
+
+def check(label: str, graph, reference, pairs, exact: bool, **kwargs) -> int:
+    """
+    Запускает search_path на всех парах: время, раскрытые вершины и вставки в кучу на запрос,
+    сравнение веса с эталонным Дейкстрой и проверка, что путь действительно имеет этот вес.
+    Возвращает число ошибок движка, который должен находить кратчайший путь (exact).
+    """
+    started = time.perf_counter()
+    results = [search_path(graph, start, end, **kwargs) for start, end in pairs]
+    elapsed = time.perf_counter() - started
+
+    # Счётчики отдельным прогоном: подмена heapq замедляет поиск
+    expanded = pushes = 0
+    for start, end in pairs:
+        with HeapCounter() as counter:
+            search_path(graph, start, end, **kwargs)
+        expanded += len(counter.expanded)
+        pushes += counter.pushes
+
+    mismatches = broken = 0
+    worst = 0.0
+    for (start, end), (path, weight) in zip(pairs, results):
+        expected = reference[start][end]
+        if abs(weight - expected) > TOLERANCE * max(1.0, expected):
+            mismatches += 1
+            worst = max(worst, (weight - expected) / expected if expected else math.inf)
+        if path and abs(path_weight(graph, path) - weight) > TOLERANCE * max(1.0, weight):
+            broken += 1
+
+    print(f"{label:28} {elapsed / len(pairs) * 1000:8.3f} {expanded / len(pairs):10.0f} {pushes / len(pairs):10.0f} "
+          f"{mismatches:>12} {worst * 100:>10.2f} {broken:>10}")
+    return (mismatches + broken) if exact else broken
+
+
+def run(buildings: int, floors: int, rooms_per_floor: int, queries: int, landmarks: int, seed: int):
+    graph = synthetic_graph(buildings, floors, rooms_per_floor, seed)
+    build_landmarks(graph, landmarks)
+    graph.hierarchy = ContractionHierarchy(graph)
+    compact = CompactGraph.from_graph(graph)
+    wheelchair = profile_graph(compact, "wheelchair")
+    print(f"Граф: {len(graph.vertices)} вершин, ориентиров: {len(graph.landmarks)}, запросов: {queries}")
+
+    rooms = room_vertices(graph)
+    rnd = random.Random(seed)
+    pairs = [(rnd.choice(rooms), rnd.choice(rooms)) for _ in range(queries)]
+
+    # Эталон — обычный Дейкстра без эвристик: полное дерево от каждого источника
+    started = time.perf_counter()
+    reference, reference_wheelchair = {}, {}
+    dict_wheelchair = profile_graph(graph, "wheelchair")
+    for start, _ in pairs:
+        if start not in reference:
+            reference[start] = dijkstra(graph, start)[0]
+            reference_wheelchair[start] = dijkstra(dict_wheelchair, start)[0]
+    for table in (reference, reference_wheelchair):
+        for start, end in pairs:
+            table[start].setdefault(end, math.inf)
+    elapsed = (time.perf_counter() - started) / (2 * len(reference))
+    print(f"Эталонный Дейкстра: {elapsed * 1000:.3f} мс на полное дерево\n")
+
+    print(f"{'движок':28} {'мс/запрос':>8} {'раскрыто':>10} {'в кучу':>10} {'неоптимальных':>12} "
+          f"{'макс. +%':>10} {'битых путей':>10}")
+    # exact: движок обязан находить кратчайший путь. combined допустима (этажи оцениваются самым
+    # дешёвым переходом между этажами), поэтому тоже точная; geometric переоценивает и оставлена
+    # только для сравнения — в ROUTE_HEURISTIC по умолчанию alt
+    engines = (
+        ("A* geometric", graph, reference, False, {"heuristic": "geometric"}),
+        ("A* alt", graph, reference, True, {"heuristic": "alt"}),
+        ("A* combined", graph, reference, True, {"heuristic": "combined"}),
+        ("bidirectional ALT", graph, reference, True, {"mode": "bidirectional"}),
+        ("CH", graph, reference, True, {"mode": "ch"}),
+        ("CSR A* geometric", compact, reference, False, {"heuristic": "geometric"}),
+        ("CSR A* alt", compact, reference, True, {"heuristic": "alt"}),
+        ("CSR A* combined", compact, reference, True, {"heuristic": "combined"}),
+        ("CSR bidirectional ALT", compact, reference, True, {"mode": "bidirectional"}),
+        ("CSR wheelchair A* alt", wheelchair, reference_wheelchair, True, {"heuristic": "alt"}),
+    )
+    errors = sum(check(label, g, table, pairs, exact, **kwargs) for label, g, table, exact, kwargs in engines)
+
+    if errors:
+        print(f"\n🔴 Точные движки ошиблись {errors} раз")
+        sys.exit(1)
+    print("\n✅ Точные движки совпали с Дейкстрой")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pathfinder benchmark with a differential check against plain Dijkstra")
+    parser.add_argument("--buildings", type=int, default=2)
+    parser.add_argument("--floors", type=int, default=5)
+    parser.add_argument("--rooms-per-floor", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--landmarks", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    run(args.buildings, args.floors, args.rooms_per_floor, args.queries, args.landmarks, args.seed)
@@ -0,0 +1,163 @@
+import argparse
+import math
+import random
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from app.database.database import Base
+from app.map.models.campus import Campus
+from app.map.models.building import Building
+from app.map.models.floor import Floor
+from app.map.models.room import Room
+from app.map.models.segment import Segment
+from app.map.models.outdoor_segment import OutdoorSegment
+from app.map.models.connection import Connection
+from app.map.utils.builder import load_graph
+from app.map.utils.graph import Graph
+
+# Геометрия синтетического здания
+SEGMENT_LENGTH = 40.0
+CORRIDOR_Y = 100.0
+ROOM_OFFSET = 20.0
+BUILDING_SPACING = 1000.0
+
+
+def populate_campus(db: Session, buildings: int = 2, floors: int = 3, rooms_per_floor: int = 40, seed: int = 0) -> Campus:
+    """
+    Детерминированно заполняет БД синтетическим кампусом.
+    Каждый этаж — коридор из сегментов, связанных соединениями сегмент-сегмент,
+    комнаты по обе стороны коридора, лестница и лифт между соседними этажами,
+    у каждого здания выход на улицу, уличные сегменты соединены цепочкой.
+    """
+    rnd = random.Random(seed)
+    campus = Campus(name=f"Синтетический кампус {seed}")
+    db.add(campus)
+    db.flush()
+
+    segments_per_floor = max(1, rooms_per_floor // 4)
+    outdoor_segments = []
+    for b in range(buildings):
+        offset_x = b * BUILDING_SPACING
+        building = Building(campus_id=campus.id, name=f"Корпус {b + 1}", x=offset_x, y=0)
+        db.add(building)
+        db.flush()
+
+        corridors = []
+        for floor_number in range(1, floors + 1):
+            floor = Floor(building_id=building.id, floor_number=floor_number)
+            db.add(floor)
+            db.flush()
+
+            segments = []
+            for k in range(segments_per_floor):
+                segment = Segment(
+                    start_x=offset_x + k * SEGMENT_LENGTH, start_y=CORRIDOR_Y,
+                    end_x=offset_x + (k + 1) * SEGMENT_LENGTH, end_y=CORRIDOR_Y,
+                    floor_id=floor.id, building_id=building.id
+                )
+                db.add(segment)
+                segments.append(segment)
+            db.flush()
+            for left, right in zip(segments, segments[1:]):
+                db.add(Connection(
+                    from_segment_id=left.id, to_segment_id=right.id, type="дверь", weight=1.0,
+                    from_floor_id=floor.id, to_floor_id=floor.id
+                ))
+
+            rooms = []
+            for k in range(rooms_per_floor):
+                segment = segments[k % segments_per_floor]
+                cab_x = rnd.uniform(segment.start_x, segment.end_x)
+                cab_y = CORRIDOR_Y + (ROOM_OFFSET if k % 2 else -ROOM_OFFSET)
+                room = Room(
+                    building_id=building.id, floor_id=floor.id,
+                    name=rnd.choice(["Аудитория", "Лаборатория", "Кафедра", "Туалет", "Буфет"]),
+                    cab_id=f"{floor_number}{k:03d}", cab_x=cab_x, cab_y=cab_y,
+                    coordinates=[
+                        {"x": cab_x - 10, "y": cab_y - 10}, {"x": cab_x + 10, "y": cab_y - 10},
+                        {"x": cab_x + 10, "y": cab_y + 10}, {"x": cab_x - 10, "y": cab_y + 10}
+                    ]
+                )
+                db.add(room)
+                rooms.append((room, segment))
+            db.flush()
+            for room, segment in rooms:
+                db.add(Connection(room_id=room.id, segment_id=segment.id, type="дверь", weight=rnd.choice([1.0, 2.0, 3.0])))
+            corridors.append((floor, segments))
+
+        for (lower_floor, lower), (upper_floor, upper) in zip(corridors, corridors[1:]):
+            db.add(Connection(
+                from_segment_id=upper[0].id, to_segment_id=lower[0].id, type="лестница", weight=5.0,
+                from_floor_id=upper_floor.id, to_floor_id=lower_floor.id
+            ))
+            db.add(Connection(
+                from_segment_id=lower[-1].id, to_segment_id=upper[-1].id, type="лифт", weight=8.0,
+                from_floor_id=lower_floor.id, to_floor_id=upper_floor.id
+            ))
+
+        outdoor = OutdoorSegment(
+            type="улица", campus_id=campus.id, start_building_id=building.id,
+            start_x=offset_x, start_y=0, end_x=offset_x + BUILDING_SPACING / 2, end_y=0, weight=0
+        )
+        db.add(outdoor)
+        db.flush()
+        ground_segments = corridors[0][1]
+        db.add(Connection(from_segment_id=ground_segments[0].id, to_outdoor_id=outdoor.id, type="дверь", weight=2.0))
+        db.add(Connection(from_outdoor_id=outdoor.id, to_segment_id=ground_segments[0].id, type="дверь", weight=2.0))
+        outdoor_segments.append(outdoor)
+
+    for left, right in zip(outdoor_segments, outdoor_segments[1:]):
+        db.add(Connection(from_outdoor_id=left.id, to_outdoor_id=right.id, type="улица", weight=BUILDING_SPACING / 2))
+
+    db.commit()
+    return campus
+
+
+def campus_shape(rooms: int, floors: int = 5, rooms_per_floor: int = 200):
+    """Число зданий, этажей и комнат на этаже для кампуса примерно из rooms комнат."""
+    rooms_per_floor = max(1, min(rooms_per_floor, rooms // floors or 1))
+    buildings = max(1, math.ceil(rooms / (floors * rooms_per_floor)))
+    return buildings, floors, rooms_per_floor
+
+
+def create_session(url: str = "sqlite://") -> Session:
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, autoflush=False)()
+
+
+def synthetic_graph(buildings: int = 2, floors: int = 3, rooms_per_floor: int = 40, seed: int = 0) -> Graph:
+    """Граф синтетического кампуса, построенный тем же load_graph, что и в API."""
+    db = create_session()
+    try:
+        campus = populate_campus(db, buildings, floors, rooms_per_floor, seed)
+        building_ids = {building.id for building in db.query(Building).filter(Building.campus_id == campus.id)}
+        return load_graph(db, building_ids)
+    finally:
+        db.close()
+
+
+def room_vertices(graph: Graph):
+    return [vertex for vertex in graph.vertices if vertex.startswith("room_")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Populate a database with a deterministic synthetic campus")
+    parser.add_argument("--url", default="sqlite:///synthetic.db", help="SQLAlchemy URL локальной SQLite или Postgres")
+    parser.add_argument("--rooms", type=int, default=10000, help="Комнат в каждом кампусе (округляется до целого числа зданий)")
+    parser.add_argument("--floors", type=int, default=5)
+    parser.add_argument("--rooms-per-floor", type=int, default=200)
+    parser.add_argument("--campuses", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    buildings, floors, rooms_per_floor = campus_shape(args.rooms, args.floors, args.rooms_per_floor)
+    db = create_session(args.url)
+    try:
+        for i in range(args.campuses):
+            started = time.perf_counter()
+            campus = populate_campus(db, buildings, floors, rooms_per_floor, args.seed + i)
+            print(f"✅ Campus {campus.id}: {buildings} buildings x {floors} floors x {rooms_per_floor} rooms, "
+                  f"{time.perf_counter() - started:.1f} s")
+    finally:
+        db.close()
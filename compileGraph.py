@@ -0,0 +1,44 @@
+import argparse
+import time
+from app.database.database import SessionLocal
+from app.database.config.settings import settings
+from app.map.utils.builder import build_snapshot_graphs
+from app.map.utils.shared import publish_graphs
+from app.map.utils.snapshot import map_fingerprint, write_snapshot
+
+
+def compile_graph(output: str, compress: bool, pairs: bool, shared_memory: str = ""):
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        fingerprint = map_fingerprint(db)
+        # Те же наборы зданий, что запрашивает build_graph: одно здание или пара зданий
+        graphs = build_snapshot_graphs(db, pairs)
+
+        if shared_memory:
+            name = publish_graphs(shared_memory, graphs, fingerprint)
+            print(f"✅ Graphs published to shared memory {name} ({shared_memory}): {len(graphs)} graphs, "
+                  f"{time.perf_counter() - started:.1f} s")
+            return
+
+        size = write_snapshot(output, graphs, fingerprint, compress)
+        print(f"✅ Graph snapshot {output} written: {len(graphs)} graphs, {size / 1024:.0f} KiB, "
+              f"{time.perf_counter() - started:.1f} s")
+
+    except Exception as e:
+        print(f"🔴 Error: {str(e)}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile routing graph snapshot")
+    parser.add_argument("--output", default=settings.GRAPH_SNAPSHOT_PATH or "graph.snapshot")
+    parser.add_argument("--compress", action="store_true", help="Сжать секции zlib (файл меньше, но без общего mmap)")
+    parser.add_argument("--no-pairs", action="store_true", help="Только графы отдельных зданий, без пар")
+    parser.add_argument("--shared-memory", default="", metavar="POINTER",
+                        help="Опубликовать графы в разделяемой памяти вместо файла (путь к файлу-указателю, "
+                             "как GRAPH_SHARED_MEMORY)")
+
+    args = parser.parse_args()
+    compile_graph(args.output, args.compress, not args.no_pairs, args.shared_memory)
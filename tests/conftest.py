@@ -0,0 +1,72 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database.database import Base, get_db
+from app.main import app
+from app.map.utils.cache import graph_cache
+from app.map.utils.spatial import floor_indexes
+from app.users.dependencies.auth import admin_required
+from benchmarks.synthetic import populate_campus
+
+
+@pytest.fixture(autouse=True)
+def reset_caches():
+    # Кеши графов и индексов этажей — глобальные для процесса; ключи кешей маршрутов
+    # включают версию карты, поэтому её увеличения достаточно
+    graph_cache.invalidate()
+    floor_indexes.invalidate()
+    yield
+    graph_cache.invalidate()
+    floor_indexes.invalidate()
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def campus(db):
+    """Синтетический кампус: 3 здания по 3 этажа, комнаты, лестницы, лифты и улица."""
+    return populate_campus(db, buildings=3, floors=3, rooms_per_floor=12, seed=1)
+
+
+@pytest.fixture
+def api_session(tmp_path):
+    """Фабрика сессий для API: файл SQLite, чтобы запросы из разных потоков шли по своим соединениям."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'map.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine, autoflush=False)
+    engine.dispose()
+
+
+@pytest.fixture
+def api_campus(api_session):
+    db = api_session()
+    try:
+        campus = populate_campus(db, buildings=3, floors=3, rooms_per_floor=12, seed=1)
+        return campus.id
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def client(api_session):
+    def get_test_db():
+        db = api_session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = get_test_db
+    app.dependency_overrides[admin_required] = lambda: None
+    yield TestClient(app)
+    app.dependency_overrides.clear()
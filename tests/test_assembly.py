@@ -0,0 +1,163 @@
+import pytest
+from app.map.models.building import Building
+from app.map.models.campus import Campus
+from app.map.models.connection import Connection
+from app.map.models.floor import Floor
+from app.map.models.outdoor_segment import OutdoorSegment
+from app.map.models.room import Room
+from app.map.models.segment import Segment
+from app.map.utils.assembly import assemble_route
+from app.map.utils.builder import load_graph
+from app.map.utils.pathfinder import find_path
+
+
+def add_room(db, building, floor, segment, name, cab_id, x, y):
+    room = Room(
+        building_id=building.id, floor_id=floor.id, name=name, cab_id=cab_id, cab_x=x, cab_y=y,
+        coordinates=[{"x": x - 5, "y": y - 5}, {"x": x + 5, "y": y - 5}, {"x": x + 5, "y": y + 5}, {"x": x - 5, "y": y + 5}],
+    )
+    db.add(room)
+    db.flush()
+    db.add(Connection(room_id=room.id, segment_id=segment.id, type="дверь", weight=2.0))
+    return room
+
+
+@pytest.fixture(params=["лестница", "лифт"])
+def vertical(request):
+    return request.param
+
+
+@pytest.fixture
+def rooms(db, vertical):
+    """Здание A с двумя этажами (лестница или лифт в одних координатах), здание B и улица между ними."""
+    campus = Campus(name="Кампус")
+    db.add(campus)
+    db.flush()
+    a = Building(campus_id=campus.id, name="A", x=0, y=0)
+    b = Building(campus_id=campus.id, name="B", x=500, y=0)
+    db.add_all([a, b])
+    db.flush()
+    a1 = Floor(building_id=a.id, floor_number=1)
+    a2 = Floor(building_id=a.id, floor_number=2)
+    b1 = Floor(building_id=b.id, floor_number=1)
+    db.add_all([a1, a2, b1])
+    db.flush()
+    s1 = Segment(start_x=0, start_y=100, end_x=100, end_y=100, floor_id=a1.id, building_id=a.id)
+    s2 = Segment(start_x=0, start_y=100, end_x=100, end_y=100, floor_id=a2.id, building_id=a.id)
+    s3 = Segment(start_x=500, start_y=100, end_x=600, end_y=100, floor_id=b1.id, building_id=b.id)
+    db.add_all([s1, s2, s3])
+    db.flush()
+    result = {
+        "101": add_room(db, a, a1, s1, "Аудитория", "101", 20, 80),
+        "201": add_room(db, a, a2, s2, "Кафедра", "201", 80, 120),
+        "B01": add_room(db, b, b1, s3, "Буфет", "B01", 580, 80),
+    }
+    if vertical == "лестница":
+        db.add(Connection(from_segment_id=s2.id, to_segment_id=s1.id, type="лестница", weight=5.0,
+                          from_floor_id=a2.id, to_floor_id=a1.id))
+    else:
+        db.add(Connection(from_segment_id=s1.id, to_segment_id=s2.id, type="лифт", weight=8.0,
+                          from_floor_id=a1.id, to_floor_id=a2.id))
+    outdoor = OutdoorSegment(type="улица", campus_id=campus.id, start_building_id=a.id,
+                             start_x=100, start_y=0, end_x=500, end_y=0, weight=0)
+    db.add(outdoor)
+    db.flush()
+    db.add(Connection(from_segment_id=s1.id, to_outdoor_id=outdoor.id, type="дверь", weight=2.0))
+    db.add(Connection(from_outdoor_id=outdoor.id, to_segment_id=s3.id, type="дверь", weight=2.0))
+    db.commit()
+    result["graph"] = load_graph(db, {a.id, b.id})
+    return result
+
+
+def route(db, rooms, start, end):
+    start, end = f"room_{rooms[start].id}", f"room_{rooms[end].id}"
+    path, weight = find_path(rooms["graph"], start, end)
+    return assemble_route(db, rooms["graph"], start, end, path, weight)
+
+
+def means(vertical):
+    return "по лестнице" if vertical == "лестница" else "на лифте"
+
+
+def test_room_to_room_on_one_floor(db):
+    campus = Campus(name="Кампус")
+    db.add(campus)
+    db.flush()
+    building = Building(campus_id=campus.id, name="A", x=0, y=0)
+    db.add(building)
+    db.flush()
+    floor = Floor(building_id=building.id, floor_number=1)
+    db.add(floor)
+    db.flush()
+    first = Segment(start_x=0, start_y=100, end_x=100, end_y=100, floor_id=floor.id, building_id=building.id)
+    second = Segment(start_x=100, start_y=100, end_x=200, end_y=100, floor_id=floor.id, building_id=building.id)
+    db.add_all([first, second])
+    db.flush()
+    start = add_room(db, building, floor, first, "Аудитория", "101", 20, 80)
+    end = add_room(db, building, floor, second, "Аудитория", "105", 180, 120)
+    # Дверь между коридорами одного этажа в графе — ребро с типом «лестница»
+    db.add(Connection(from_segment_id=first.id, to_segment_id=second.id, type="дверь", weight=1.0))
+    db.commit()
+    graph = load_graph(db, {building.id})
+    path, weight = find_path(graph, f"room_{start.id}", f"room_{end.id}")
+
+    result = assemble_route(db, graph, f"room_{start.id}", f"room_{end.id}", path, weight)
+
+    assert [floor_data["floor"] for floor_data in result["path"]] == [1]
+    assert result["path"][0]["points"][0]["vertex"] == f"room_{start.id}"
+    assert result["path"][0]["points"][-1]["vertex"] == f"room_{end.id}"
+    instructions = result["instructions"]
+    assert instructions[0] == "Начните движение из Аудитория 101 кабинет"
+    assert instructions[-1] == "Вы прибыли в Аудитория 105 кабинет"
+    assert not any("этаж" in instruction for instruction in instructions)
+    assert result["weight"] == weight
+
+
+@pytest.mark.parametrize("start, end, floors, verb", [
+    ("101", "201", [1, 2], "Поднимитесь"),
+    ("201", "101", [2, 1], "Спуститесь"),
+])
+def test_floor_change(db, rooms, vertical, start, end, floors, verb):
+    result = route(db, rooms, start, end)
+
+    assert [floor_data["floor"] for floor_data in result["path"]] == floors
+    # Этаж отправления заканчивается точкой конца лестницы, следующий — начинается с её вершины
+    departure, arrival = result["path"]
+    assert departure["points"][-1]["vertex"].startswith("stair_end_")
+    assert arrival["points"][0]["vertex"].startswith("phantom_stair_")
+
+    instructions = result["instructions"]
+    transitions = [instruction for instruction in instructions if "этаж" in instruction]
+    assert transitions == [f"{verb} {means(vertical)} с {floors[0]}-го на {floors[1]}-й этаж"]
+    assert instructions[1] == transitions[0]
+    assert sum(instruction.startswith("Начните движение") for instruction in instructions) == 1
+    assert instructions[0] == f"Начните движение из {rooms[start].name} {start} кабинет"
+    assert instructions[-1] == f"Вы прибыли в {rooms[end].name} {end} кабинет"
+
+
+@pytest.mark.parametrize("start, end", [("101", "B01"), ("B01", "101")])
+def test_building_change(db, rooms, start, end):
+    result = route(db, rooms, start, end)
+
+    assert [floor_data["floor"] for floor_data in result["path"]] == [1]
+    vertices = [point["vertex"] for point in result["path"][0]["points"]]
+    assert any(vertex.startswith("outdoor_") for vertex in vertices)
+    instructions = result["instructions"]
+    assert instructions[:3] == [
+        f"Начните движение из {rooms[start].name} {start} кабинет",
+        "Выйдите из здания через дверь",
+        "Войдите в здание через дверь",
+    ]
+    assert not any("этаж" in instruction for instruction in instructions)
+    assert instructions[-1] == f"Вы прибыли в {rooms[end].name} {end} кабинет"
+
+
+def test_floor_and_building_change(db, rooms, vertical):
+    result = route(db, rooms, "201", "B01")
+
+    assert [floor_data["floor"] for floor_data in result["path"]] == [2, 1]
+    instructions = result["instructions"]
+    assert instructions[1] == f"Спуститесь {means(vertical)} с 2-го на 1-й этаж"
+    assert "Войдите в здание через дверь" in instructions
+    assert instructions.index("Войдите в здание через дверь") > 1
+    assert instructions[-1] == "Вы прибыли в Буфет B01 кабинет"
@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import event
+from app.map.models.building import Building
+from app.map.utils.builder import load_graph
+from benchmarks.synthetic import populate_campus
+
+
+def count_statements(db, func, *args):
+    statements = []
+    listener = lambda *listener_args: statements.append(listener_args[2])
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        result = func(*args)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+    return result, statements
+
+
+@pytest.mark.parametrize("buildings, rooms_per_floor", [(2, 4), (4, 16), (8, 64)])
+def test_load_graph_query_count_is_constant(db, buildings, rooms_per_floor):
+    populate_campus(db, buildings, floors=3, rooms_per_floor=rooms_per_floor)
+    building_ids = {building.id for building in db.query(Building)}
+
+    graph, statements = count_statements(db, load_graph, db, building_ids)
+
+    # Комнаты, сегменты, уличные сегменты и соединения — по одному запросу
+    assert len(statements) == 4
+    assert sum(vertex.startswith("room_") for vertex in graph.vertices) == buildings * 3 * rooms_per_floor
+
+
+@pytest.mark.parametrize("rooms_per_floor", [4, 64])
+def test_load_graph_single_building_skips_outdoor_query(db, rooms_per_floor):
+    populate_campus(db, buildings=3, floors=3, rooms_per_floor=rooms_per_floor)
+    building_id = db.query(Building.id).first().id
+
+    graph, statements = count_statements(db, load_graph, db, {building_id})
+
+    assert len(statements) == 3
+    assert not any(vertex.startswith("outdoor_") for vertex in graph.vertices)
@@ -0,0 +1,169 @@
+import gc
+import time
+from types import SimpleNamespace
+import pytest
+from app.database.config.settings import settings
+from app.map.models.building import Building
+from app.map.models.connection import Connection
+from app.map.models.segment import Segment
+from app.map.utils import builder, cache, shared
+from app.map.utils.builder import build_snapshot_graphs, get_graph, load_graph
+from app.map.utils.cache import graph_cache
+from app.map.utils.patcher import MapChange, emit_map_change
+from app.map.utils.shared import ensure_shared_graphs, read_pointer, unpublish_graphs
+from app.map.utils.snapshot import map_fingerprint, preload_snapshot, write_snapshot
+from benchmarks.synthetic import populate_campus
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Подменяет время кеша графов; TTL — 600 секунд."""
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=lambda: now.value))
+    monkeypatch.setattr(graph_cache, "ttl", 600)
+    return now
+
+
+@pytest.fixture
+def building_ids(db, campus):
+    return sorted(building.id for building in db.query(Building))
+
+
+def forbid_db_build(monkeypatch):
+    def load_graph(*args):
+        raise AssertionError("граф не должен строиться из БД")
+    monkeypatch.setattr(builder, "load_graph", load_graph)
+
+
+def test_built_graph_expires_after_ttl(db, building_ids, clock):
+    first = get_graph(db, {building_ids[0]})
+    clock.value += 599
+    assert get_graph(db, {building_ids[0]}) is first
+    clock.value += 2
+    assert get_graph(db, {building_ids[0]}) is not first
+
+
+def test_snapshot_graphs_do_not_expire(db, building_ids, clock, tmp_path, monkeypatch):
+    path = str(tmp_path / "graph.snapshot")
+    write_snapshot(path, build_snapshot_graphs(db), map_fingerprint(db))
+    assert preload_snapshot(db, path) > 0
+    first = get_graph(db, {building_ids[0]})
+
+    forbid_db_build(monkeypatch)
+    clock.value += 10 * 600
+    assert get_graph(db, {building_ids[0]}) is first
+    assert get_graph(db, set(building_ids[:2])) is not None
+
+
+def test_patched_snapshot_graph_expires(db, building_ids, clock, tmp_path):
+    path = str(tmp_path / "graph.snapshot")
+    write_snapshot(path, build_snapshot_graphs(db), map_fingerprint(db))
+    preload_snapshot(db, path)
+    first = get_graph(db, {building_ids[0]})
+
+    patched = first.with_weights(list(first.weights))
+    graph_cache.patch(lambda key, graph: patched if graph is first else graph)
+    assert get_graph(db, {building_ids[0]}) is patched
+    clock.value += 601
+    assert get_graph(db, {building_ids[0]}) is not patched
+
+
+def test_shared_graphs_do_not_expire(db, building_ids, clock, shared_memory, monkeypatch):
+    assert ensure_shared_graphs(db, lambda: build_snapshot_graphs(db))
+    first = get_graph(db, {building_ids[0]})
+
+    forbid_db_build(monkeypatch)
+    clock.value += 10 * 600
+    assert get_graph(db, {building_ids[0]}) is first
+
+
+@pytest.fixture
+def shared_memory(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "GRAPH_SHARED_MEMORY", str(tmp_path / "graphs.pointer"))
+    monkeypatch.setattr(shared, "SessionLocal", lambda: db)
+    monkeypatch.setattr(db, "close", lambda: None)
+    yield settings.GRAPH_SHARED_MEMORY
+    graph_cache.invalidate()
+    unpublish_graphs(settings.GRAPH_SHARED_MEMORY)
+    attached, shared._shared_graphs = shared._shared_graphs, None
+    if attached is not None and attached._segment is not None:
+        attached.graphs.clear()
+        gc.collect()
+        attached._segment.close()
+
+
+def wait_for_pointer(pointer, previous, timeout=30):
+    deadline = time.monotonic() + timeout
+    while read_pointer(pointer) == previous and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return read_pointer(pointer)
+
+
+def test_map_change_republishes_shared_graphs(db, building_ids, shared_memory, monkeypatch):
+    monkeypatch.setattr(settings, "GRAPH_SHARED_REPUBLISH_DELAY", 0.2)
+    ensure_shared_graphs(db, lambda: build_snapshot_graphs(db))
+    previous = read_pointer(shared_memory)
+    publishes = []
+    publish = shared.publish_graphs
+    monkeypatch.setattr(shared, "publish_graphs", lambda *args: publishes.append(args) or publish(*args))
+
+    segment = db.query(Segment).filter(Segment.building_id == building_ids[0]).first()
+    for shift in (10, 20, 30):
+        segment.end_x += shift
+        db.commit()
+        emit_map_change(db, MapChange(segments={segment.id}))
+
+    assert wait_for_pointer(shared_memory, previous) != previous
+    time.sleep(0.5)
+    # Три правки подряд — одна публикация
+    assert len(publishes) == 1
+    graph = get_graph(db, {building_ids[0]})
+    assert graph is shared.shared_graphs().graphs[frozenset({building_ids[0]})]
+    expected = load_graph(db, {building_ids[0]})
+    vertex = f"segment_{segment.id}_end"
+    assert graph.get_vertex_data(vertex)["coords"] == expected.get_vertex_data(vertex)["coords"]
+
+
+def test_fingerprint_is_computed_once_per_cache_version(db, building_ids, shared_memory, monkeypatch):
+    ensure_shared_graphs(db, lambda: build_snapshot_graphs(db))
+    calls = []
+    fingerprint = shared.map_fingerprint
+    monkeypatch.setattr(shared, "map_fingerprint", lambda session: calls.append(1) or fingerprint(session))
+
+    get_graph(db, {building_ids[0]})
+    get_graph(db, {building_ids[1]})
+    get_graph(db, set(building_ids[:2]))
+    assert len(calls) == 1
+
+    graph_cache.invalidate()
+    get_graph(db, {building_ids[0]})
+    assert len(calls) == 2
+
+
+def test_snapshot_pairs_stay_within_campus(db, campus):
+    other = populate_campus(db, buildings=2, floors=1, rooms_per_floor=4, seed=3)
+    campus_of = {building.id: building.campus_id for building in db.query(Building)}
+
+    keys = set(build_snapshot_graphs(db))
+
+    assert {key for key in keys if len(key) == 1} == {frozenset({building_id}) for building_id in campus_of}
+    pairs = [key for key in keys if len(key) == 2]
+    assert len(pairs) == 3 + 1
+    assert all(len({campus_of[building_id] for building_id in key}) == 1 for key in pairs)
+    assert any(campus_of[min(key)] == other.id for key in pairs)
+
+
+def test_fingerprint_depends_on_connection_type(db, campus):
+    doors = db.query(Connection).filter(Connection.type == "дверь").order_by(Connection.id).limit(2).all()
+    before = map_fingerprint(db)
+
+    # Те же пять букв: длина типа отпечаток бы не изменила
+    doors[0].type = "горка"
+    db.commit()
+    changed = map_fingerprint(db)
+    assert changed != before
+
+    # Обмен типами не меняет число соединений каждого типа
+    doors[0].type, doors[1].type = "дверь", "горка"
+    db.commit()
+    assert map_fingerprint(db) not in (before, changed)
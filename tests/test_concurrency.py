@@ -0,0 +1,70 @@
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.api.endpoints.map import route
+from app.map.models.building import Building
+from app.map.utils.builder import load_graph
+from app.map.utils.cache import graph_cache
+from app.map.utils.pathfinder import dijkstra
+from benchmarks.synthetic import room_vertices
+
+
+@pytest.fixture
+def pairs(api_session, api_campus):
+    db = api_session()
+    try:
+        graph = load_graph(db, {building.id for building in db.query(Building)})
+    finally:
+        db.close()
+    rooms = room_vertices(graph)
+    rnd = random.Random(0)
+    return [(start, end, dijkstra(graph, start)[0][end]) for start, end in (rnd.sample(rooms, 2) for _ in range(12))]
+
+
+def test_parallel_routes_are_correct(client, pairs):
+    with client, ThreadPoolExecutor(max_workers=6) as executor:
+        responses = list(executor.map(
+            lambda pair: client.get("/route", params={"start": pair[0], "end": pair[1]}), pairs,
+        ))
+        for (start, end, weight), response in zip(pairs, responses):
+            assert response.status_code == 200
+            body = response.json()
+            assert body["weight"] == pytest.approx(weight)
+            assert body["path"][0]["points"][0]["vertex"] == start
+            assert body["path"][-1]["points"][-1]["vertex"] == end
+
+        # Тот же маршрут, построенный последовательно на свежем графе, совпадает с параллельным
+        graph_cache.invalidate()
+        for (start, end, _), response in zip(pairs, responses):
+            assert client.get("/route", params={"start": start, "end": end}).json() == response.json()
+
+
+def test_event_loop_serves_requests_while_routes_are_computed(client, pairs, monkeypatch):
+    release = threading.Event()
+    started = threading.Semaphore(0)
+    build_graph = route.build_graph
+
+    def blocked_build_graph(*args):
+        started.release()
+        assert release.wait(timeout=30)
+        return build_graph(*args)
+
+    monkeypatch.setattr(route, "build_graph", blocked_build_graph)
+    with client, ThreadPoolExecutor(max_workers=len(pairs)) as executor:
+        futures = [
+            executor.submit(client.get, "/route", params={"start": start, "end": end})
+            for start, end, _ in pairs
+        ]
+        try:
+            # Построение маршрута заблокировано в пуле потоков, остальные ждут в очереди
+            assert started.acquire(timeout=30)
+            response = client.get("/campuses/")
+            assert response.status_code == 200
+            assert not any(future.done() for future in futures)
+        finally:
+            release.set()
+        for (_, _, weight), future in zip(pairs, futures):
+            response = future.result(timeout=60)
+            assert response.status_code == 200
+            assert response.json()["weight"] == pytest.approx(weight)
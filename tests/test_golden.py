@@ -0,0 +1,32 @@
+import json
+from pathlib import Path
+import pytest
+from app.map.models.building import Building
+from app.map.utils.assembly import assemble_route
+from app.map.utils.builder import load_graph
+from app.map.utils.compact import CompactGraph
+from app.map.utils.pathfinder import filter_path
+
+# Полные пути по синтетическому кампусу фикстуры campus. Поле filtered записано исходной
+# (до переписывания) реализацией filter_path, поле route — assemble_route после исправления
+# текстов смены этажа; при намеренном изменении ответа /route файл перезаписывается
+CASES = json.loads((Path(__file__).parent / "data" / "golden_routes.json").read_text(encoding="utf-8"))
+
+
+@pytest.fixture
+def graph(db, campus):
+    return load_graph(db, {building.id for building in db.query(Building)})
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_filter_path_matches_baseline(graph, compact):
+    target = CompactGraph.from_graph(graph) if compact else graph
+    for case in CASES:
+        assert filter_path(target, case["path"]) == case["filtered"]
+
+
+def test_assemble_route_matches_golden(db, graph):
+    for case in CASES:
+        filtered = filter_path(graph, case["path"])
+        result = assemble_route(db, graph, case["start"], case["end"], filtered, case["weight"])
+        assert json.loads(json.dumps(result)) == case["route"]
@@ -0,0 +1,53 @@
+import pytest
+from app.map.models.building import Building
+from app.map.utils import matrix
+from app.map.utils.builder import load_graph
+from app.map.utils.matrix import compact_graph, distance_matrix
+from app.map.utils.pathfinder import dijkstra
+from benchmarks.synthetic import room_vertices
+
+
+@pytest.fixture
+def graph(db, campus):
+    return load_graph(db, {building.id for building in db.query(Building)})
+
+
+def expected_matrix(graph, sources, targets):
+    rows = []
+    for source in sources:
+        distances, _ = dijkstra(graph, source)
+        rows.append([distances.get(target) for target in targets])
+    return rows
+
+
+def test_compact_form_is_built_once_per_graph(graph):
+    assert compact_graph(graph) is compact_graph(graph)
+    compact = compact_graph(graph)
+    assert compact_graph(compact) is compact
+
+
+def test_distance_matrix_matches_dijkstra(graph):
+    rooms = room_vertices(graph)
+    sources, targets = rooms[:5], rooms[-7:]
+    distances, next_hops = distance_matrix(graph, sources, targets, with_next_hop=True)
+    for row, expected in zip(distances, expected_matrix(graph, sources, targets)):
+        assert row == pytest.approx(expected)
+    for source, hops in zip(sources, next_hops):
+        assert all(hop in {neighbor for neighbor, _, _ in graph.get_neighbors(source)} for hop in hops)
+
+
+def test_process_pool_is_reused_for_the_same_graph(graph):
+    rooms = room_vertices(graph)
+    sources, targets = rooms[:3], rooms[-3:]
+    try:
+        first, _ = distance_matrix(graph, sources, targets, workers=2)
+        pool = matrix._pool
+        second, _ = distance_matrix(graph, sources[::-1], targets, workers=2)
+        assert matrix._pool is pool
+        for row, expected in zip(first, expected_matrix(graph, sources, targets)):
+            assert row == pytest.approx(expected)
+        assert second == first[::-1]
+    finally:
+        if matrix._pool is not None:
+            matrix._pool.shutdown()
+            matrix._pool = None
@@ -0,0 +1,178 @@
+from itertools import combinations
+import pytest
+from app.map.crud import connection as connection_crud
+from app.map.crud import outdoor_segment as outdoor_crud
+from app.map.crud import room as room_crud
+from app.map.crud import segment as segment_crud
+from app.map.models.building import Building
+from app.map.models.connection import Connection
+from app.map.models.floor import Floor
+from app.map.models.outdoor_segment import OutdoorSegment
+from app.map.models.room import Room
+from app.map.models.segment import Segment
+from app.map.schemas.connection import ConnectionCreate, ConnectionUpdate
+from app.map.schemas.outdoor_segment import OutdoorSegmentCreate, OutdoorSegmentUpdate
+from app.map.schemas.room import ConnectionCreate as RoomConnectionCreate, RoomCreate, RoomUpdate
+from app.map.schemas.segment import SegmentCreate, SegmentUpdate
+from app.map.utils import builder
+from app.map.utils.builder import get_graph, load_graph
+from app.map.utils.pathfinder import dijkstra
+from benchmarks.synthetic import room_vertices
+
+
+class Map:
+    """ID сущностей синтетического кампуса, которые правят тесты."""
+
+    def __init__(self, db, campus):
+        self.campus_id = campus.id
+        self.buildings = [building.id for building in db.query(Building).order_by(Building.id)]
+        self.floors = [
+            [floor.id for floor in db.query(Floor).filter(Floor.building_id == building_id).order_by(Floor.floor_number)]
+            for building_id in self.buildings
+        ]
+        self.outdoors = [outdoor.id for outdoor in db.query(OutdoorSegment).order_by(OutdoorSegment.id)]
+
+    def segments(self, db, building=0, floor=0):
+        return [segment.id for segment in db.query(Segment).filter(
+            Segment.floor_id == self.floors[building][floor]
+        ).order_by(Segment.id)]
+
+    def rooms(self, db, building=0, floor=0):
+        return [room.id for room in db.query(Room).filter(Room.floor_id == self.floors[building][floor]).order_by(Room.id)]
+
+    def vertical(self, db, kind, building=0):
+        return db.query(Connection).join(Segment, Segment.id == Connection.from_segment_id).filter(
+            Segment.building_id == self.buildings[building], Connection.type == kind
+        ).order_by(Connection.id).first().id
+
+
+def create_segment(db, m):
+    segments = m.segments(db)
+    segment_crud.create_segment_with_connections(db, SegmentCreate(
+        start_x=0, start_y=160, end_x=40, end_y=160, floor_id=m.floors[0][0], building_id=m.buildings[0],
+        connections=[
+            ConnectionCreate(to_segment_id=segments[1], type="дверь", weight=1.5),
+            ConnectionCreate(room_id=m.rooms(db)[0], type="дверь", weight=2.5),
+        ],
+    ))
+
+
+def update_segment(db, m):
+    # Первый сегмент этажа: комнаты, дверь в коридор, лестница, лифт нет, выход на улицу
+    segments = m.segments(db)
+    segment_crud.update_segment(db, segments[0], SegmentUpdate(
+        start_y=90, end_y=110,
+        connections=[
+            ConnectionCreate(to_segment_id=segments[2], type="дверь", weight=4.0),
+            ConnectionCreate(to_outdoor_id=m.outdoors[0], type="дверь", weight=3.0),
+        ],
+    ))
+
+
+def delete_segment(db, m):
+    segment_crud.delete_segment(db, m.segments(db)[1])
+
+
+def create_room(db, m):
+    room_crud.create_room(db, RoomCreate(
+        building_id=m.buildings[0], floor_number=2, name="Буфет", cab_id="2999", cab_x=50, cab_y=80,
+        connections=[RoomConnectionCreate(segment_id=m.segments(db, floor=1)[1], type="дверь", weight=1.0)],
+    ))
+
+
+def update_room(db, m):
+    room_crud.update_room(db, m.rooms(db)[0], RoomUpdate(
+        cab_x=70, cab_y=130,
+        connections=[RoomConnectionCreate(segment_id=m.segments(db)[2], type="дверь", weight=6.0)],
+    ))
+
+
+def delete_room(db, m):
+    room_crud.delete_room(db, m.rooms(db)[1])
+
+
+def create_connection(db, m):
+    lower, upper = m.segments(db, floor=0), m.segments(db, floor=1)
+    connection_crud.create_connection(db, ConnectionCreate(
+        from_segment_id=lower[1], to_segment_id=upper[1], type="лестница", weight=6.0,
+        from_floor_id=m.floors[0][0], to_floor_id=m.floors[0][1],
+    ))
+
+
+def update_connection(db, m):
+    connection_crud.update_connection(db, m.vertical(db, "лестница"), ConnectionUpdate(
+        to_segment_id=m.segments(db, floor=0)[2], weight=7.0,
+    ))
+
+
+def delete_connection(db, m):
+    connection_crud.delete_connection(db, m.vertical(db, "лифт"))
+
+
+def create_outdoor(db, m):
+    outdoor_crud.create_outdoor_segment(db, OutdoorSegmentCreate(
+        type="улица", campus_id=m.campus_id, start_building_id=m.buildings[0], end_building_id=m.buildings[1],
+        start_x=0, start_y=-50, end_x=1000, end_y=-50, weight=0,
+        connections=[
+            ConnectionCreate(to_segment_id=m.segments(db, building=1)[0], type="дверь", weight=2.0),
+            ConnectionCreate(to_outdoor_id=m.outdoors[0], type="улица", weight=50.0),
+        ],
+    ))
+
+
+def update_outdoor(db, m):
+    outdoor_crud.update_outdoor_segment(db, m.outdoors[1], OutdoorSegmentUpdate(
+        end_x=1600, end_y=20,
+        connections=[
+            ConnectionCreate(to_segment_id=m.segments(db, building=1)[1], type="дверь", weight=3.0),
+            ConnectionCreate(to_outdoor_id=m.outdoors[2], type="улица", weight=300.0),
+        ],
+    ))
+
+
+def delete_outdoor(db, m):
+    outdoor_crud.delete_outdoor_segment(db, m.outdoors[1])
+
+
+OPERATIONS = [
+    create_segment, update_segment, delete_segment,
+    create_room, update_room, delete_room,
+    create_connection, update_connection, delete_connection,
+    create_outdoor, update_outdoor, delete_outdoor,
+]
+
+
+def edge_set(graph):
+    return {
+        (vertex, neighbor): (weight, tuple(sorted(data.items())))
+        for vertex in graph.vertices for neighbor, weight, data in graph.get_neighbors(vertex)
+    }
+
+
+@pytest.mark.parametrize("operation", OPERATIONS, ids=lambda operation: operation.__name__)
+def test_patched_graph_matches_rebuild(db, campus, operation, monkeypatch):
+    m = Map(db, campus)
+    keys = [frozenset({building_id}) for building_id in m.buildings]
+    keys += [frozenset(pair) for pair in combinations(m.buildings, 2)]
+    before = {key: get_graph(db, set(key)) for key in keys}
+
+    operation(db, m)
+
+    # Изменение применяется к закешированным графам: перестройка из БД запрещена
+    def forbidden(*args):
+        raise AssertionError("граф сброшен вместо обновления")
+    monkeypatch.setattr(builder, "load_graph", forbidden)
+    patched = {key: get_graph(db, set(key)) for key in keys}
+    assert any(patched[key] is not before[key] for key in keys)
+
+    for key in keys:
+        expected = load_graph(db, set(key))
+        graph = patched[key]
+        assert graph.vertices == expected.vertices
+        assert edge_set(graph) == edge_set(expected)
+        for source in room_vertices(expected)[::15]:
+            distances, _ = dijkstra(graph, source)
+            expected_distances, _ = dijkstra(expected, source)
+            assert distances.keys() == expected_distances.keys()
+            for vertex, distance in expected_distances.items():
+                assert distances[vertex] == pytest.approx(distance)
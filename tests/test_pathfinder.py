@@ -0,0 +1,173 @@
+import math
+import random
+import pytest
+from app.map.models.building import Building
+from app.map.utils.alternatives import alternative_paths
+from app.map.utils.builder import load_graph
+from app.map.utils.compact import CompactGraph
+from app.map.utils.landmarks import build_landmarks
+from app.map.utils.contraction import ContractionHierarchy
+from app.map.utils.pathfinder import dijkstra, filter_path, find_path, search_path
+from app.map.utils.profiles import PROFILES, edge_kind, profile_graph
+from benchmarks.synthetic import room_vertices
+
+
+@pytest.fixture
+def graph(db, campus):
+    graph = load_graph(db, {building.id for building in db.query(Building)})
+    build_landmarks(graph, 4)
+    return graph
+
+
+@pytest.fixture(params=["graph", "compact"])
+def any_graph(request, graph):
+    return graph if request.param == "graph" else CompactGraph.from_graph(graph)
+
+
+def sample_pairs(graph, count, seed=0):
+    rooms = room_vertices(graph)
+    rnd = random.Random(seed)
+    return [(rnd.choice(rooms), rnd.choice(rooms)) for _ in range(count)]
+
+
+def test_default_heuristic_finds_shortest_paths(graph):
+    for start, end in sample_pairs(graph, 40):
+        distances, _ = dijkstra(graph, start)
+        assert find_path(graph, start, end)[1] == pytest.approx(distances[end])
+
+
+@pytest.mark.parametrize("heuristic", ["alt", "combined"])
+def test_heuristic_is_admissible(any_graph, graph, heuristic):
+    for target in random.Random(1).sample(list(graph.vertices), 15):
+        distances, _ = dijkstra(graph, target)
+        key = any_graph.vertex_id(target) if isinstance(any_graph, CompactGraph) else target
+        estimate = any_graph.heuristic_to(key, heuristic)
+        for vertex, distance in distances.items():
+            key = any_graph.vertex_id(vertex) if isinstance(any_graph, CompactGraph) else vertex
+            assert estimate(key) <= distance + 1e-9
+
+
+def test_combined_uses_cheapest_floor_change(graph):
+    # В синтетическом кампусе переход между соседними этажами — лестница весом 5 (три ребра)
+    assert graph.floor_weight() == pytest.approx(5.0)
+    assert CompactGraph.from_graph(graph).floor_weight() == pytest.approx(5.0)
+
+
+@pytest.mark.parametrize("heuristic", ["alt", "combined"])
+def test_astar_matches_dijkstra(any_graph, graph, heuristic):
+    for start, end in sample_pairs(graph, 40, seed=2):
+        distances, _ = dijkstra(graph, start)
+        assert search_path(any_graph, start, end, heuristic=heuristic)[1] == pytest.approx(distances[end])
+
+
+def path_weight(graph, path):
+    return sum(graph.get_edge_weight(a, b) for a, b in zip(path, path[1:]))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_bidirectional_matches_astar_and_dijkstra(any_graph, graph, seed):
+    rnd = random.Random(seed)
+    vertices = list(graph.vertices)
+    pairs = [(rnd.choice(vertices), rnd.choice(vertices)) for _ in range(30)]
+    pairs.append((pairs[0][0], pairs[0][0]))
+    for start, end in pairs:
+        expected = dijkstra(graph, start)[0][end]
+        path, weight = search_path(any_graph, start, end, mode="bidirectional")
+        assert weight == pytest.approx(expected)
+        assert search_path(any_graph, start, end, heuristic="alt")[1] == pytest.approx(expected)
+        assert path[0] == start and path[-1] == end
+        assert path_weight(any_graph, path) == pytest.approx(weight)
+
+
+def test_bidirectional_without_landmarks(db, campus):
+    # Без ориентиров потенциалы нулевые — двунаправленный Дейкстра
+    graph = load_graph(db, {building.id for building in db.query(Building)})
+    for start, end in sample_pairs(graph, 30, seed=3):
+        assert search_path(graph, start, end, mode="bidirectional")[1] == pytest.approx(dijkstra(graph, start)[0][end])
+
+
+@pytest.mark.parametrize("heuristic", ["geometric", "alt", "combined"])
+def test_memoised_estimators_match_direct_heuristics(any_graph, graph, heuristic):
+    compact = isinstance(any_graph, CompactGraph)
+    floor_weight = graph.floor_weight()
+    vertices = list(graph.vertices)
+    for target in random.Random(4).sample(vertices, 10):
+        estimate = any_graph.heuristic_to(any_graph.vertex_id(target) if compact else target, heuristic)
+        for vertex in random.Random(5).sample(vertices, 200):
+            if heuristic == "geometric":
+                expected = any_graph.heuristic(vertex, target)
+            elif heuristic == "alt":
+                expected = any_graph.landmark_heuristic(vertex, target)
+            else:
+                floors = abs(graph.get_vertex_data(vertex)["coords"][2] - graph.get_vertex_data(target)["coords"][2])
+                expected = max(floors * floor_weight, any_graph.landmark_heuristic(vertex, target))
+            key = any_graph.vertex_id(vertex) if compact else vertex
+            # Второе обращение берёт значение из памяти оценщика
+            assert estimate(key) == pytest.approx(expected)
+            assert estimate(key) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_contraction_hierarchy_matches_dijkstra(graph, seed):
+    graph.hierarchy = ContractionHierarchy(graph)
+    rnd = random.Random(seed)
+    vertices = list(graph.vertices)
+    pairs = [(rnd.choice(vertices), rnd.choice(vertices)) for _ in range(40)]
+    pairs += sample_pairs(graph, 20, seed=seed)
+    for start, end in pairs:
+        distances, _ = dijkstra(graph, start)
+        path, weight = search_path(graph, start, end, mode="ch")
+        assert weight == pytest.approx(distances[end])
+        # Раскрытые шорткаты — цепочка исходных рёбер, и каждый префикс — кратчайший путь
+        assert path[0] == start and path[-1] == end
+        prefix = 0.0
+        for a, b in zip(path, path[1:]):
+            prefix += graph.get_edge_weight(a, b)
+            assert prefix == pytest.approx(distances[b])
+        assert len(set(path)) == len(path)
+
+        # filter_path убирает служебные вершины сегментов, но не концы-комнаты и не порядок вершин
+        filtered = filter_path(graph, path)
+        assert filtered[0] == start or not start.startswith("room_")
+        assert filtered[-1] == end or not end.startswith("room_")
+        positions = {vertex: i for i, vertex in enumerate(path)}
+        assert all(vertex in positions for vertex in filtered)
+        assert [positions[vertex] for vertex in filtered] == sorted(positions[vertex] for vertex in filtered)
+
+
+@pytest.mark.parametrize("count", [1, 3])
+def test_alternative_paths(graph, count):
+    found = 0
+    for start, end in sample_pairs(graph, 40, seed=6):
+        if start == end:
+            continue
+        shortest, weight = search_path(graph, start, end)
+        alternatives = alternative_paths(graph, start, end, shortest, weight, count, max_stretch=1.5)
+        assert len(alternatives) <= count
+        paths = [tuple(shortest)]
+        for path, total in alternatives:
+            assert path[0] == start and path[-1] == end
+            assert len(set(path)) == len(path)
+            assert path_weight(graph, path) == pytest.approx(total)
+            assert weight - 1e-9 <= total <= 1.5 * weight + 1e-9
+            assert tuple(path) not in paths
+            paths.append(tuple(path))
+        found += len(alternatives)
+    # В синтетическом кампусе между этажами есть лестница и лифт — альтернативы находятся
+    assert found > 0
+
+
+def test_wheelchair_profile_uses_lifts_only(any_graph, graph):
+    overlay = profile_graph(graph, "wheelchair")
+    target = profile_graph(any_graph, "wheelchair")
+    assert profile_graph(any_graph, "wheelchair") is target
+    closed = {kind for kind, factor in PROFILES["wheelchair"].items() if factor == math.inf}
+    lifts = 0
+    for start, end in sample_pairs(graph, 40, seed=7):
+        path, weight = search_path(target, start, end)
+        assert weight == pytest.approx(dijkstra(overlay, start)[0][end])
+        assert weight >= dijkstra(graph, start)[0][end] - 1e-9
+        kinds = [edge_kind(graph.edge_index[a][b][1]) for a, b in zip(path, path[1:])]
+        assert not closed & set(kinds)
+        lifts += "лифт" in kinds
+    assert lifts > 0
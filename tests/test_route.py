@@ -0,0 +1,252 @@
+import pytest
+from app.api.endpoints.map import route
+from app.database.config.settings import settings
+from app.map.models.building import Building
+from app.map.models.room import Room
+from app.map.utils import builder
+from app.map.utils.cache import graph_cache
+from benchmarks.synthetic import populate_campus
+
+
+def first_room(api_session, campus_id, name=None):
+    db = api_session()
+    try:
+        query = db.query(Room.id).join(Building, Building.id == Room.building_id).filter(Building.campus_id == campus_id)
+        if name is not None:
+            query = query.filter(Room.name == name)
+        return f"room_{query.order_by(Room.id).first().id}"
+    finally:
+        db.close()
+
+
+def building_of(api_session, vertex):
+    db = api_session()
+    try:
+        room = db.query(Room.building_id).filter(Room.id == int(vertex[len("room_"):])).one()
+        return db.query(Building).filter(Building.id == room.building_id).one()
+    finally:
+        db.close()
+
+
+def two_rooms(api_session, campus_id):
+    db = api_session()
+    try:
+        rooms = db.query(Room.id).join(Building, Building.id == Room.building_id).filter(
+            Building.campus_id == campus_id
+        ).order_by(Room.id).all()
+        return f"room_{rooms[0].id}", f"room_{rooms[-1].id}"
+    finally:
+        db.close()
+
+
+def forbid(monkeypatch, *names):
+    def forbidden(*args, **kwargs):
+        raise AssertionError("ответ должен браться из кеша")
+    for name in names:
+        monkeypatch.setattr(route, name, forbidden)
+
+
+def test_route_cache_hit_skips_graph_and_search(client, api_session, api_campus, monkeypatch):
+    start, end = two_rooms(api_session, api_campus)
+    first = client.get("/route", params={"start": start, "end": end})
+    assert first.status_code == 200
+    before = client.get("/route/cache").json()["routes"]
+
+    forbid(monkeypatch, "build_graph", "search_path", "assemble_route")
+    second = client.get("/route", params={"start": start, "end": end})
+
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    after = client.get("/route/cache").json()["routes"]
+    assert after["hits"] == before["hits"] + 1
+    assert after["misses"] == before["misses"]
+
+
+def test_reversed_route_reuses_search(client, api_session, api_campus, monkeypatch):
+    start, end = two_rooms(api_session, api_campus)
+    forward = client.get("/route", params={"start": start, "end": end}).json()
+    before = client.get("/route/cache").json()
+
+    forbid(monkeypatch, "search_path")
+    response = client.get("/route", params={"start": end, "end": start})
+
+    assert response.status_code == 200
+    backward = response.json()
+    assert backward["weight"] == pytest.approx(forward["weight"])
+    assert backward["path"][0]["points"][0]["vertex"] == end
+    assert backward["path"][-1]["points"][-1]["vertex"] == start
+    after = client.get("/route/cache").json()
+    # Готового ответа для обратного направления нет, а результат поиска общий
+    assert after["routes"]["misses"] == before["routes"]["misses"] + 1
+    assert after["searches"]["hits"] == before["searches"]["hits"] + 1
+
+
+def test_map_change_invalidates_route_cache(client, api_session, api_campus):
+    start, end = two_rooms(api_session, api_campus)
+    client.get("/route", params={"start": start, "end": end})
+    graph_cache.invalidate()
+    before = client.get("/route/cache").json()["routes"]
+    assert client.get("/route", params={"start": start, "end": end}).status_code == 200
+    assert client.get("/route/cache").json()["routes"]["misses"] == before["misses"] + 1
+
+
+def test_nearest_returns_route_to_matching_room(client, api_session, api_campus):
+    start = first_room(api_session, api_campus)
+    response = client.get("/route/nearest", params={"start": start, "query": "Буфет"})
+    assert response.status_code == 200
+    body = response.json()
+    assert building_of(api_session, body["end"]).campus_id == api_campus
+    assert body["weight"] > 0
+
+
+@pytest.mark.parametrize("query", ["%", "_", "%%", "Буф_т"])
+def test_nearest_treats_like_wildcards_literally(client, api_session, api_campus, query):
+    start = first_room(api_session, api_campus)
+    response = client.get("/route/nearest", params={"start": start, "query": query})
+    assert response.status_code == 404
+
+
+def test_nearest_stays_in_start_campus(client, api_session, api_campus):
+    db = api_session()
+    try:
+        other = populate_campus(db, buildings=1, floors=1, rooms_per_floor=4, seed=7).id
+        db.query(Room).filter(Room.building_id.in_(
+            db.query(Building.id).filter(Building.campus_id == other)
+        )).update({Room.name: "Принтер"}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+    start = first_room(api_session, api_campus)
+    response = client.get("/route/nearest", params={"start": start, "query": "Принтер"})
+    assert response.status_code == 404
+
+
+def test_nearest_rejects_too_many_buildings(client, api_session, api_campus, monkeypatch):
+    monkeypatch.setattr(settings, "ROUTE_NEAREST_MAX_BUILDINGS", 1)
+    start = first_room(api_session, api_campus)
+    response = client.get("/route/nearest", params={"start": start, "query": "а"})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("start", ["room_999999", "segment_1_start", "room_x"])
+def test_nearest_rejects_unknown_start(client, api_campus, start):
+    response = client.get("/route/nearest", params={"start": start, "query": "Буфет"})
+    assert response.status_code == 400
+
+
+def point_in(api_session, campus_id, index=0, floor=1):
+    db = api_session()
+    try:
+        building = db.query(Building).filter(Building.campus_id == campus_id).order_by(Building.id).all()[index]
+        # Рядом с коридором синтетического здания (y = 100)
+        return f"point_{building.id}_{floor}_{building.x + 30:g}_95"
+    finally:
+        db.close()
+
+
+def test_batch_resolves_points_like_route(client, api_session, api_campus):
+    room = first_room(api_session, api_campus)
+    pairs = [
+        (point_in(api_session, api_campus, 0), room),
+        (room, point_in(api_session, api_campus, 1, floor=2)),
+        (point_in(api_session, api_campus, 2), point_in(api_session, api_campus, 0, floor=3)),
+    ]
+    response = client.post("/route/batch", json={"pairs": [{"start": start, "end": end} for start, end in pairs]})
+    assert response.status_code == 200
+    results = response.json()["results"]
+
+    graph_cache.invalidate()
+    for (start, end), item in zip(pairs, results):
+        assert item["status"] == 200, item["error"]
+        assert item["route"] == client.get("/route", params={"start": start, "end": end}).json()
+
+
+def test_batch_rejects_malformed_point(client, api_session, api_campus):
+    room = first_room(api_session, api_campus)
+    response = client.post("/route/batch", json={"pairs": [
+        {"start": "point_1_x", "end": room},
+        {"start": room, "end": point_in(api_session, api_campus)},
+    ]})
+    results = response.json()["results"]
+    assert results[0]["status"] == 400
+    assert results[1]["status"] == 200
+
+
+def test_route_rejects_point_in_unknown_building(client, api_session, api_campus):
+    room = first_room(api_session, api_campus)
+    response = client.get("/route", params={"start": "point_999999_1_30_95", "end": room})
+    assert response.status_code == 400
+    assert "999999" in response.json()["detail"]
+    # Граф для несуществующего здания не строится и не попадает в кеш
+    assert not any(999999 in key for key in graph_cache._graphs)
+
+
+def test_route_rejects_point_far_from_corridors(client, api_session, api_campus, monkeypatch):
+    room = first_room(api_session, api_campus)
+    near = point_in(api_session, api_campus)
+    far = near[:-len("_95")] + f"_{100 + settings.ROUTE_POINT_SNAP_MAX_DISTANCE + 1:g}"
+    assert client.get("/route", params={"start": near, "end": room}).status_code == 200
+    response = client.get("/route", params={"start": far, "end": room})
+    assert response.status_code == 400
+    assert "нет коридоров" in response.json()["detail"]
+    monkeypatch.setattr(settings, "ROUTE_POINT_SNAP_MAX_DISTANCE", 0)
+    assert client.get("/route", params={"start": far, "end": room}).status_code == 200
+
+
+def test_batch_reports_point_in_unknown_building(client, api_session, api_campus):
+    room = first_room(api_session, api_campus)
+    response = client.post("/route/batch", json={"pairs": [{"start": room, "end": "point_999999_1_30_95"}]})
+    assert response.json()["results"][0]["status"] == 400
+    assert not any(999999 in key for key in graph_cache._graphs)
+
+
+@pytest.mark.parametrize("vertex", [
+    "room_999999", "room_x", "segment_1_start", "point_1_x", "point_999999_1_30_95", "point_1_1_inf_100", "point_1_1_30_nan",
+])
+def test_batch_status_matches_route(client, api_session, api_campus, vertex):
+    room = first_room(api_session, api_campus)
+    expected = client.get("/route", params={"start": vertex, "end": room}).status_code
+    response = client.post("/route/batch", json={"pairs": [{"start": vertex, "end": room}]})
+    assert response.json()["results"][0]["status"] == expected == 400
+
+
+@pytest.mark.parametrize("count", [1, 2, 3])
+def test_route_returns_at_most_requested_alternatives(client, api_session, api_campus, count):
+    start, end = two_rooms(api_session, api_campus)
+    response = client.get("/route", params={"start": start, "end": end, "alternatives": count})
+    assert response.status_code == 200
+    body = response.json()
+    assert 1 <= len(body["alternatives"]) <= count
+    for alternative in body["alternatives"]:
+        assert alternative["path"][0]["points"][0]["vertex"] == start
+        assert alternative["path"][-1]["points"][-1]["vertex"] == end
+        assert body["weight"] <= alternative["weight"] <= settings.ROUTE_ALTERNATIVE_STRETCH * body["weight"] + 1e-9
+
+
+@pytest.mark.parametrize("count", [-1, 100])
+def test_route_rejects_alternatives_out_of_range(client, api_session, api_campus, count):
+    start, end = two_rooms(api_session, api_campus)
+    response = client.get("/route", params={"start": start, "end": end, "alternatives": count})
+    assert response.status_code == 400
+
+
+def test_wheelchair_route_reuses_cached_topology(client, api_session, api_campus, monkeypatch):
+    start, end = two_rooms(api_session, api_campus)
+    plain = client.get("/route", params={"start": start, "end": end}).json()
+
+    def load_graph(*args):
+        raise AssertionError("граф профиля строится поверх закешированного")
+    monkeypatch.setattr(builder, "load_graph", load_graph)
+    response = client.get("/route", params={"start": start, "end": end, "profile": "wheelchair"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["weight"] >= plain["weight"]
+    assert not any("по лестнице" in instruction for instruction in body["instructions"])
+
+
+def test_route_rejects_unknown_profile(client, api_session, api_campus):
+    start, end = two_rooms(api_session, api_campus)
+    response = client.get("/route", params={"start": start, "end": end, "profile": "скейт"})
+    assert response.status_code == 400
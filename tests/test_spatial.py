@@ -0,0 +1,224 @@
+import math
+import random
+import pytest
+from app.database.config.settings import settings
+from app.map.models.building import Building
+from app.map.models.campus import Campus
+from app.map.models.connection import Connection
+from app.map.models.floor import Floor
+from app.map.models.room import Room
+from app.map.models.segment import Segment
+from app.map.utils import spatial
+from app.map.utils.patcher import MapChange, emit_map_change
+from app.map.utils.points import parse_point, snap_point
+from app.map.utils.spatial import GridIndex, point_segment_distance, propose_room_connections
+
+
+@pytest.fixture
+def floor(db):
+    """Этаж со случайными сегментами разной длины и комнатами без соединений, в том числе вдали от коридоров."""
+    rnd = random.Random(8)
+    campus = Campus(name="Кампус")
+    db.add(campus)
+    db.flush()
+    building = Building(campus_id=campus.id, name="A", x=0, y=0)
+    db.add(building)
+    db.flush()
+    floor = Floor(building_id=building.id, floor_number=1)
+    db.add(floor)
+    db.flush()
+    for _ in range(60):
+        x, y = rnd.uniform(0, 1000), rnd.uniform(0, 600)
+        length, angle = rnd.choice([5, 40, 300]), rnd.uniform(0, 2 * math.pi)
+        db.add(Segment(start_x=x, start_y=y, end_x=x + length * math.cos(angle), end_y=y + length * math.sin(angle),
+                       floor_id=floor.id, building_id=building.id))
+    for i in range(80):
+        x, y = rnd.uniform(-500, 1500), rnd.uniform(-300, 900)
+        db.add(Room(building_id=building.id, floor_id=floor.id, name="Аудитория", cab_id=str(i), cab_x=x, cab_y=y))
+    db.add(Room(building_id=building.id, floor_id=floor.id, name="Склад", cab_id="без входа"))
+    db.commit()
+    return floor
+
+
+def brute_force(db, floor, max_distance=math.inf):
+    """Ближайший сегмент перебором: при равном расстоянии — с меньшим ID."""
+    segments = db.query(Segment).filter(Segment.floor_id == floor.id).all()
+    expected = {}
+    for room in db.query(Room).filter(Room.floor_id == floor.id, Room.cab_x.isnot(None)):
+        distance, segment_id = min(
+            (point_segment_distance(room.cab_x, room.cab_y, s.start_x, s.start_y, s.end_x, s.end_y), s.id) for s in segments
+        )
+        if distance <= max_distance:
+            expected[room.id] = (segment_id, distance)
+    return expected
+
+
+@pytest.mark.parametrize("max_distance", [math.inf, 60])
+def test_proposals_match_brute_force(db, floor, max_distance):
+    expected = brute_force(db, floor, max_distance)
+    proposals = propose_room_connections(db, Room.floor_id == floor.id, max_distance=max_distance)
+
+    assert {proposal.room_id: proposal.segment_id for proposal in proposals} == {
+        room_id: segment_id for room_id, (segment_id, _) in expected.items()
+    }
+    for proposal in proposals:
+        assert proposal.distance == pytest.approx(expected[proposal.room_id][1])
+    if max_distance < math.inf:
+        assert 0 < len(proposals) < 80
+
+
+def test_connected_rooms_are_skipped(db, floor):
+    rooms = db.query(Room).filter(Room.cab_x.isnot(None)).order_by(Room.id).all()
+    segment = db.query(Segment).first()
+    db.add(Connection(room_id=rooms[0].id, segment_id=segment.id, type="дверь", weight=2.0))
+    db.commit()
+
+    proposed = {proposal.room_id for proposal in propose_room_connections(db, Room.floor_id == floor.id)}
+    assert proposed == {room.id for room in rooms[1:]}
+    everything = propose_room_connections(db, Room.floor_id == floor.id, only_unconnected=False)
+    assert {proposal.room_id for proposal in everything} == {room.id for room in rooms}
+
+
+def test_auto_connect_endpoint_connects_only_new_rooms(client, api_session, api_campus):
+    # В синтетическом кампусе все комнаты уже соединены с коридорами
+    response = client.post("/rooms/auto-connect")
+    assert response.status_code == 200
+    assert response.json()["connections"] == []
+
+    db = api_session()
+    try:
+        building = db.query(Building).filter(Building.campus_id == api_campus).order_by(Building.id).first()
+        floor = db.query(Floor).filter(Floor.building_id == building.id, Floor.floor_number == 1).one()
+        room = Room(building_id=building.id, floor_id=floor.id, name="Буфет", cab_id="новая",
+                    cab_x=building.x + 50, cab_y=130)
+        db.add(room)
+        db.commit()
+        room_id = room.id
+        segments = db.query(Segment).filter(Segment.floor_id == floor.id).all()
+        expected = min(segments, key=lambda s: (point_segment_distance(building.x + 50, 130, s.start_x, s.start_y, s.end_x, s.end_y), s.id))
+    finally:
+        db.close()
+
+    response = client.post("/rooms/auto-connect", params={"create": True})
+    assert response.status_code == 200
+    assert response.json()["created"] is True
+    assert [(c["room_id"], c["segment_id"]) for c in response.json()["connections"]] == [(room_id, expected.id)]
+    assert client.post("/rooms/auto-connect").json()["connections"] == []
+
+
+def test_far_point_walks_only_occupied_cells(monkeypatch):
+    index = GridIndex(10)
+    for i in range(5):
+        index.insert(i, i * 10, 0, i * 10 + 5, 5)
+    cells = []
+    rings = index._rings
+    monkeypatch.setattr(index, "_rings", lambda cx, cy: ((r, cells.extend(ring) or ring) for r, ring in rings(cx, cy)))
+
+    item, distance = index.nearest(1e3, 1e3, lambda i: math.hypot(1e3 - i * 10 - 5, 1e3 - 5))
+
+    assert item == 4 and distance == pytest.approx(math.hypot(1e3 - 45, 1e3 - 5))
+    assert sorted(cells) == [(i, 0) for i in range(5)]
+    # Первое же непустое кольцо дальше max_distance: объекты не проверяются
+    assert index.nearest(1e9, 1e9, lambda i: 0.0, max_distance=100) == (None, math.inf)
+
+
+def ground_floor(api_session, campus_id):
+    """Комната и сегменты первого этажа первого здания кампуса."""
+    db = api_session()
+    try:
+        building = db.query(Building).filter(Building.campus_id == campus_id).order_by(Building.id).first()
+        floor = db.query(Floor).filter(Floor.building_id == building.id, Floor.floor_number == 1).one()
+        room = db.query(Room).filter(Room.floor_id == floor.id).order_by(Room.id).first()
+        segments = db.query(Segment).filter(Segment.floor_id == floor.id).order_by(Segment.id).all()
+        db.expunge_all()
+        return room, segments
+    finally:
+        db.close()
+
+
+def hit_test(client, campus_id, x, y, **params):
+    response = client.get("/rooms/hit-test", params={"campus_id": campus_id, "floor_number": 1, "x": x, "y": y, **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_hit_test_finds_room_by_polygon(client, api_session, api_campus):
+    room, _ = ground_floor(api_session, api_campus)
+    # Точка внутри многоугольника, но не вход в комнату
+    body = hit_test(client, api_campus, room.cab_x + 7, room.cab_y - 7)
+    assert body["room"]["id"] == room.id
+    assert body["segment"] is None
+
+
+def test_hit_test_returns_nearest_corridor_segment(client, api_session, api_campus):
+    _, segments = ground_floor(api_session, api_campus)
+    segment = segments[2]
+    x = (segment.start_x + segment.end_x) / 2
+    body = hit_test(client, api_campus, x, segment.start_y + 5)
+    assert body["room"] is None
+    assert body["segment"] == {"id": segment.id, "floor_id": segment.floor_id, "distance": pytest.approx(5)}
+
+
+def test_hit_test_max_distance(client, api_session, api_campus, monkeypatch):
+    _, segments = ground_floor(api_session, api_campus)
+    segment = segments[2]
+    x, y = (segment.start_x + segment.end_x) / 2, segment.start_y + 300
+    assert hit_test(client, api_campus, x, y, max_distance=299)["segment"] is None
+    assert hit_test(client, api_campus, x, y, max_distance=301)["segment"]["id"] == segment.id
+    # По умолчанию — ROOM_HIT_TEST_MAX_DISTANCE, 0 — без ограничения
+    assert hit_test(client, api_campus, x, y)["segment"] is None
+    monkeypatch.setattr(settings, "ROOM_HIT_TEST_MAX_DISTANCE", 0)
+    assert hit_test(client, api_campus, x, y)["segment"]["id"] == segment.id
+    assert hit_test(client, api_campus, segments[0].start_x, 1e12)["segment"]["id"] == segments[0].id
+
+
+@pytest.mark.parametrize("x", ["inf", "-inf", "nan"])
+def test_hit_test_rejects_non_finite_point(client, api_campus, x):
+    response = client.get("/rooms/hit-test", params={"campus_id": api_campus, "floor_number": 1, "x": x, "y": 100})
+    assert response.status_code == 400
+
+
+def test_hit_test_rebuilds_only_changed_floor(client, api_session, api_campus, monkeypatch):
+    room, _ = ground_floor(api_session, api_campus)
+    builds = []
+    load = spatial._load_floor_index
+    monkeypatch.setattr(spatial, "_load_floor_index", lambda db, *key: builds.append(key) or load(db, *key))
+    assert hit_test(client, api_campus, room.cab_x, room.cab_y)["room"]["id"] == room.id
+    client.get("/rooms/hit-test", params={"campus_id": api_campus, "floor_number": 2, "x": 0, "y": 0})
+    hit_test(client, api_campus, room.cab_x, room.cab_y)
+    assert builds == [(api_campus, 1), (api_campus, 2)]
+
+    db = api_session()
+    try:
+        stored = db.get(Room, room.id)
+        stored.coordinates = [{"x": point["x"], "y": point["y"] + 400} for point in stored.coordinates]
+        db.commit()
+        emit_map_change(db, MapChange(rooms=[room.id]))
+    finally:
+        db.close()
+
+    assert hit_test(client, api_campus, room.cab_x, room.cab_y + 400)["room"]["id"] == room.id
+    assert hit_test(client, api_campus, room.cab_x, room.cab_y)["room"] is None
+    client.get("/rooms/hit-test", params={"campus_id": api_campus, "floor_number": 2, "x": 0, "y": 0})
+    assert builds == [(api_campus, 1), (api_campus, 2), (api_campus, 1)]
+
+
+def test_snap_point_uses_only_own_building(db, campus):
+    first, second = db.query(Building).order_by(Building.id).limit(2).all()
+    # Точка первого здания лежит на коридоре второго
+    vertex = f"point_{first.id}_1_{second.x + 30:g}_100"
+    own = db.query(Segment).join(Floor, Floor.id == Segment.floor_id).filter(
+        Segment.building_id == first.id, Floor.floor_number == 1
+    ).all()
+    expected = min(own, key=lambda s: (point_segment_distance(second.x + 30, 100, s.start_x, s.start_y, s.end_x, s.end_y), s.id))
+
+    snap = snap_point(db, vertex, max_distance=math.inf)
+    assert (snap.segment_id, snap.building_id) == (expected.id, first.id)
+    with pytest.raises(ValueError):
+        snap_point(db, vertex)
+
+
+@pytest.mark.parametrize("vertex", ["point_1_1_inf_100", "point_1_1_30_-inf", "point_1_1_nan_100"])
+def test_parse_point_rejects_non_finite_coordinates(vertex):
+    with pytest.raises(ValueError):
+        parse_point(vertex)